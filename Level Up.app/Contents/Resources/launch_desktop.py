@@ -46,6 +46,13 @@ def launch_app():
             "--server.headless", "true"
         ])
         
+        # Start the nightly penalty check next to the server, so no cron job is needed
+        # (set LEVELUP_SCHEDULER=app to run it inside the server, or =off if you use cron)
+        scheduler_process = None
+        if os.environ.get('LEVELUP_SCHEDULER') not in ('app', 'off'):
+            print("⏰ Starting nightly check scheduler...")
+            scheduler_process = subprocess.Popen([python_executable, "scheduler.py"])
+        
         # Wait a moment for the server to start
         print("⏳ Waiting for server to start...")
         time.sleep(3)
@@ -66,6 +73,9 @@ def launch_app():
             print("\n🛑 Stopping server...")
             streamlit_process.terminate()
             print("✅ Server stopped")
+        finally:
+            if scheduler_process:
+                scheduler_process.terminate()
             
     except Exception as e:
         print(f"❌ Error launching app: {e}")
@@ -0,0 +1,147 @@
+#imports
+import sqlite3
+import threading
+from contextlib import closing
+import pandas as pd
+import storage
+
+#The purpose of this module is to answer questions about the whole task history (XP over time,
+#per-category trends, completions per task, the level curve) without Python loops over the
+#detailed_logs dictionaries.
+#The history is loaded once into two columnar frames:
+#   logs        one row per detailed_logs entry: id, date (datetime64), name, type (categoricals), xp, period_key
+#   categories  one row per (log, category) pair, the categories exploded out of the logs
+#and the queries below are pandas group-bys over them.
+#The frames are cached per progress file and state version: the next query after any change
+#(a completion, a deletion, the cron job) loads them again, all other reruns reuse them.
+#pandas is only imported when this module is (see app.render_trends).
+#See benchmarks/trend_queries.py for timings up to 1M log rows.
+
+
+### Configuration
+CACHE_ENTRIES = 4 #how many (file, version) frame pairs stay cached
+LOG_COLUMNS = ["id", "date", "name", "xp", "type", "period_key"]
+
+_frames = {} #(file path, version) -> (logs, categories), oldest first
+_frames_guard = threading.Lock()
+
+
+### Loading
+
+def frames_from_logs(logs):
+    """
+    Builds the columnar frames from detailed_logs entries.
+    Args:
+        logs (list): The detailed_logs entries.
+    Returns:
+        tuple: The logs frame and the categories frame (see the module comment).
+    """
+    frame = pd.DataFrame.from_records(logs, columns=LOG_COLUMNS + ["category"])
+    categories = frame[["id", "category", "xp", "date"]].explode("category", ignore_index=True).dropna(subset=["category"])
+    return _typed(frame[LOG_COLUMNS]), _typed(categories)
+
+def _frames_from_sqlite(file_path):
+    """
+    Reads the columnar frames straight from the SQLite tables (see sqlite_store.py).
+    """
+    import sqlite_store
+    with closing(sqlite3.connect(sqlite_store.db_path(file_path))) as conn:
+        frame = pd.read_sql_query("SELECT id, date, name, xp, type, period_key FROM detailed_logs ORDER BY date, id", conn)
+        categories = pd.read_sql_query(
+            "SELECT c.log_id AS id, c.category, c.xp, l.date FROM log_categories c JOIN detailed_logs l ON l.id = c.log_id", conn
+        )
+    return _typed(frame), _typed(categories)
+
+def _typed(frame):
+    """
+    Gives the frame columns compact types: datetime64 dates, categorical names, types and categories.
+    """
+    frame = frame.copy()
+    frame["date"] = pd.to_datetime(frame["date"], format="%Y-%m-%d")
+    for column in ("name", "type", "category"):
+        if column in frame:
+            frame[column] = frame[column].astype("category")
+    frame["xp"] = pd.to_numeric(frame["xp"], downcast="integer")
+    return frame
+
+def load_frames(file_path, state):
+    """
+    Gets the columnar frames of a progress file, building them only if the state version changed.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        state (dict): The loaded progress (its version is the cache key).
+    Returns:
+        tuple: The logs frame and the categories frame. Treat them as read-only; they are shared.
+    """
+    key = (file_path, state.get('version'))
+    with _frames_guard:
+        cached = _frames.get(key)
+    if cached is not None:
+        return cached
+    if storage._use_sqlite(file_path):
+        cached = _frames_from_sqlite(file_path)
+    else:
+        cached = frames_from_logs(state.get('detailed_logs', []))
+    with _frames_guard:
+        _frames[key] = cached
+        while len(_frames) > CACHE_ENTRIES:
+            del _frames[next(iter(_frames))]
+    return cached
+
+def clear_cache():
+    """
+    Drops all cached frames.
+    """
+    with _frames_guard:
+        _frames.clear()
+
+
+### Queries
+
+def xp_by_category(categories, freq="W-MON"):
+    """
+    Adds up the XP earned per category per period.
+    Args:
+        categories (DataFrame): The categories frame.
+        freq (str): A pandas period frequency, e.g. "D", "W-MON" (weeks starting Monday), "MS" or "YS".
+    Returns:
+        DataFrame: One row per period (indexed by its start date), one column per category.
+    """
+    if categories.empty:
+        return pd.DataFrame()
+    grouped = categories.groupby([pd.Grouper(key="date", freq=freq, label="left", closed="left"), "category"], observed=True)["xp"].sum()
+    return grouped.unstack("category", fill_value=0).sort_index()
+
+def completions_by_task(logs, freq="MS", task_type=None):
+    """
+    Counts the completions of every task per period (penalty logs are left out).
+    Args:
+        logs (DataFrame): The logs frame.
+        freq (str): A pandas period frequency, e.g. "W-MON" or "MS" (months).
+        task_type (str): Only count tasks of this type (daily, weekly, monthly, one-time); None counts all.
+    Returns:
+        DataFrame: One row per period (indexed by its start date), one column per task.
+    """
+    tasks = logs[logs["type"] != "penalty"]
+    if task_type is not None:
+        tasks = tasks[tasks["type"] == task_type]
+    if tasks.empty:
+        return pd.DataFrame()
+    grouped = tasks.groupby([pd.Grouper(key="date", freq=freq, label="left", closed="left"), "name"], observed=True).size()
+    return grouped.unstack("name", fill_value=0).sort_index()
+
+def xp_over_time(logs, freq="D"):
+    """
+    Gets the XP earned per period and the running total, with the level reached at the end of each period.
+    Args:
+        logs (DataFrame): The logs frame.
+        freq (str): A pandas period frequency, e.g. "D", "W-MON" or "MS".
+    Returns:
+        DataFrame: Indexed by period start, with the columns xp, total_xp and level.
+    """
+    if logs.empty:
+        return pd.DataFrame(columns=["xp", "total_xp", "level"])
+    per_period = logs.groupby(pd.Grouper(key="date", freq=freq, label="left", closed="left"))["xp"].sum().to_frame("xp")
+    per_period["total_xp"] = per_period["xp"].cumsum().clip(lower=0)
+    per_period["level"] = per_period["total_xp"] // 100 + 1 #same rule as storage.calculate_level
+    return per_period
@@ -1,250 +1,326 @@
 #imports
 import streamlit as st
-import json
+import functools
+import inspect
 import os
-from datetime import datetime, date, timedelta
-import pandas as pd
-import plotly.express as px
-import calendar
-import random
-import plotly.graph_objects as go
+import time
+from datetime import datetime, date
+import storage
+import periods
+import core
+import tenants
+import scheduler
+import streaks
+import charts
+import catalog
+import watcher
 
 #Constants
-DATA_DIR = "data"
+DATA_DIR = "data" #single-player mode; with LEVELUP_TENANTS_DIR each player has a folder of their own (see tenants.py)
 TASKS_FILE = os.path.join(DATA_DIR, "tasks.json")
 PROGRESS_FILE = os.path.join(DATA_DIR, "progress.json")
 REWARDS_FILE = os.path.join(DATA_DIR, "rewards.json")
+HEATMAP_DAYS = 26 * 7 #days shown in the daily completion heatmap (at most streaks.KEEP periods of each type are kept)
+HEATMAP_WEEKS = 26
+HEATMAP_MONTHS = 12
+TREND_WEEKS = 26 #weeks shown in the XP per category trend
+TREND_MONTHS = 12 #months shown in the completions per task heatmap
+SCHEDULER_IN_APP = os.environ.get("LEVELUP_SCHEDULER") == "app" #run the nightly check inside this server process (see scheduler.py)
+RENDER_LOG = os.environ.get("LEVELUP_RENDER_LOG") == "1" #print how long each section took to render
+WATCH_FILES = os.environ.get("LEVELUP_WATCH", "1") != "0" #notice file changes with watcher.py instead of checking every file on every rerun
+LIVE_CHECK_SECONDS = 2 #how often an open page asks the watcher whether its files were changed elsewhere
 
 
 ### Load and Save Functions
 
 def load_json_file(file_path):
     """
-    Loads a JSON file from the specified path.
+    Loads a JSON file from the specified path, including any changes recorded in its event log.
     Args:
         file_path (str): The path to the JSON file.
     Returns:
         dict: The contents of the JSON file as a dictionary.
     """
-    with open(file_path, 'r') as f:
-        return json.load(f)
+    return storage.load(file_path)
 
-def save_json_file(file_path, data):
+def save_json_file(file_path, data, force=False):
     """
-    Saves a dictionary to a JSON file.
+    Saves a dictionary to a JSON file. This rewrites the whole file, so use record_events for small changes.
     Args:
         file_path (str): The path to the JSON file.
         data: The data to save to the JSON file.
+        force (bool): If True, overwrite the file even if another session or the cron job changed it since it was loaded.
     Returns:
         None
     """
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
+    storage.save(file_path, data, force)
 
-### Session State Functions
-
-def initialize_session_state():
+def record_events(file_path, data, events):
     """
-    Loads data from JSON files into session state.
-    This now reloads on every rerun to ensure external changes (like from a cron job) are reflected.
+    Applies events to the loaded data and appends them to the file's event log instead of rewriting the file.
     Args:
+        file_path (str): The path to the JSON file.
+        data (dict): The loaded data, updated in place.
+        events (list): The event records (see storage.py).
+    Returns:
         None
+    """
+    storage.record(file_path, data, events)
+
+### Fragment Functions
+#The dashboard is split into fragments: a widget inside a fragment (a task checkbox, a history page button,
+#the spending form) reruns only that fragment instead of the whole script, so the charts, the history
+#and the rewards are not rebuilt for every checkbox. The fragments share st.session_state (tasks,
+#progress, rewards), and anything that changes what other sections show (submitting tasks, deleting
+#a log, claiming a reward) still reruns the whole app with st.rerun().
+#Streamlit versions without fragments run them as normal functions, i.e. every click reruns everything as before.
+
+_FRAGMENT = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+_RERUN_SCOPE = "scope" in inspect.signature(st.rerun).parameters
+
+def note_render_time(name, seconds):
+    """
+    Keeps the last render time of a section for the Diagnostics panel, and prints it if LEVELUP_RENDER_LOG=1.
+    Args:
+        name (str): The section (function) name.
+        seconds (float): How long it took.
     Returns:
         None
     """
-    # Always reload data from disk to catch external changes
-    st.session_state.tasks = load_json_file(TASKS_FILE)
-    st.session_state.progress = load_json_file(PROGRESS_FILE)
-    st.session_state.rewards = load_json_file(REWARDS_FILE)
+    if 'render_times' not in st.session_state:
+        st.session_state.render_times = {}
+    st.session_state.render_times[name] = seconds * 1000
+    if RENDER_LOG:
+        print(f"Rendered {name} in {seconds * 1000:.1f} ms")
 
-    # Initialize UI-specific state (like checkbox values) only once per session
-    if 'task_checks' not in st.session_state:
-        st.session_state.task_checks = {}
-        for ttype in ['daily', 'weekly', 'monthly', 'one_time']:
-            for task in st.session_state.tasks[ttype]:
-                st.session_state.task_checks[f"{ttype}_{task['name']}"] = False
+def timed(func):
+    """
+    Decorator that records how long each call of a section takes (see note_render_time).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            note_render_time(func.__name__, time.perf_counter() - started)
+    return wrapper
 
-### XP Calculation Functions
+def fragment(func):
+    """
+    Decorator that makes a timed section a fragment, when this Streamlit version has them.
+    A fragment is called again with the arguments of the last full run, so pass it nothing that goes stale,
+    except the period context through fragment_ctx.
+    """
+    return _FRAGMENT(timed(func)) if _FRAGMENT else timed(func)
 
-def calculate_level(xp):
+def fragment_ctx(ctx):
     """
-    Calculates the level based on the experience points (XP).
+    Gets the period context for a fragment that is passed the full run's ctx: that ctx when the full run
+    calls it, a new one when the fragment reruns on its own (and gets the last full run's ctx again).
     Args:
-        xp (int): The experience points.
+        ctx (dict): The ctx the fragment was called with (see share_ctx).
     Returns:
-        int: The calculated level.
+        dict: The period context to render with.
+    """
+    if st.session_state.pop('run_ctx', None) is ctx:
+        return ctx
+    return periods.period_context()
+
+def share_ctx(ctx):
+    """
+    Hands this full run's period context to the fragment it calls next (see fragment_ctx).
+    """
+    st.session_state.run_ctx = ctx
+
+def rerun_fragment():
+    """
+    Reruns only the fragment this is called from (the whole app on Streamlit versions without fragment reruns).
     """
-    return (xp // 100) + 1
+    if _RERUN_SCOPE:
+        st.rerun(scope="fragment")
+    st.rerun()
+
+### Session State Functions
 
-def calculate_xp_to_next_level(xp):
+@st.cache_resource
+def start_scheduler():
     """
-    Calculates the experience points needed to reach the next level.
+    Starts the nightly check timer once per server process (not once per session).
     Args:
-        xp (int): The experience points.
+        None
     Returns:
-        int: The experience points needed to reach the next level.
+        bool: True if this call started it.
     """
-    current_level = calculate_level(xp)
-    return current_level * 100 - xp
+    return scheduler.start(["--workers", "1"]) # no worker processes inside the server
 
-### Time Left Functions
+def session_files():
+    """
+    Gets the state files of this session's player.
+    In multi-player mode the player is picked with ?user=<name> in the URL; the script stops with a message if it is missing or unknown.
+    Args:
+        None
+    Returns:
+        dict: "tasks", "progress" and "rewards" -> file path.
+    """
+    if not tenants.enabled():
+        return {"tasks": TASKS_FILE, "progress": PROGRESS_FILE, "rewards": REWARDS_FILE}
+    user = st.query_params.get("user")
+    if not tenants.exists(user):
+        st.title("Level Up: Progress Tracker")
+        st.error("Unknown player. Open the app with ?user=<your name> at the end of the address.")
+        st.stop()
+    st.session_state.user = user
+    return tenants.data_files(tenants.data_dir(user))
+
+@st.cache_resource
+def start_watcher():
+    """
+    Starts the file watcher once per server process (not once per session).
+    Args:
+        None
+    Returns:
+        str: The watcher mode ("watchdog" or "polling").
+    """
+    return watcher.start()
 
-def get_time_left(category):
+def watch_session_files(files):
     """
-    Gets the time left for a task based on its category.
+    Watches this session's files: tasks.json by its catalog version, progress and rewards by their state version.
+    Files kept in the SQLite database are not watched; they are loaded on every rerun as before.
     Args:
-        category (str): The category of the task.
+        files (dict): "tasks", "progress" and "rewards" -> file path.
     Returns:
-        tuple: A tuple containing the time left as a string and a boolean indicating if the grace period is active.
-    """
-    now = datetime.now()
-    grace = timedelta(hours=1)
-    grace_on = False
-    if category == "daily":
-        end_of_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
-        hours_left = (end_of_day - now).total_seconds() / 3600
-        # Grace period: after midnight but before 1am
-        if now.time() < (datetime.min + grace).time():
-            grace_on = True
-        timer_str = f"⏰ {int(hours_left)}h {int((hours_left%1)*60)}m left today"
-    elif category == "weekly":
-        days_left = 6 - now.weekday()
-        # Grace period: before 1am on Monday
-        week_start = now - timedelta(days=now.weekday())
-        week_start_1am = datetime.combine(week_start.date(), datetime.min.time()) + grace
-        if now < week_start_1am:
-            grace_on = True
-        timer_str = f"⏰ {days_left+1} day{'s' if days_left else ''} left this week"
-    elif category == "monthly":
-        last_day = calendar.monthrange(now.year, now.month)[1]
-        days_left = last_day - now.day
-        # Grace period: before 1am on the 1st
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        month_start_1am = month_start + grace
-        if now < month_start_1am:
-            grace_on = True
-        timer_str = f"⏰ {days_left+1} day{'s' if days_left else ''} left this month"
-    else:
-        return None, False
-    return timer_str, grace_on
+        dict: The same names -> the file's version as of its last change, or None if it is not watched.
+    """
+    versions = {"tasks": watcher.watch(files['tasks'], lambda path: catalog.load(path)['version'])}
+    for name in ("progress", "rewards"):
+        versions[name] = None if storage._use_sqlite(files[name]) else watcher.watch(files[name], storage.current_version)
+    return versions
 
-def get_period_key(category):
+def held_versions():
     """
-    Gets the period key based on the category of the task. This is needed because tasks can be done on different days, weeks, or months due to the grace period.
+    Gets the versions of the files this session has loaded (its own writes advance them in place).
     Args:
-        category (str): The category of the task.
+        None
     Returns:
-        str: The period key, which is essentially the date or week or month, for example 2025-06-22, 2025-W25, 2025-06.
+        dict: "tasks", "progress" and "rewards" -> version, None for files not loaded yet.
     """
-    now = datetime.now()
-    grace = timedelta(hours=1)
-    
-    if category == "daily":
-        # If before 1am, use previous day as period key
-        if now.time() < (datetime.min + grace).time():
-            period_date = now.date() - timedelta(days=1)
-        else:
-            period_date = now.date()
-        return period_date.strftime("%Y-%m-%d")
-    elif category == "weekly":
-        # If before 1am on Monday, use previous week
-        week_start = now - timedelta(days=now.weekday())
-        week_start_1am = datetime.combine(week_start.date(), datetime.min.time()) + grace
-        if now < week_start_1am:
-            prev_week = now - timedelta(weeks=1)
-            return f"{prev_week.isocalendar()[0]}-W{prev_week.isocalendar()[1]}"
-        else:
-            return f"{now.isocalendar()[0]}-W{now.isocalendar()[1]}"
-    elif category == "monthly":
-        # If before 1am on the 1st, use previous month
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        month_start_1am = month_start + grace
-        if now < month_start_1am:
-            prev_month = (now.replace(day=1) - timedelta(days=1))
-            return prev_month.strftime("%Y-%m")
-        else:
-            return now.strftime("%Y-%m")
-    elif category == "one-time":
-        return "one-time"
-    return None
+    state = st.session_state
+    return {
+        "tasks": state.catalog['version'] if 'catalog' in state else None,
+        "progress": state.progress.get('version') if 'progress' in state else None,
+        "rewards": state.rewards.get('version') if 'rewards' in state else None,
+    }
+
+def initialize_session_state():
+    """
+    Loads data from JSON files into session state.
+    This runs on every rerun to ensure external changes (like from a cron job) are reflected.
+    With the file watcher, a file is only loaded again when the watcher saw it change to a version this
+    session does not have; without it, every file is checked on every rerun.
+    Files are only re-parsed when they changed on disk; otherwise a copy of the process-wide cached state is used.
+    Before a file is parsed, storage.recover repairs anything left behind by a crashed write.
+    Args:
+        None
+    Returns:
+        None
+    """
+    files = session_files()
+    if st.session_state.get('files') != files: # a different player: start with fresh checkboxes and data
+        for key in ('task_checks', 'task_checks_version', 'catalog', 'progress', 'rewards'):
+            st.session_state.pop(key, None)
+    st.session_state.files = files
+
+    latest = {}
+    if WATCH_FILES:
+        start_watcher()
+        latest = watch_session_files(files)
+    held = held_versions()
+
+    def outdated(name):
+        return latest.get(name) is None or latest[name] != held[name]
+
+    if outdated("tasks"):
+        try:
+            st.session_state.catalog = catalog.load(files['tasks']) # compiled and checked only when tasks.json changed
+        except catalog.TaskCatalogError as e:
+            st.title("Level Up: Progress Tracker")
+            st.error(str(e))
+            st.stop()
+        st.session_state.tasks = st.session_state.catalog['tasks']
+    if outdated("progress"):
+        st.session_state.progress = load_json_file(files['progress'])
+    if outdated("rewards"):
+        st.session_state.rewards = load_json_file(files['rewards'])
+    sync_task_checks()
+
+def sync_task_checks():
+    """
+    Keeps one checkbox value per task: tasks added to tasks.json start unchecked and removed tasks lose
+    their value, while the other tasks keep theirs. Only does work when tasks.json changed.
+    Args:
+        None
+    Returns:
+        None
+    """
+    version = st.session_state.catalog['version']
+    if st.session_state.get('task_checks_version') == version:
+        return
+    checks = st.session_state.get('task_checks', {})
+    st.session_state.task_checks = {
+        task['key']: checks.get(task['key'], False) for ttype in core.TASK_TYPES for task in st.session_state.tasks[ttype]
+    }
+    st.session_state.task_checks_version = version
+
+def check_for_changes():
+    """
+    Reruns the whole app when the watcher saw this session's files change elsewhere (the nightly check,
+    another session, an edit to tasks.json). Runs on its own every LIVE_CHECK_SECONDS as a fragment.
+    Args:
+        None
+    Returns:
+        None
+    """
+    files = st.session_state.get('files')
+    if not files:
+        return
+    for name, version in held_versions().items():
+        latest = watcher.token(files[name])
+        if latest is not None and latest != version:
+            st.rerun()
+
+live_updates = _FRAGMENT(run_every=LIVE_CHECK_SECONDS)(check_for_changes) if _FRAGMENT else None
 
 ### Task Completion Functions
 
-def get_task_completion_count(progress, category, task_name):
+def get_task_completion_count(progress, category, task_name, ctx=None):
     """
     Gets the completion count of a task for the current period.
     Args:
         progress (dict): The progress dictionary.
         category (str): The category of the task.
         task_name (str): The name of the task.
+        ctx (dict): The period context of this rerun (see periods.py).
     Returns:
         int: The completion count of the task for the current period.
     """
-    period_key = get_period_key(category)
-    if category == "one-time":
-        # One-time tasks are either done (1) or not (0).
-        return 1 if progress.get('completed_tasks', {}).get(category, {}).get(task_name) else 0
-    #returns 0 if the task is not completed for the current period
-    return progress.get('completed_tasks', {}).get(category, {}).get(task_name, {}).get(period_key, 0) 
+    return core.completion_count(st.session_state.files['progress'], progress, category, task_name, ctx)
 
-def mark_tasks_completed(progress, category, tasks_to_increment):
+def mark_tasks_completed(progress, category, tasks_to_increment, ctx=None):
     """
-    Increments the completion count for a list of tasks for the current period.
+    Increments the completion count for a list of tasks for the current period, awards their XP and logs them.
+    Everything is recorded as one append to the progress event log.
     Args:
         progress (dict): The progress dictionary.
         category (str): The category of the tasks.
-        tasks_to_increment (list): The list of task names to increment.
+        tasks_to_increment (list): The list of task dictionaries to mark as completed.
+        ctx (dict): The period context of this rerun (see periods.py).
     Returns:
-        None
+        int: The XP earned.
     """
-    period_key = get_period_key(category)
-    if category not in progress['completed_tasks']:
-        progress['completed_tasks'][category] = {} #initialize the category if it doesn't exist
-    
-    for task_name in tasks_to_increment: #increment the completion count for each task
-        if task_name not in progress['completed_tasks'][category]:
-            progress['completed_tasks'][category][task_name] = {} #initialize the task if it doesn't exist
-        
-        current_count = progress['completed_tasks'][category][task_name].get(period_key, 0) #get the current count for the task
-        progress['completed_tasks'][category][task_name][period_key] = current_count + 1 # increment the count for the task
-        
-    save_json_file(PROGRESS_FILE, progress) 
-
-def assign_penalties(progress, unchecked_count):
-    """
-    Assigns penalties based on the unchecked count.
-    Args:
-        progress (dict): The progress dictionary.
-        unchecked_count (int): The number of unchecked tasks.
-    Returns:
-        None
-    """
-    penalties = progress.get('penalties', []) #get the penalties from the progress dictionary
-    small_penalties = [
-        "Vacuum floor",
-        "15 min stretching/meditating",
-        "Take stairs instead of elevator for the day"
-    ]
-    big_penalties = [
-        "1 mile run",
-        "Cold shower"
-    ]
-    if unchecked_count == 1:
-        penalty = random.choice(small_penalties)
-        penalties.append({ 
-            'due_date': tomorrow, 
-            'description': penalty,
-            'completed': False
-        })
-    elif unchecked_count >= 2:
-        penalty = random.choice(big_penalties)
-        penalties.append({
-            'due_date': tomorrow,
-            'description': penalty,
-            'completed': False
-        })
-    progress['penalties'] = penalties
-    save_json_file(PROGRESS_FILE, progress)
+    record_events(st.session_state.files['progress'], progress, core.task_completion_events(category, tasks_to_increment, ctx))
+    return sum(task['xp'] for task in tasks_to_increment)
 
 ### UI Functions
 
@@ -258,11 +334,7 @@ def render_penalties_section():
     """
     st.subheader("Penalties", divider="gray")
     progress = st.session_state.progress
-    penalties = progress.get('penalties', [])
-    
-    active_penalties_with_indices = [
-        (i, p) for i, p in enumerate(penalties) if not p.get('completed', False) #only show the penalties that are not completed, i is the index of the penalty and p is the penalty
-    ]
+    active_penalties_with_indices = core.active_penalties(progress) #only show the penalties that are not completed, with their index in penalties
 
     if not active_penalties_with_indices:
         st.write("No active penalties!")
@@ -270,40 +342,27 @@ def render_penalties_section():
         for original_index, penalty in active_penalties_with_indices:
             col1, col2 = st.columns([4, 1])
             with col1:
-                st.warning(f"Due: {penalty['due_date']} - {penalty['description']}")
+                missed = f" (missed tasks on {penalty['missed_date']})" if penalty.get('missed_date') else ""
+                st.warning(f"Due: {penalty['due_date']} - {penalty['description']}{missed}")
             with col2:
                 if st.button("Mark Completed", key=f"penalty_{original_index}"):
-                    #Assign an ID if not present (for backward compatibility)
-                    penalty.setdefault('id', f"pen-{datetime.now().timestamp()}-{original_index}")
-                    penalty['completed'] = True
-                    
-                    # Add to detailed_logs to track the penalty
-                    if 'detailed_logs' not in progress:
-                        progress['detailed_logs'] = []
-                    
-                    progress['detailed_logs'].append({
-                        "name": penalty['description'],
-                        "xp": 0,
-                        "category": ["Penalty"],
-                        "type": "penalty",
-                        "date": date.today().isoformat(),
-                        "penalty_id": penalty['id']
-                    })
-                    
-                    save_json_file(PROGRESS_FILE, progress)
+                    # Mark completed and add to detailed_logs to track the penalty
+                    record_events(st.session_state.files['progress'], progress, [core.penalty_completed_event(penalty, original_index)])
                     st.success("Penalty marked as completed and logged in history!")
                     st.rerun()
 
-def render_task_section(task_type, tasks):
+def render_task_section(task_type, tasks, ctx=None):
     """
     Renders the task section.
     Args:
         task_type (str): The type of task.
         tasks (list): The list of tasks.
+        ctx (dict): The period context of this rerun (see periods.py).
     Returns:
-        None
+        list: The task dictionaries that are currently checked (and not yet maxed out for this period).
     """
-    timer, grace_on = get_time_left(task_type)
+    ctx = ctx or periods.period_context()
+    timer, grace_on = core.get_time_left(task_type, ctx)
     header = f"{task_type.capitalize()} Tasks"
     if timer: #if the task type is daily, weekly, or monthly, show the timer
         st.subheader(f"{header}  ", divider="gray")
@@ -313,13 +372,12 @@ def render_task_section(task_type, tasks):
         st.subheader(header, divider="gray") #if the task type is one-time, don't show the timer
     checked = [] #list of currently checked tasks
     progress = st.session_state.progress
-    period_key = get_period_key(task_type)
     for task in tasks: #render the tasks
         col1, col2 = st.columns([3, 1]) #split the screen into two columns
         with col1:
-            key = f"{task_type}_{task['name']}"
+            key = task['key']
             frequency = task.get('frequency', 1)
-            completion_count = get_task_completion_count(progress, task_type, task['name'])
+            completion_count = get_task_completion_count(progress, task_type, task['name'], ctx)
             
             is_maxed_out = completion_count >= frequency 
             
@@ -343,44 +401,18 @@ def render_task_section(task_type, tasks):
                     help=task['description']
                 )
                 if is_checked: #if the checkbox is checked, add the task to the list of checked tasks
-                    checked.append(task['name'])
+                    checked.append(task)
         with col2:
-            st.write(f"Category: {', '.join(task.get('category', task.get('tags', [])))}") #show the category of the task
+            st.write(f"Category: {', '.join(task['category'])}") #show the category of the task
      
     
     #Submit button for this category
     if checked:
         if st.button(f"Submit {task_type.capitalize()} Tasks", key=f"submit_{task_type}"): #if the submit button is clicked, mark the tasks as completed
-            # Pass the list of checked task names to increment their counts
-            mark_tasks_completed(progress, task_type, checked)
-            # Award XP and log each completed task with details
-            earned_xp = sum([t['xp'] for t in tasks if t['name'] in checked])
-            completed_log = []
-            today = date.today().isoformat()
-            for task in tasks:
-                if task['name'] in checked:
-                    completed_log.append({
-                        "name": task['name'],
-                        "xp": task['xp'],
-                        "category": task.get('category', task.get('tags', [])),
-                        "type": task_type,
-                        "date": today,
-                        "period_key": period_key
-                    })
-            progress['current_xp'] += earned_xp
-            progress['current_level'] = (progress['current_xp'] // 100) + 1
-            progress['xp_to_next_level'] = progress['current_level'] * 100 - progress['current_xp']
-            if 'detailed_logs' not in progress:
-                progress['detailed_logs'] = []
-            progress['detailed_logs'].extend(completed_log)
-            save_json_file(PROGRESS_FILE, progress)
-            
-            # Reset checkboxes for this category
-            for task_name in checked:
-                st.session_state.task_checks[f"{task_type}_{task_name}"] = False #reset the checkbox for the task
-            st.success(f"Submitted! You earned {earned_xp} XP for {task_type} tasks.")
-            st.rerun()
+            submit_checked_tasks({task_type: checked}, ctx)
+    return checked
 
+@fragment
 def render_money_tracking():
     """
     Renders the money tracking section.
@@ -412,64 +444,69 @@ def render_money_tracking():
                 submitted = st.form_submit_button("Add Spending")
                 if submitted and amount and description:
                     # Update money tracking
-                    money['total_spent'] = float(money['total_spent']) + float(amount)
-                    money['current_balance'] = float(money['current_balance']) - float(amount)
-                    money['spending_history'].append({
-                        'date': datetime.now().strftime("%Y-%m-%d"),
-                        'amount': float(amount),
-                        'description': description
-                    })
-                    save_json_file(REWARDS_FILE, st.session_state.rewards)
+                    record_events(st.session_state.files['rewards'], st.session_state.rewards, [{
+                        "event": "spending_added",
+                        "date": datetime.now().strftime("%Y-%m-%d"),
+                        "amount": float(amount),
+                        "description": description
+                    }])
                     st.success("Spending recorded!")
-                    st.rerun()
+                    rerun_fragment() # only the money section shows the balance
         else:
             st.info("No funds available to spend. Claim a reward to add money to your balance!")
-    # Display spending history
-    if money['spending_history']:
+    # Display spending history (pandas is only imported when it is shown)
+    if money['spending_history'] and st.toggle(f"Show spending history ({len(money['spending_history'])})", key="show_spending_history"):
+        import pandas as pd
         st.subheader("Spending History")
         history_df = pd.DataFrame(money['spending_history'])
         st.dataframe(history_df)
 
-def process_task_submission():
+def process_task_submission(checked, ctx=None):
     """
-    Processes the task submission.
+    Processes the task submission for any mix of task types as one transaction.
+    Completion counts, XP, level, the task logs and the daily_logs summary are applied together
+    with exactly one write; if anything fails, nothing is applied.
     Args:
-        None
+        checked (dict): The checked task dictionaries per task type, e.g. {"daily": [...], "weekly": [...]}.
+        ctx (dict): The period context of this rerun (see periods.py).
     Returns:
-        None
+        tuple: The XP earned, the completed task names per task type, whether the user leveled up and the new level.
     """
-    tasks = st.session_state.tasks
-    checks = st.session_state.task_checks
     progress = st.session_state.progress
-    today = date.today().isoformat()
-    completed = {"daily": [], "weekly": [], "monthly": [], "one_time": []} #list of completed tasks
-    earned_xp = 0
-    for ttype in ["daily", "weekly", "monthly", "one_time"]: #for each task type, check if the task is completed
-        for task in tasks[ttype]:
-            key = f"{ttype}_{task['name']}"
-            if checks.get(key, False):
-                completed[ttype].append(task['name']) # Add the task to the list of completed tasks
-                earned_xp += int(task['xp'])
-    # Update the progress
-    progress['current_xp'] += earned_xp
-    new_level = calculate_level(progress['current_xp']) #calculate the new level
-    leveled_up = new_level > progress['current_level'] #check if the user leveled up
-    progress['current_level'] = new_level #Update the current level
-    progress['xp_to_next_level'] = calculate_xp_to_next_level(progress['current_xp']) #calculate the XP needed to reach the next level
-    
-    # Log the day
-    progress['daily_logs'].append({
-        "date": today,
-        "completed": completed,
-        "earned_xp": earned_xp,
-        "level": progress['current_level']
-    })
-    save_json_file(PROGRESS_FILE, progress)
+    old_level = progress['current_level']
+    # Completion events for every task type plus the daily_logs entry for the day
+    events, completed, earned_xp = core.submission_events(checked, ctx)
+    record_events(st.session_state.files['progress'], progress, events)
+
+    new_level = progress['current_level']
+    leveled_up = new_level > old_level #check if the user leveled up
     # Reset checkboxes
-    for key in checks:
-        checks[key] = False
+    for ttype, names in completed.items():
+        for name in names:
+            key = f"{ttype}_{name}"
+            st.session_state.task_checks[key] = False
+            st.session_state.pop(key, None) # clear the checkbox widget so it renders unchecked
     return earned_xp, completed, leveled_up, new_level
 
+def submit_checked_tasks(checked, ctx=None):
+    """
+    Submits checked tasks, shows the result and reruns the app.
+    Args:
+        checked (dict): The checked task dictionaries per task type.
+        ctx (dict): The period context of this rerun (see periods.py).
+    Returns:
+        None
+    """
+    try:
+        earned_xp, completed, leveled_up, new_level = process_task_submission(checked, ctx)
+    except (storage.StaleStateError, ValueError) as e: # a concurrent write or an invalid event; anything else is a bug and is raised
+        st.error(f"Submission failed, nothing was saved: {e}")
+        return
+    st.success(f"Submitted! You earned {earned_xp} XP for {', '.join(completed)} tasks.")
+    if leveled_up:
+        st.balloons()
+    st.rerun()
+
 def reset_progress_and_rewards():
     """
     Resets the progress and rewards. Used when the user wants to reset their progress and rewards.
@@ -478,35 +515,10 @@ def reset_progress_and_rewards():
     Returns:
         None
     """
-    # Load initial states from files or hardcode them
-    initial_progress = {
-        "current_level": 1,
-        "current_xp": 0,
-        "xp_to_next_level": 100,
-        "daily_logs": [],
-        "detailed_logs": [],
-        "penalties": [],
-        "completed_tasks": {
-            "daily": {},
-            "weekly": {},
-            "monthly": {},
-            "one_time": []
-        }
-    }
-    initial_rewards = {
-        "rewards": [
-            {"level": lvl, "description": "$50 to spend on yourself", "claimed": False}
-            for lvl in range(5, 55, 5)
-        ],
-        "money_tracking": {
-            "total_earned": 0,
-            "total_spent": 0,
-            "current_balance": 0,
-            "spending_history": []
-        }
-    }
-    save_json_file(PROGRESS_FILE, initial_progress)
-    save_json_file(REWARDS_FILE, initial_rewards)
+    initial_progress = core.initial_progress()
+    initial_rewards = core.initial_rewards()
+    save_json_file(st.session_state.files['progress'], initial_progress, force=True)
+    save_json_file(st.session_state.files['rewards'], initial_rewards, force=True)
     st.session_state.progress = initial_progress
     st.session_state.rewards = initial_rewards
     if 'task_checks' in st.session_state:
@@ -517,42 +529,40 @@ def reset_progress_and_rewards():
 
 def get_xp_per_category():
     """
-    Gets the XP earned per category from the detailed_logs.
+    Gets the XP earned per category. The totals are kept up to date as tasks are logged and deleted,
+    so this does not scan the detailed_logs (run `python manage.py verify` to check them).
     Args:
         None
     Returns:
         dict: A dictionary with the category as the key and the XP earned as the value.
     """
-    # Aggregate XP earned per category from detailed_logs
-    progress = st.session_state.progress
-    if 'detailed_logs' not in progress:
-        return {}
-    xp_by_cat = {}
-    for entry in progress['detailed_logs']: #for each entry in the detailed_logs, add the XP earned to the category
-        for cat in entry.get('category', []): #for each category in the entry, add the XP earned to the category
-            xp_by_cat[cat] = xp_by_cat.get(cat, 0) + entry.get('xp', 0) #add the XP earned to the category
-    return xp_by_cat
+    return storage.xp_per_category(st.session_state.files['progress'], st.session_state.progress)
 
-def render_radar_chart():
+def chart_key(name, *parts):
     """
-    Renders the xp radar chart. 
+    Gets the chart cache key of a chart drawn from this session's tasks and progress (see charts.py).
     Args:
-        None
+        name (str): The chart name.
+        *parts: Anything else the chart depends on, e.g. the current period key.
     Returns:
+        tuple: The key. It changes whenever tasks.json or the progress changes.
+    """
+    files = st.session_state.files
+    return (name, files['progress'], st.session_state.progress.get('version'), files['tasks'], st.session_state.catalog['version']) + parts
+
+def build_radar_chart():
+    """
+    Builds the xp radar chart. The radial axis grows with the largest category XP instead of stopping at 1000.
+    plotly is imported here, the first time a chart is built, instead of when the app starts.
+    Args:
         None
+    Returns:
+        tuple: The figure and a message to show below it (None if there is XP to show).
     """
+    import plotly.graph_objects as go
     xp_by_cat = get_xp_per_category()
-    # Get all possible categories from tasks
-    tasks = st.session_state.tasks
-    all_cats = set()
-    for ttype in tasks: #for each task type, add the categories to the set
-        for task in tasks[ttype]:
-            cats = task.get('category', task.get('tags', []))
-            for cat in cats:
-                all_cats.add(cat)
-    all_cats = sorted(list(all_cats))
-    
-    categories = all_cats
+    # All categories of the tasks, sorted (collected once when tasks.json was compiled)
+    categories = list(st.session_state.catalog['categories'])
     values = [xp_by_cat.get(cat, 0) for cat in categories]
     msg = None
     if not any(v > 0 for v in values):
@@ -568,46 +578,189 @@ def render_radar_chart():
         polar=dict(
             radialaxis=dict(
                 visible=True, 
-                range=[0, 1000]  #Set the max value to 1000 XP (future update: allow the user to set the max value)
+                range=[0, charts.nice_ceiling(max(values, default=0))]  #round number just above the largest category XP
             )
         ),
         showlegend=False,
         margin=dict(l=20, r=20, t=20, b=20),
         height=350
     )
+    return fig, msg
+
+@timed
+def render_radar_chart():
+    """
+    Renders the xp radar chart. The figure is only built again when the tasks or the progress changed.
+    Args:
+        None
+    Returns:
+        None
+    """
+    fig, msg = charts.cached(chart_key("radar"), build_radar_chart)
     st.plotly_chart(fig, use_container_width=True)
     if msg:
         st.info(msg)
 
+def get_streak_stats():
+    """
+    Gets the streak statistics of the loaded progress. Progress files from before the statistics were
+    kept get them built once from the history; after that the event handlers keep them up to date.
+    Args:
+        None
+    Returns:
+        dict: progress['streaks'] (see streaks.py).
+    """
+    if 'streaks' not in st.session_state.progress:
+        storage.rebuild_streaks(st.session_state.files['progress'])
+        st.session_state.progress = load_json_file(st.session_state.files['progress'])
+    return st.session_state.progress['streaks']
+
+def build_streak_charts(stats, ctx):
+    """
+    Builds the completion rate heatmaps of the streaks panel.
+    Args:
+        stats (dict): progress['streaks'] (see streaks.py).
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        tuple: The daily heatmap figure and the weekly and monthly bar figures.
+    """
+    import plotly.graph_objects as go
+    tasks = st.session_state.tasks
+    cells = streaks.heatmap(stats, "daily", len(tasks['daily']), ctx['keys']['daily'], HEATMAP_DAYS)
+    rates, keys, weeks = streaks.day_grid(cells)
+    day_fig = go.Figure(data=[go.Heatmap(
+        z=rates, x=weeks, y=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], text=keys,
+        zmin=0, zmax=1, colorscale="Purples", showscale=False, xgap=2, ygap=2,
+        hovertemplate="%{text}: %{z:.0%} of daily tasks<extra></extra>"
+    )])
+    day_fig.update_layout(yaxis=dict(autorange="reversed"), margin=dict(l=20, r=20, t=20, b=20), height=250)
+    period_figs = []
+    for kind, count in (("weekly", HEATMAP_WEEKS), ("monthly", HEATMAP_MONTHS)):
+        cells = streaks.heatmap(stats, kind, len(tasks[kind]), ctx['keys'][kind], count)
+        fig = go.Figure(data=[go.Bar(
+            x=[key for key, _ in cells], y=[rate for _, rate in cells], marker_color='purple',
+            hovertemplate="%{x}: %{y:.0%}<extra></extra>"
+        )])
+        fig.update_layout(
+            title=f"{kind.capitalize()} tasks done", yaxis=dict(range=[0, 1], tickformat=".0%"),
+            margin=dict(l=20, r=20, t=40, b=20), height=250
+        )
+        period_figs.append(fig)
+    return day_fig, period_figs
+
+@timed
+def render_streaks_panel(ctx=None):
+    """
+    Renders the current and longest streaks and the completion rate heatmaps.
+    The numbers are read from the running statistics, so this costs the same for any length of history,
+    and the heatmaps are only built again when the progress changed or a new period started.
+    Args:
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        None
+    """
+    ctx = ctx or periods.period_context()
+    tasks = st.session_state.tasks
+    stats = get_streak_stats()
+    summary = streaks.summary(stats, ctx, tasks)
+    streaks_tab, days_tab, periods_tab = st.tabs(["Streaks", "Daily heatmap", "Weekly & monthly"])
+    with streaks_tab:
+        col1, col2 = st.columns(2)
+        col1.metric("Current streak", f"{summary['overall']['current']} days")
+        col2.metric("Longest streak", f"{summary['overall']['longest']} days")
+        if summary['categories']:
+            st.caption("By category: " + ", ".join(
+                f"{cat} {s['current']} days (best {s['longest']})" for cat, s in summary['categories'].items()
+            ))
+        units = {"daily": "days", "weekly": "weeks", "monthly": "months"}
+        st.dataframe(
+            [{"Task": t['name'], "Type": t['type'].capitalize(), "Current": f"{t['current']} {units[t['type']]}", "Longest": f"{t['longest']} {units[t['type']]}"}
+             for t in summary['tasks']],
+            hide_index=True, use_container_width=True
+        )
+    key = chart_key("streaks", ctx['keys']['daily'], ctx['keys']['weekly'], ctx['keys']['monthly'])
+    day_fig, period_figs = charts.cached(key, lambda: build_streak_charts(stats, ctx))
+    with days_tab:
+        st.plotly_chart(day_fig, use_container_width=True)
+    with periods_tab:
+        for fig in period_figs:
+            st.plotly_chart(fig, use_container_width=True)
+
+def build_trend_charts():
+    """
+    Builds the trend charts from the whole history. pandas is imported here (through analytics.py).
+    Args:
+        None
+    Returns:
+        tuple: The XP per category, level and completions per task figures, or None if there is no history yet.
+    """
+    import analytics
+    import plotly.graph_objects as go
+    logs, categories = analytics.load_frames(st.session_state.files['progress'], st.session_state.progress)
+    if logs.empty:
+        return None
+    weekly = analytics.xp_by_category(categories, "W-MON").tail(TREND_WEEKS)
+    xp_fig = go.Figure(data=[go.Bar(x=weekly.index, y=weekly[cat], name=str(cat)) for cat in weekly.columns])
+    xp_fig.update_layout(barmode="stack", margin=dict(l=20, r=20, t=20, b=20), height=300, legend=dict(orientation="h"))
+    curve = analytics.xp_over_time(logs, "D")
+    level_fig = go.Figure(data=[go.Scatter(x=curve.index, y=curve["level"], mode="lines", line_color="purple")])
+    level_fig.update_layout(yaxis_title="Level", margin=dict(l=20, r=20, t=20, b=20), height=300)
+    monthly = analytics.completions_by_task(logs, "MS").tail(TREND_MONTHS)
+    tasks_fig = go.Figure(data=[go.Heatmap(
+        z=monthly.T.values, x=[d.strftime("%Y-%m") for d in monthly.index], y=[str(name) for name in monthly.columns],
+        colorscale="Purples", hovertemplate="%{y}, %{x}: %{z}<extra></extra>"
+    )])
+    tasks_fig.update_layout(margin=dict(l=20, r=20, t=20, b=20), height=max(300, 20 * len(monthly.columns)))
+    return xp_fig, level_fig, tasks_fig
+
+@timed
+def render_trends():
+    """
+    Renders the history trends: XP per category per week, the level curve and completions per task per month.
+    The charts are only built again when the progress changed, so pandas is not even imported on other reruns.
+    Args:
+        None
+    Returns:
+        None
+    """
+    figs = charts.cached(chart_key("trends"), build_trend_charts)
+    if figs is None:
+        st.info("No history yet. Complete tasks to see your trends!")
+        return
+    tabs = st.tabs(["XP per category", "Level", "Completions per task"])
+    for tab, fig in zip(tabs, figs):
+        with tab:
+            st.plotly_chart(fig, use_container_width=True)
+
+@fragment
 def render_task_history():
     """
     Renders the task history with completion dates and delete buttons.
+    Pages are fetched with a cursor from the date-ordered history, so only the rows shown are read.
+    Paging reruns only this fragment; a delete reruns the whole app (it changes the XP).
     Args:
         None
     Returns:
         None
     """
     progress = st.session_state.progress
-    tasks = st.session_state.tasks
     
-    if 'detailed_logs' not in progress or not progress['detailed_logs']:
+    # Initialize paging state if not exists: a stack of cursors, one per page visited (None = newest page)
+    if 'history_cursors' not in st.session_state:
+        st.session_state.history_cursors = [None]
+    if 'history_page_size' not in st.session_state:
+        st.session_state.history_page_size = 3
+    
+    # Fetch only the current page of logs (newest first)
+    tasks_per_page = st.session_state.history_page_size
+    cursor = st.session_state.history_cursors[-1]
+    current_tasks, next_cursor, newer, total_logs = storage.history_page(st.session_state.files['progress'], progress, cursor, tasks_per_page)
+    if total_logs == 0:
         st.info("No task history yet. Complete some tasks to see your history!")
         return
-    
-    #Sort logs by completion date (newest first)
-    sorted_logs = sorted(progress['detailed_logs'], key=lambda x: x.get('date', ''), reverse=True)
-    
-    # Initialize page state if not exists
-    if 'task_history_page' not in st.session_state:
-        st.session_state.task_history_page = 0
-    
-    # Calculate number of pages
-    tasks_per_page = 3
-    total_pages = (len(sorted_logs) + tasks_per_page - 1) // tasks_per_page
-    if total_pages == 0: total_pages = 1 # Avoid page 1 of 0
-    start_idx = st.session_state.task_history_page * tasks_per_page
-    end_idx = min(start_idx + tasks_per_page, len(sorted_logs))
-    current_tasks = sorted_logs[start_idx:end_idx]
+    if not current_tasks and len(st.session_state.history_cursors) > 1: # the last page was emptied by a delete
+        st.session_state.history_cursors.pop()
+        rerun_fragment()
 
     # Title and Navigation on the same line (flattened to avoid nesting error)
     col1, col2, col3, col4 = st.columns([5, 2, 3, 2])
@@ -615,20 +768,35 @@ def render_task_history():
         st.markdown("#### Task History")
 
     with col2:
-        if st.button("← Prev", disabled=st.session_state.task_history_page == 0, use_container_width=True):
-            st.session_state.task_history_page -= 1
-            st.rerun()
+        if st.button("← Prev", disabled=len(st.session_state.history_cursors) == 1, use_container_width=True):
+            st.session_state.history_cursors.pop()
+            rerun_fragment()
 
     with col3:
-        st.markdown(f"<p style='text-align: center; white-space: nowrap;'>Page {st.session_state.task_history_page + 1} of {total_pages}</p>", unsafe_allow_html=True)
+        st.markdown(f"<p style='text-align: center; white-space: nowrap;'>{newer + 1}–{newer + len(current_tasks)} of {total_logs}</p>", unsafe_allow_html=True)
 
     with col4:
-        if st.button("Next →", disabled=st.session_state.task_history_page >= total_pages - 1, use_container_width=True):
-            st.session_state.task_history_page += 1
-            st.rerun()
+        if st.button("Next →", disabled=next_cursor is None, use_container_width=True):
+            st.session_state.history_cursors.append(next_cursor)
+            rerun_fragment()
+
+    # Page size and jump to date
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Per page", [3, 5, 10, 25], index=[3, 5, 10, 25].index(tasks_per_page))
+        if page_size != tasks_per_page:
+            st.session_state.history_page_size = page_size
+            st.session_state.history_cursors = [None]
+            rerun_fragment()
+    with col2:
+        jump_date = st.date_input("Jump to date", value=None, max_value=date.today())
+        if jump_date and st.session_state.get('history_jump_date') != jump_date:
+            st.session_state.history_jump_date = jump_date
+            st.session_state.history_cursors = [None, storage.date_cursor(jump_date)]
+            rerun_fragment()
     
     # Display current page of tasks
-    for i, log in enumerate(current_tasks):
+    for log in current_tasks:
         task_name = log.get('name', 'Unknown Task')
         completion_date = log.get('date', 'Unknown Date')
         xp_earned = log.get('xp', 0)
@@ -645,55 +813,72 @@ def render_task_history():
             st.write(f"{xp_earned} XP")
         
         with col3: #delete button
-            if st.button("🗑️", key=f"delete_task_{start_idx + i}", help="Delete this task and deduct XP"):
-                # Find the actual index in the full detailed_logs and remove it
-                actual_index = progress['detailed_logs'].index(log)
-                log_entry = progress['detailed_logs'].pop(actual_index)
-
-                task_type = log_entry.get('type')
-                xp_earned = log_entry.get('xp', 0)
-                log_name = log_entry.get('name', 'Unknown')
-
-                if task_type == 'penalty':
-                    penalty_id = log_entry.get('penalty_id')
-                    if penalty_id:
-                        # Find the penalty in the main list and mark as not completed
-                        for p in progress.get('penalties', []):
-                            if p.get('id') == penalty_id:
-                                p['completed'] = False
-                                break
+            if st.button("🗑️", key=f"delete_task_{log['id']}", help="Delete this task and deduct XP"):
+                # Remove this exact entry by its id and undo its effect
+                log_name = log.get('name', 'Unknown')
+                record_events(st.session_state.files['progress'], progress, [{"event": "log_deleted", "log_id": log['id'], "date": log['date']}])
+
+                if log.get('type') == 'penalty':
                     st.success(f"Penalty '{log_name}' restored.")
                 else: # It's a regular task
-                    task_name = log_entry.get('name')
-                    period_key = log_entry.get('period_key')
-
-                    # Decrement the completion count if period_key is available
-                    if task_type and task_name and period_key:
-                        counts = progress.get('completed_tasks', {}).get(task_type, {}).get(task_name, {})
-                        if counts and period_key in counts:
-                            counts[period_key] -= 1
-                            if counts[period_key] < 0:
-                                counts[period_key] = 0
-                    
-                    # Deduct XP
-                    progress['current_xp'] -= xp_earned
-                    if progress['current_xp'] < 0:
-                        progress['current_xp'] = 0
-                    
-                    # Recalculate level
-                    progress['current_level'] = (progress['current_xp'] // 100) + 1
-                    progress['xp_to_next_level'] = progress['current_level'] * 100 - progress['current_xp']
                     st.success(f"Task '{log_name}' deleted! {xp_earned} XP deducted.")
-                
-                save_json_file(PROGRESS_FILE, progress)
                 st.rerun()
         
         #add a small divider between tasks
         st.markdown("---")
     
     # Show total count
-    if sorted_logs:
-        st.caption(f"Total: {len(sorted_logs)} tasks completed")
+    st.caption(f"Total: {total_logs} tasks completed")
+
+@fragment
+def render_tasks(ctx):
+    """
+    Renders the daily, weekly, monthly and one-time task sections and the Submit All button.
+    Ticking a checkbox reruns only this fragment; submitting reruns the whole app.
+    Args:
+        ctx (dict): The full run's period context.
+    Returns:
+        None
+    """
+    # A fragment rerun is a run of its own, so it works out the current periods again
+    ctx = fragment_ctx(ctx)
+    tasks = st.session_state.tasks
+    checked = {
+        "daily": render_task_section("daily", tasks['daily'], ctx),
+        "weekly": render_task_section("weekly", tasks['weekly'], ctx),
+        "monthly": render_task_section("monthly", tasks['monthly'], ctx),
+        "one-time": render_task_section("one-time", tasks['one_time'], ctx),
+    }
+    checked = {ttype: tasks for ttype, tasks in checked.items() if tasks}
+    # Submit everything checked across all task types at once
+    if checked and st.button("Submit All Checked", type="primary"):
+        submit_checked_tasks(checked, ctx)
+
+@fragment
+def render_rewards():
+    """
+    Renders the rewards with the progress toward each one. Claiming reruns the whole app (it changes the balance).
+    Args:
+        None
+    Returns:
+        None
+    """
+    st.subheader("Available Rewards")
+    for reward in st.session_state.rewards['rewards']:
+        reward_level = reward['level']
+        desc = f"Level {reward_level}: {reward['description']}"
+        if reward['claimed']:
+            st.success(f"{desc} — Completed!")
+        else:
+            st.info(desc)
+            # Progress bar toward this reward
+            progress = min(st.session_state.progress['current_level'] / reward_level, 1.0)
+            st.progress(progress, text=f"Progress: Level {st.session_state.progress['current_level']} / {reward_level}")
+            if core.claimable(reward, st.session_state.progress['current_level']):
+                if st.button(f"Claim Reward", key=f"claim_{reward_level}"):
+                    # Mark claimed and update money tracking when claiming reward
+                    record_events(st.session_state.files['rewards'], st.session_state.rewards, [core.reward_claimed_event(reward_level)])
+                    st.rerun()
 
 def main():
     """
@@ -708,10 +893,18 @@ def main():
         page_icon="🎮",
         layout="wide"
     )
+    if SCHEDULER_IN_APP:
+        start_scheduler()
     initialize_session_state()
+    if WATCH_FILES and live_updates:
+        live_updates() # draws nothing; pulls in changes made elsewhere while the page is open
+    # Work out the current periods once, so every section of this rerun sees the same "now"
+    ctx = periods.period_context()
     # Sidebar: Reset Progress Button with PIN and Undo
     with st.sidebar:
         st.header("Settings")
+        if tenants.enabled():
+            st.caption(f"Player: {st.session_state.user}")
         if 'show_pin_input' not in st.session_state:
             st.session_state.show_pin_input = False
         if 'reset_pin' not in st.session_state:
@@ -736,6 +929,27 @@ def main():
                     st.error("Incorrect PIN. Progress was not deleted.")
                     st.session_state.clear_pin = True
                     st.session_state.show_pin_input = False
+        with st.expander("Diagnostics"):
+            stats = storage.cache_stats()
+            st.caption(f"Load cache: {stats['hits']} hits, {stats['misses']} misses, {stats['files']}/{stats['limit']} files, {stats['evictions']} evicted")
+            chart_stats = charts.cache_stats()
+            st.caption(f"Chart cache: {chart_stats['hits']} hits, {chart_stats['misses']} misses, {chart_stats['charts']}/{chart_stats['limit']} charts")
+            locks = storage.lock_stats()
+            st.caption(
+                f"File locks: {locks['acquisitions']} taken, {locks['wait_seconds'] * 1000:.1f} ms total wait "
+                f"(max {locks['max_wait_seconds'] * 1000:.1f} ms), {locks['conflicts']} rebased writes, {locks['stale_saves']} refused saves"
+            )
+            if WATCH_FILES:
+                watch = watcher.status()
+                st.caption(f"File watcher ({watch['mode']}): {watch['files']} files, {watch['reloads']} reloads, {watch['errors']} errors")
+            runs = scheduler.next_runs(ctx)
+            st.caption("Next rollovers: " + ", ".join(f"{period_type} {when:%a %b %d %H:%M}" for period_type, when in runs.items()))
+            if SCHEDULER_IN_APP:
+                last_run = scheduler.status()['last_run']
+                st.caption(f"Nightly check runs in this app; last run: {f'{last_run:%b %d %H:%M}' if last_run else 'not yet'}")
+            render_times = st.session_state.get('render_times')
+            if render_times:
+                st.caption("Last render times: " + ", ".join(f"{name.removeprefix('render_')} {ms:.0f} ms" for name, ms in render_times.items()))
 
     # Header
     st.title("Level Up: Progress Tracker")
@@ -753,46 +967,43 @@ def main():
     # Task History and Radar Chart
     radar_col, history_col = st.columns(2)
     with radar_col:
-        st.markdown("#### XP Earned by Category")
-        render_radar_chart()
+        # The chart is drawn into this slot at the end of the script, after the rest of the page is on screen
+        with st.expander("XP Earned by Category", expanded=True):
+            radar_slot = st.empty()
+            radar_slot.caption("Loading chart...")
     with history_col:
         # Create a compact, scrollable task history
         with st.container():
             render_task_history()
 
+    with st.expander("Streaks & Consistency"):
+        streaks_slot = st.empty()
+        streaks_slot.caption("Loading streaks...")
+    with st.expander("Trends"):
+        trends_slot = st.empty()
+        trends_slot.caption("Loading trends...")
+
     # Main Content
     col1, col2 = st.columns([2, 1])
     with col1:
         # Task Sections are now self-contained with their dividers
-        render_task_section("daily", st.session_state.tasks['daily'])
-        render_task_section("weekly", st.session_state.tasks['weekly'])
-        render_task_section("monthly", st.session_state.tasks['monthly'])
-        render_task_section("one-time", st.session_state.tasks['one_time'])
+        share_ctx(ctx)
+        render_tasks(ctx)
         render_penalties_section()
     with col2:
         # Money Tracking Section
         render_money_tracking()
         st.markdown("---")
         # Rewards Section
-        st.subheader("Available Rewards")
-        for reward in st.session_state.rewards['rewards']:
-            reward_level = reward['level']
-            desc = f"Level {reward_level}: {reward['description']}"
-            if reward['claimed']:
-                st.success(f"{desc} — Completed!")
-            else:
-                st.info(desc)
-                # Progress bar toward this reward
-                progress = min(st.session_state.progress['current_level'] / reward_level, 1.0)
-                st.progress(progress, text=f"Progress: Level {st.session_state.progress['current_level']} / {reward_level}")
-                if st.session_state.progress['current_level'] >= reward_level:
-                    if st.button(f"Claim Reward", key=f"claim_{reward_level}"):
-                        reward['claimed'] = True
-                        # Update money tracking when claiming reward
-                        st.session_state.rewards['money_tracking']['total_earned'] = float(st.session_state.rewards['money_tracking']['total_earned']) + 50
-                        st.session_state.rewards['money_tracking']['current_balance'] = float(st.session_state.rewards['money_tracking']['current_balance']) + 50
-                        save_json_file(REWARDS_FILE, st.session_state.rewards)
-                        st.rerun()
+        render_rewards()
+
+    # Deferred sections: the heavy chart libraries load only after everything above has been sent to the browser
+    with radar_slot.container():
+        render_radar_chart()
+    with streaks_slot.container():
+        render_streaks_panel(ctx)
+    with trends_slot.container():
+        render_trends()
 
 if __name__ == "__main__": #run the main function
     main() 
\ No newline at end of file
@@ -1,13 +1,29 @@
 #imports
+import argparse
+import contextlib
+import glob
+import io
 import json
 import os
-import random
-from datetime import date, timedelta, datetime
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import storage
+import retention
+import periods
+import core
+import tenants
+import catalog
 
 #The purpose of this script is to enforces accountability for daily tasks, even if the main app is not running.
 #Assigns penalties for uncompleted daily tasks after the grace period (e.g., at 1:00 AM every day).
+#The last checked day is stored in progress.json, so a run after missed nights catches up on every
+#unchecked day, and running it again on the same day does nothing.
 #This script is meant to be run automatically (in my case by a cron job at 1:00 AM), so penalties are assigned even if the Streamlit app is closed.
 #set up cron job: 0 1 * * * /path/to/python /path/to/auto_reset.py
+#With LEVELUP_TENANTS_DIR set (see tenants.py), one run checks every player's folder.
+#Folders can also be given on the command line, e.g. auto_reset.py '/srv/levelup/users/*' --workers 8 --report sweep.json;
+#several folders are checked in parallel worker processes and a summary is printed at the end.
 
 
 
@@ -20,123 +36,193 @@ PROGRESS_FILE = os.path.join(DATA_DIR, "progress.json")
 TASKS_FILE = os.path.join(DATA_DIR, "tasks.json")
 
 
-def load_json(file_path):
+### Main Logic
+def check_player(progress_file, tasks_file, ctx):
     """
-    Loads a JSON file.
+    Checks one player's uncompleted daily tasks on every day since the last check, assigns penalties and archives closed periods.
     Args:
-        file_path (str): The path to the JSON file.
+        progress_file (str): The path to the player's progress.json.
+        tasks_file (str): The path to the player's tasks.json.
+        ctx (dict): The period context of this run (see periods.py).
     Returns:
-        dict: The contents of the JSON file as a dictionary.
+        dict: The number of days checked, the number of missed tasks, the assigned penalties and the number of
+            archived periods, or None if the player's files are missing or tasks.json is invalid.
     """
-    with open(file_path, 'r') as f:
-        return json.load(f)
+    # Repair anything left behind if the app (or a previous run) crashed while writing
+    for action in storage.recover(progress_file):
+        print(f"Recovered progress.json: {action}")
 
-def save_json(file_path, data):
+    try:
+        progress = storage.load(progress_file)
+        tasks = catalog.load(tasks_file)['tasks']
+    except FileNotFoundError:
+        print(f"Error: Could not find tasks.json or progress.json in {os.path.dirname(progress_file)}. Skipping.")
+        return None
+    except catalog.TaskCatalogError as e:
+        print(f"Error: {e}\nNo penalties assigned; fix tasks.json and run again.")
+        return None
+
+    # Every day after the last checked one, up to the last closed day (just yesterday on a normal night; before 1:00 AM yesterday is still open)
+    days = core.days_to_check(progress, ctx)
+    result = {"days": len(days), "missed": 0, "penalties": [], "archived": 0}
+    if not days:
+        print(f"Daily tasks up to {core.last_closed_day(ctx)} were already checked. No penalties assigned.")
+    else:
+        if len(days) == 1:
+            print(f"Checking for uncompleted daily tasks from {days[0]}...")
+        else:
+            print(f"Catching up on {len(days)} unchecked days ({days[0]} to {days[-1]})...")
+
+        daily_tasks = tasks['daily']
+        if not daily_tasks:
+            print("No daily tasks found in tasks.json.")
+
+        # Count the daily tasks that were NOT completed on each day, and assign one penalty per day with misses
+        missed, result["penalties"] = core.check_missed_days(progress_file, progress, daily_tasks, ctx)
+        for day_key, names in missed.items():
+            for task_name in names:
+                print(f"- Task '{task_name}' was not completed on {day_key}.")
+        result["missed"] = sum(len(names) for names in missed.values())
+
+        print(f"Found {result['missed']} uncompleted daily task(s).")
+        for penalty in result["penalties"]:
+            print(f"Successfully updated progress.json with a new penalty: {penalty['description']} (for {penalty['missed_date']}).")
+        if not result["penalties"]:
+            print("All daily tasks were completed. No penalties assigned.")
+
+    # Move closed periods out of completed_tasks so the file the app loads stays small
+    result["archived"] = retention.archive_closed_periods(progress_file, ctx['today'])
+    if result["archived"]:
+        print(f"Archived {result['archived']} closed period count(s) to {os.path.basename(storage.archive_path(progress_file))}.")
+    return result
+
+def check_folder(folder, ctx):
     """
-    Saves data to a JSON file.
+    Checks the player in one data folder, keeping its output so parallel runs don't mix their lines.
+    Runs in a worker process during a batch run, so it must not raise.
     Args:
-        file_path (str): The path to the JSON file.
-        data (dict): The data to save to the JSON file.
+        folder (str): The player's data folder.
+        ctx (dict): The period context of this run (see periods.py).
     Returns:
-        None
+        dict: The folder, the check result (see check_player), the error text (or None), the output and the time taken.
     """
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
-
-def assign_penalties(progress, unchecked_count):
+    started = time.perf_counter()
+    output = io.StringIO()
+    result, error = None, None
+    try:
+        with contextlib.redirect_stdout(output):
+            result = check_player(os.path.join(folder, "progress.json"), os.path.join(folder, "tasks.json"), ctx)
+        if result is None:
+            error = "tasks.json or progress.json is missing, or tasks.json is invalid"
+    except Exception as e: # one broken folder must not stop the check for everyone else
+        error = f"{type(e).__name__}: {e}"
+    return {"folder": folder, "result": result, "error": error, "output": output.getvalue(), "seconds": time.perf_counter() - started}
+
+def expand_folders(patterns):
     """
-    Assigns penalties based on the number of uncompleted daily tasks.
+    Turns folder names and glob patterns (e.g. /srv/levelup/users/*) into a list of data folders.
     Args:
-        progress (dict): The progress dictionary.
-        unchecked_count (int): The number of uncompleted daily tasks.
+        patterns (list): Folder paths or glob patterns.
     Returns:
-        dict: The updated progress dictionary.
+        list: The matching folders, without duplicates, in the order given.
     """
-    penalties = progress.get('penalties', [])
-    today = date.today()
-    tomorrow = (today + timedelta(days=1)).isoformat()
-    
-    small_penalties = [
-        "Vacuum floor",
-        "15 min stretching/meditating",
-        "Take stairs instead of elevator for the day"
-    ]
-    big_penalties = [
-        "1 mile run",
-        "Cold shower"
-    ]
-
-    if unchecked_count == 1:
-        penalty_desc = random.choice(small_penalties)
-        penalties.append({
-            'id': f"pen-{datetime.now().timestamp()}-{random.randint(1000,9999)}",
-            'due_date': tomorrow,
-            'description': penalty_desc,
-            'completed': False
-        })
-    elif unchecked_count >= 2:
-        penalty_desc = random.choice(big_penalties)
-        penalties.append({
-            'id': f"pen-{datetime.now().timestamp()}-{random.randint(1000,9999)}",
-            'due_date': tomorrow,
-            'description': penalty_desc,
-            'completed': False
-        })
-    
-    progress['penalties'] = penalties
-    save_json(PROGRESS_FILE, progress)
-    return progress
-
-### Main Logic
-def main():
+    folders = []
+    for pattern in patterns:
+        for folder in sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]:
+            folder = os.path.abspath(folder)
+            if os.path.isdir(folder) and folder not in folders:
+                folders.append(folder)
+    return folders
+
+def sweep(folders, ctx, workers):
     """
-    Checks for uncompleted daily tasks from yesterday and assigns penalties.
+    Checks many data folders, using up to workers processes at a time.
+    Every penalty is appended to its own player's progress under that file's lock, so a
+    worker that dies only loses the players it had not reached yet.
     Args:
-        None
+        folders (list): The data folders.
+        ctx (dict): The period context of this run, shared by every player.
+        workers (int): The most worker processes to run at once (1 checks them in this process).
     Returns:
-        None
+        list: The check_folder results, in the order of folders.
     """
-    print(f"Running daily check for {date.today()}...")
+    if workers <= 1 or len(folders) <= 1:
+        return [check_folder(folder, ctx) for folder in folders]
+    with ProcessPoolExecutor(max_workers=min(workers, len(folders))) as pool:
+        return list(pool.map(check_folder, folders, [ctx] * len(folders)))
 
-    try:
-        progress = load_json(PROGRESS_FILE)
-        tasks = load_json(TASKS_FILE)
-    except FileNotFoundError:
-        print(f"Error: Could not find tasks.json or progress.json in {DATA_DIR}. Exiting.")
-        return
-
-    # Determine yesterday's period key for daily tasks
-    yesterday = date.today() - timedelta(days=1)
-    yesterday_key = yesterday.strftime("%Y-%m-%d")
-    
-    print(f"Checking for uncompleted daily tasks from {yesterday_key}...")
-
-    # Get all daily tasks
-    daily_tasks = tasks.get('daily', [])
-    if not daily_tasks:
-        print("No daily tasks found in tasks.json.")
-        return
-
-    # Get completed daily tasks from progress
-    completed_daily = progress.get('completed_tasks', {}).get('daily', {})
-
-    # Count how many daily tasks were NOT completed yesterday
-    unchecked_count = 0
-    for task in daily_tasks:
-        task_name = task['name']
-        # Check if the task was logged as completed for yesterday
-        if task_name not in completed_daily or yesterday_key not in completed_daily.get(task_name, {}):
-            unchecked_count += 1
-            print(f"- Task '{task_name}' was not completed.")
-
-    print(f"Found {unchecked_count} uncompleted daily task(s) from yesterday.")
-
-    # Assign penalties if there were any unchecked tasks
-    if unchecked_count > 0:
-        progress = assign_penalties(progress, unchecked_count)
-        print("Successfully updated progress.json with new penalties.")
+def summarize(results, day, wall_seconds, workers):
+    """
+    Builds the report of a run.
+    Args:
+        results (list): The check_folder results.
+        day (date): The day of the run.
+        wall_seconds (float): The time the whole run took.
+        workers (int): The number of worker processes used.
+    Returns:
+        dict: The day, players processed, penalties assigned, failures (folder -> error), periods archived, wall time and workers.
+    """
+    return {
+        "date": day.isoformat(),
+        "players": len(results),
+        "penalties": sum(len(r['result']['penalties']) for r in results if r['result']),
+        "archived": sum(r['result']['archived'] for r in results if r['result']),
+        "failures": {r['folder']: r['error'] for r in results if r['error']},
+        "wall_seconds": round(wall_seconds, 3),
+        "workers": workers,
+    }
+
+def main(argv=None):
+    """
+    Checks for uncompleted daily tasks on the days since the last check and assigns penalties.
+    Without folders it checks data/, or every player in multi-player mode (see tenants.py).
+    Args:
+        argv (list): The command line arguments (default: sys.argv[1:]).
+    Returns:
+        dict: The run summary (see summarize).
+    """
+    parser = argparse.ArgumentParser(description="Assign penalties for yesterday's missed daily tasks")
+    parser.add_argument("folders", nargs="*", help="data folders or glob patterns to check (default: data/, or every player)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="worker processes for several folders (default: up to 4)")
+    parser.add_argument("--report", help="also write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    ctx = periods.period_context() # one "now" for the whole run, shared by every player
+    print(f"Running daily check for {ctx['today']}...")
+    if args.folders:
+        folders = expand_folders(args.folders)
+    elif tenants.enabled():
+        folders = [folder for _, folder in tenants.all_data_dirs()]
+        print(f"Checking {len(folders)} player(s) in {tenants.TENANTS_DIR}...")
+    else:
+        folders = None
+
+    if folders is None:
+        # Single player: check data/ directly, printing as it goes
+        results = [{"folder": DATA_DIR, "result": check_player(PROGRESS_FILE, TASKS_FILE, ctx), "error": None}]
+        if results[0]['result'] is None:
+            results[0]['error'] = "tasks.json or progress.json is missing"
+        workers = 1
     else:
-        print("All daily tasks were completed. No penalties assigned.")
+        workers = max(1, min(args.workers, len(folders)))
+        results = sweep(folders, ctx, workers)
+        for r in results:
+            print(f"\n[{os.path.basename(r['folder'])}]")
+            print(r['output'], end="")
+            if r['error']:
+                print(f"Error: {r['error']}")
+
+    summary = summarize(results, ctx['today'], time.perf_counter() - started, workers)
+    if folders is not None:
+        print(
+            f"\nSummary: {summary['players']} player(s) checked, {summary['penalties']} penalt{'y' if summary['penalties'] == 1 else 'ies'} assigned, "
+            f"{len(summary['failures'])} failure(s), {summary['wall_seconds']:.2f}s with {workers} worker(s)."
+        )
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(summary, f, indent=4)
+    return summary
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(1 if main()['failures'] else 0)
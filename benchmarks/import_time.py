@@ -0,0 +1,97 @@
+#imports
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+#Measures how long it takes a fresh Python process to import the app's modules.
+#Usage: python benchmarks/import_time.py [--repeat 10] [--modules core,auto_reset,app] [--output FILE]
+#Each import runs in a new interpreter, so nothing is cached between runs, and only the import
+#itself is timed (not the interpreter start-up). core.py and the other headless modules must not
+#load Streamlit, pandas or plotly; the script exits with status 1 if they do.
+
+HEAVY_MODULES = ("streamlit", "pandas", "plotly", "numpy")
+HEADLESS_MODULES = ("core", "storage", "periods", "retention", "auto_reset")
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(elapsed, ",".join(heavy))
+"""
+
+
+### Measurement
+
+def import_once(module):
+    """
+    Imports a module in a fresh interpreter.
+    Args:
+        module (str): The module name.
+    Returns:
+        tuple: (import time in seconds, list of heavy modules it loaded), or None if the import failed.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=REPO_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    elapsed, _, heavy = result.stdout.strip().splitlines()[-1].partition(" ")
+    return float(elapsed), [name for name in heavy.split(",") if name]
+
+def measure(module, repeat):
+    """
+    Imports a module repeat times, each in a fresh interpreter.
+    Args:
+        module (str): The module name.
+        repeat (int): The number of runs.
+    Returns:
+        dict: median and min import time in milliseconds and the heavy modules loaded, or an error.
+    """
+    runs = [import_once(module) for _ in range(repeat)]
+    if any(run is None for run in runs):
+        return {"error": "import failed (missing dependency?)"}
+    times = [run[0] * 1000 for run in runs]
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "heavy_modules": runs[-1][1]}
+
+def main():
+    """
+    Parses the command line, measures the imports and prints (and optionally writes) the results.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Measure module import times")
+    parser.add_argument("--repeat", type=int, default=10, help="fresh interpreters per module (default: 10)")
+    parser.add_argument("--modules", default="core,auto_reset,app", help="comma separated modules (default: core,auto_reset,app)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+    results = {}
+    failed = False
+    for module in args.modules.split(","):
+        result = results[module] = measure(module, args.repeat)
+        if "error" in result:
+            print(f"{module:<12} {result['error']}")
+            continue
+        heavy = ", ".join(result['heavy_modules']) or "none"
+        print(f"{module:<12} median {result['median_ms']:>8.1f} ms   min {result['min_ms']:>8.1f} ms   heavy imports: {heavy}")
+        if module in HEADLESS_MODULES and result['heavy_modules']:
+            print(f"  {module} must not import {heavy}")
+            failed = True
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
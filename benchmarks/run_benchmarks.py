@@ -0,0 +1,348 @@
+#imports
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+#Times the app's data paths headless against synthetic histories of growing size.
+#Usage: python benchmarks/run_benchmarks.py [--years 1,3,10] [--tasks 40] [--repeat 5] [--output results.json]
+#
+#Streamlit is replaced by a stub module before app.py is imported: widgets return their default
+#value, buttons are never pressed and layout calls do nothing, so render functions run their data
+#code without a browser. Each size gets fresh files from synthetic.py in a temp folder.
+#Results are written as JSON (one record per size and benchmark, plus the git commit and machine)
+#so runs from different versions can be compared.
+
+
+### Streamlit Stub
+
+class _SessionState(dict):
+    """
+    Dictionary with attribute access, like st.session_state.
+    """
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+class _Block:
+    """
+    A layout element (column, expander, sidebar, ...): usable as a context manager and
+    forwards widget calls to the stub module.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(sys.modules["streamlit"], name)
+
+class _Rerun(Exception):
+    """
+    Raised by the stub st.rerun(), which would stop the script in Streamlit.
+    """
+
+def _noop(*args, **kwargs):
+    return None
+
+class _Anything:
+    """
+    Stands in for a missing plotting or table library: every attribute and call returns another _Anything.
+    """
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Anything()
+
+    def __call__(self, *args, **kwargs):
+        return _Anything()
+
+    def __iter__(self):
+        return iter(())
+
+    def __getitem__(self, key):
+        return _Anything()
+
+    def __setitem__(self, key, value):
+        pass
+
+def _module_getattr(name):
+    """
+    Module-level __getattr__ for the stubs: any function the app calls draws nothing.
+    """
+    if name.startswith("__"):
+        raise AttributeError(name) # keep the import system's lookups (__path__, __spec__, ...) working
+    return _noop
+
+def make_streamlit_stub():
+    """
+    Builds the stub streamlit module.
+    Returns:
+        types.ModuleType: The module, to be put in sys.modules["streamlit"].
+    """
+    st = types.ModuleType("streamlit")
+    st.session_state = _SessionState()
+    st.sidebar = _Block()
+    st.columns = lambda spec, **kwargs: [_Block() for _ in range(spec if isinstance(spec, int) else len(spec))]
+    st.tabs = lambda labels: [_Block() for _ in labels]
+    st.expander = lambda *args, **kwargs: _Block()
+    st.container = lambda *args, **kwargs: _Block()
+    st.empty = lambda: _Block()
+    st.form = lambda *args, **kwargs: _Block()
+    st.button = lambda *args, **kwargs: False
+    st.form_submit_button = lambda *args, **kwargs: False
+    st.checkbox = lambda label, value=False, **kwargs: value
+    st.toggle = st.checkbox
+    st.selectbox = lambda label, options, index=0, **kwargs: list(options)[index] if options else None
+    st.radio = st.selectbox
+    st.date_input = lambda label, value=None, **kwargs: value
+    st.number_input = lambda label, min_value=None, value=None, **kwargs: value if value is not None else min_value
+    st.text_input = lambda label, value="", **kwargs: value
+
+    def rerun(scope="app"):
+        raise _Rerun()
+    st.rerun = rerun
+    st.cache_data = lambda *args, **kwargs: (args[0] if args and callable(args[0]) else (lambda func: func))
+    st.cache_resource = st.cache_data
+    st.fragment = st.cache_data # fragments run as normal functions
+    st.__getattr__ = _module_getattr # everything else (write, markdown, caption, ...) draws nothing
+    return st
+
+def stub_missing_libraries():
+    """
+    Puts stand-ins for pandas and plotly in sys.modules if they are not installed, so charts and tables draw nothing.
+    Args:
+        None
+    Returns:
+        list: The names of the stubbed modules.
+    """
+    stubbed = []
+    for name in ("pandas", "plotly", "plotly.express", "plotly.graph_objects"):
+        top = name.split(".")[0]
+        if top in stubbed or importlib.util.find_spec(top) is None: # checked without importing, so start-up timings stay honest
+            module = types.ModuleType(name)
+            module.__getattr__ = lambda attr: _module_getattr(attr) and _Anything()
+            sys.modules[name] = module
+            stubbed.append(name)
+            parent, _, child = name.rpartition(".")
+            if parent in sys.modules:
+                setattr(sys.modules[parent], child, module) # so "import plotly.graph_objects as go" finds the stub
+    return stubbed
+
+def import_app():
+    """
+    Imports app.py and auto_reset.py with Streamlit stubbed out.
+    Plotting and table libraries are only stubbed if they are not installed; none of the timed paths draw charts.
+    Returns:
+        tuple: (app module, auto_reset module)
+    """
+    sys.modules["streamlit"] = make_streamlit_stub()
+    stub_missing_libraries()
+    os.environ.setdefault("LEVELUP_WATCH", "0") # the benchmarks change files under the app; turned on only for session_reload_watched
+    import app
+    import auto_reset
+    return app, auto_reset
+
+
+### Benchmarks
+
+def time_it(func, repeat):
+    """
+    Runs func repeat times.
+    Args:
+        func (function): The code to time; a stub st.rerun() inside it counts as finished.
+        repeat (int): The number of runs.
+    Returns:
+        dict: min, median and max wall time in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            func()
+        except _Rerun:
+            pass
+        times.append((time.perf_counter() - started) * 1000)
+    return {"min_ms": min(times), "median_ms": statistics.median(times), "max_ms": max(times), "runs": repeat}
+
+def point_app_at(app, auto_reset, folder):
+    """
+    Points the app and the cron script at the synthetic files and loads them into the session state.
+    """
+    import storage
+    app.DATA_DIR = auto_reset.DATA_DIR = folder
+    app.TASKS_FILE = auto_reset.TASKS_FILE = os.path.join(folder, "tasks.json")
+    app.PROGRESS_FILE = auto_reset.PROGRESS_FILE = os.path.join(folder, "progress.json")
+    app.REWARDS_FILE = os.path.join(folder, "rewards.json")
+    storage.clear_cache()
+    app.st.session_state.clear()
+    app.initialize_session_state()
+
+def run_size(app, auto_reset, folder, repeat):
+    """
+    Runs every benchmark against one synthetic data folder.
+    Args:
+        app (module): The app module.
+        auto_reset (module): The auto_reset module.
+        folder (str): The folder with tasks.json, progress.json and rewards.json.
+        repeat (int): Runs per benchmark.
+    Returns:
+        dict: Benchmark name -> timings.
+    """
+    import periods
+    import storage
+    point_app_at(app, auto_reset, folder)
+    st = app.st
+    ctx = periods.period_context() # one per rerun, as in app.main()
+    tasks = st.session_state.tasks
+    all_tasks = [(ttype, task) for ttype in ('daily', 'weekly', 'monthly', 'one_time') for task in tasks[ttype]]
+
+    def cold_load():
+        storage.clear_cache()
+        storage.load(app.PROGRESS_FILE)
+
+    def history_first_page():
+        st.session_state.pop('history_cursors', None)
+        app.render_task_history()
+
+    # Cursor for the page with the oldest entries, the worst case for a list that is sorted on every rerun
+    logs = st.session_state.progress.get('detailed_logs')
+    oldest = [None, storage.date_cursor(datetime.strptime(min(log['date'] for log in logs), "%Y-%m-%d").date())] if logs else [None]
+
+    def history_deep_page():
+        st.session_state.history_cursors = list(oldest)
+        app.render_task_history()
+
+    def completion_counts():
+        for ttype, task in all_tasks:
+            app.get_task_completion_count(st.session_state.progress, ttype, task['name'], ctx)
+
+    def task_sections():
+        for ttype in ('daily', 'weekly', 'monthly'):
+            app.render_task_section(ttype, tasks[ttype], ctx)
+
+    def mark_completed():
+        app.mark_tasks_completed(st.session_state.progress, 'daily', tasks['daily'][:1], ctx)
+
+    def streaks_rebuild():
+        storage.rebuild_streaks(app.PROGRESS_FILE)
+        app.initialize_session_state()
+
+    def streaks_panel():
+        app.render_streaks_panel(ctx)
+
+    def session_reload():
+        app.initialize_session_state()
+
+    def session_reload_watched():
+        app.WATCH_FILES = True
+        try:
+            app.initialize_session_state()
+        finally:
+            app.WATCH_FILES = False
+
+    def full_rerun():
+        app.main()
+
+    def tasks_fragment():
+        app.render_tasks(ctx) # as Streamlit reruns a fragment: with the ctx of the last full run
+
+    def cron_run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            auto_reset.main([])
+
+    benchmarks = [
+        ("load_progress_cold", cold_load),
+        ("get_xp_per_category", app.get_xp_per_category),
+        ("render_task_history_first_page", history_first_page),
+        ("render_task_history_oldest_page", history_deep_page),
+        ("get_task_completion_count_all_tasks", completion_counts),
+        ("render_task_sections", task_sections),
+        ("mark_tasks_completed", mark_completed),
+        ("streaks_rebuild_full_history", streaks_rebuild),
+        ("render_streaks_panel", streaks_panel),
+        ("session_reload_unchanged", session_reload),
+        ("session_reload_watched", session_reload_watched),
+        ("rerun_full_app", full_rerun),
+        ("rerun_tasks_fragment", tasks_fragment),
+        ("auto_reset_main", cron_run),
+    ]
+    results = {}
+    for name, func in benchmarks:
+        results[name] = time_it(func, repeat)
+    return results
+
+def git_commit():
+    """
+    Gets the current git commit of the repository, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    """
+    Parses the command line, runs the benchmarks for each size and writes the results.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Level Up data paths")
+    parser.add_argument("--years", default="1,3,10", help="comma separated years of history to generate (default: 1,3,10)")
+    parser.add_argument("--tasks", type=int, default=40, help="number of tasks (default: 40)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"), help="where to write the JSON results")
+    args = parser.parse_args()
+
+    import synthetic
+    app, auto_reset = import_app()
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "storage": os.environ.get("LEVELUP_STORAGE", "json"),
+        "repeat": args.repeat,
+        "sizes": [],
+    }
+    for years in (float(y) for y in args.years.split(",")):
+        with tempfile.TemporaryDirectory() as folder:
+            counts = synthetic.generate(folder, years, args.tasks, seed=args.seed)
+            results = run_size(app, auto_reset, folder, args.repeat)
+        report["sizes"].append({"years": years, "tasks": args.tasks, "counts": counts, "results": results})
+        print(f"\n{years:g} year(s): {counts['logs']:,} logs, {counts['tasks']} tasks")
+        for name, timing in results.items():
+            print(f"  {name:<38} median {timing['median_ms']:>9.2f} ms   min {timing['min_ms']:>9.2f} ms")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#imports
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import snapshot_format
+
+#Compares the "json" and "compact" snapshot formats for a progress file with many log entries.
+#Usage: python benchmarks/snapshot_formats.py [--sizes 1000,100000,1000000] [--repeat 3]
+#For each size it reports the file size and the best save (encode + write) and load
+#(read + decode) time of each format, and checks that both formats round-trip.
+
+
+### Data
+
+TASKS = [
+    ("Workout", 20, ["Health"], "daily"), ("Read 20 pages", 10, ["Learning"], "daily"),
+    ("Meditate", 10, ["Mind", "Health"], "daily"), ("Meal prep", 30, ["Health"], "weekly"),
+    ("Side project", 50, ["Career", "Learning"], "weekly"), ("Deep clean", 40, ["Home"], "monthly"),
+]
+
+def make_progress(n_logs, seed=0):
+    """
+    Builds a progress state with n_logs detailed_logs entries spread over the days before today.
+    Args:
+        n_logs (int): The number of log entries.
+        seed (int): The random seed.
+    Returns:
+        dict: The progress state.
+    """
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=max(1, n_logs // 5))
+    logs = []
+    for i in range(n_logs):
+        day = (start + timedelta(days=i // 5)).isoformat()
+        if rng.random() < 0.02: # a completed penalty: no period, a penalty id
+            logs.append({"name": "Cold shower", "xp": 0, "category": ["Penalty"], "type": "penalty", "date": day, "penalty_id": f"pen-{i}", "id": i + 1})
+            continue
+        name, xp, category, task_type = rng.choice(TASKS)
+        logs.append({"name": name, "xp": xp, "category": category, "type": task_type, "date": day, "period_key": day, "id": i + 1})
+    return {
+        "current_xp": sum(log["xp"] for log in logs), "level": 1, "xp_to_next_level": 100,
+        "completed_tasks": {}, "detailed_logs": logs, "penalties": [], "daily_logs": {},
+        "xp_by_category": {}, "next_log_id": n_logs + 1, "version": 1,
+    }
+
+
+### Benchmark
+
+def best_of(repeat, func):
+    """
+    Runs func repeat times and returns the fastest wall time in seconds and the last result.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run(size, repeat, folder):
+    """
+    Benchmarks both formats for one size.
+    Args:
+        size (int): The number of log entries.
+        repeat (int): How many times to run each step (the best time is kept).
+        folder (str): A scratch folder for the files.
+    Returns:
+        dict: format -> (bytes, save seconds, load seconds)
+    """
+    state = make_progress(size)
+    results = {}
+    for fmt in snapshot_format.FORMATS:
+        path = os.path.join(folder, f"progress-{fmt}.json")
+
+        def save():
+            with open(path, 'w') as f:
+                f.write(snapshot_format.encode(state, fmt))
+
+        def load():
+            with open(path, 'r') as f:
+                return snapshot_format.decode(f.read())
+
+        save_time, _ = best_of(repeat, save)
+        load_time, loaded = best_of(repeat, load)
+        if loaded != state:
+            raise SystemExit(f"{fmt} did not round-trip at {size} entries")
+        results[fmt] = (os.path.getsize(path), save_time, load_time)
+        os.remove(path)
+    return results
+
+def main():
+    """
+    Parses the command line and prints the comparison table.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Compare snapshot formats")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma separated log entry counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per step, the best is reported")
+    args = parser.parse_args()
+    print(f"{'entries':>10} {'format':>8} {'size':>14} {'save':>10} {'load':>10}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in (int(s) for s in args.sizes.split(",")):
+            results = run(size, args.repeat, folder)
+            for fmt, (size_bytes, save_time, load_time) in results.items():
+                print(f"{size:>10,} {fmt:>8} {size_bytes:>14,} {save_time * 1000:>8.1f}ms {load_time * 1000:>8.1f}ms")
+            json_result, compact_result = results["json"], results["compact"]
+            ratios = [j / c for j, c in zip(json_result, compact_result)]
+            print(f"{'':>10} json / compact: size {ratios[0]:.1f}x, save {ratios[1]:.1f}x, load {ratios[2]:.1f}x")
+
+if __name__ == "__main__":
+    main()
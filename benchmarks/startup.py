@@ -0,0 +1,150 @@
+#imports
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+#Measures app start-up and first paint in fresh interpreters, optionally against an older version.
+#Usage: python benchmarks/startup.py [--repeat 5] [--years 1] [--compare REV] [--output FILE]
+#
+#Each run starts a new Python process, imports app.py with Streamlit stubbed (see run_benchmarks.py)
+#and runs one full main() against synthetic data. It reports:
+#   import_ms       importing app.py (what a Streamlit server pays on its first page load)
+#   first_paint_ms  from the start of the import to the first element sent to the page
+#   total_ms        import plus the whole first script run, including deferred sections
+#and which heavy libraries were already loaded at first paint.
+#--compare REV runs the same measurement on that git revision (e.g. HEAD~1) for a before/after table.
+#pandas and plotly are only stubbed if they are not installed, in which case their cost is not measured.
+
+HEAVY_MODULES = ("pandas", "plotly")
+
+PROBE = r"""
+import sys, time, json
+sys.path[:0] = [{repo_dir!r}, {bench_dir!r}]
+import run_benchmarks
+sys.path.insert(0, {repo_dir!r}) # run_benchmarks puts the current checkout first; measure this one
+stub = run_benchmarks.make_streamlit_stub()
+marks = {{}}
+real = {{name: getattr(stub, name) for name in dir(stub) if not name.startswith(("_", "cache_", "fragment")) and callable(getattr(stub, name))}} # decorators draw nothing
+def mark(func):
+    def wrapper(*args, **kwargs):
+        if "first" not in marks:
+            marks["first"] = time.perf_counter()
+            marks["heavy"] = [name for name in {heavy!r} if name in sys.modules and getattr(sys.modules[name], "__file__", None)]
+        return func(*args, **kwargs)
+    return wrapper
+for name, func in real.items():
+    setattr(stub, name, mark(func))
+fallback = stub.__getattr__
+stub.__getattr__ = lambda name: mark(fallback(name))
+sys.modules["streamlit"] = stub
+run_benchmarks.stub_missing_libraries()
+import_started = time.perf_counter()
+import app
+imported = time.perf_counter()
+run_benchmarks.point_app_at(app, run_benchmarks.types.SimpleNamespace(), {data_dir!r})
+try:
+    app.main()
+except run_benchmarks._Rerun:
+    pass
+finished = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - import_started) * 1000,
+    "first_paint_ms": (marks.get("first", finished) - import_started) * 1000,
+    "total_ms": (finished - import_started) * 1000,
+    "heavy_at_first_paint": marks.get("heavy", []),
+}}))
+"""
+
+
+### Measurement
+
+def probe(repo_dir, data_dir):
+    """
+    Runs one start-up in a fresh interpreter.
+    Args:
+        repo_dir (str): The checkout whose app.py is measured.
+        data_dir (str): The folder with the synthetic data files.
+    Returns:
+        dict: The timings of this run.
+    """
+    code = PROBE.format(repo_dir=repo_dir, bench_dir=BENCH_DIR, data_dir=data_dir, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=repo_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Start-up probe failed for {repo_dir}:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure(repo_dir, data_dir, repeat):
+    """
+    Runs the probe repeat times and keeps the median of each timing.
+    Args:
+        repo_dir (str): The checkout whose app.py is measured.
+        data_dir (str): The folder with the synthetic data files.
+        repeat (int): The number of fresh interpreters.
+    Returns:
+        dict: Median timings and the heavy libraries loaded at first paint.
+    """
+    runs = [probe(repo_dir, data_dir) for _ in range(repeat)]
+    result = {key: statistics.median(run[key] for run in runs) for key in ("import_ms", "first_paint_ms", "total_ms")}
+    result["heavy_at_first_paint"] = runs[-1]["heavy_at_first_paint"]
+    return result
+
+def export_revision(rev, folder):
+    """
+    Writes the files of a git revision into a folder.
+    Args:
+        rev (str): The git revision, e.g. HEAD~1.
+        folder (str): The empty folder to write to.
+    Returns:
+        None
+    """
+    archive = subprocess.run(["git", "archive", "--format=tar", rev], cwd=REPO_DIR, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(folder)
+
+def main():
+    """
+    Parses the command line, measures the current tree (and optionally an older revision) and prints the table.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Measure app start-up and first paint")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per version (default: 5)")
+    parser.add_argument("--years", type=float, default=1, help="years of synthetic history (default: 1)")
+    parser.add_argument("--compare", help="git revision to measure as the 'before' version, e.g. HEAD~1")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCH_DIR)
+    import synthetic
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        data_dir = os.path.join(folder, "data")
+        synthetic.generate(data_dir, args.years)
+        if args.compare:
+            old_dir = os.path.join(folder, "before")
+            os.makedirs(old_dir)
+            export_revision(args.compare, old_dir)
+            results[args.compare] = measure(old_dir, data_dir, args.repeat)
+        results["working tree"] = measure(REPO_DIR, data_dir, args.repeat)
+
+    print(f"{'version':<14} {'import':>10} {'first paint':>12} {'total':>10}   heavy libraries at first paint")
+    for version, result in results.items():
+        heavy = ", ".join(result['heavy_at_first_paint']) or "none"
+        print(f"{version:<14} {result['import_ms']:>8.1f}ms {result['first_paint_ms']:>10.1f}ms {result['total_ms']:>8.1f}ms   {heavy}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#imports
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import core
+import storage
+
+#Generates realistic tasks.json, progress.json and rewards.json files for benchmarks.
+#The history is built by applying the same events the app records (task completions, day
+#summaries, penalties, reward claims, spending), so ids, counts and running totals are consistent.
+#Usage: python benchmarks/synthetic.py OUT_DIR [--years 3] [--tasks 40] [--rate 0.7] [--seed 0]
+
+
+### Configuration
+TASK_TYPES = ("daily", "weekly", "monthly", "one_time")
+TYPE_SHARE = {"daily": 0.4, "weekly": 0.3, "monthly": 0.2, "one_time": 0.1} #share of the tasks of each type
+CATEGORIES = ["Health", "Learning", "Mind", "Career", "Home", "Hobby", "Social", "Finance"]
+
+
+### Helper Functions
+
+def make_tasks(count, rng):
+    """
+    Builds a tasks.json dictionary with about count tasks split over the task types.
+    Args:
+        count (int): The total number of tasks.
+        rng (random.Random): The random source.
+    Returns:
+        dict: Task type -> list of task dictionaries.
+    """
+    tasks = {}
+    for task_type in TASK_TYPES:
+        tasks[task_type] = [{
+            "name": f"{task_type.replace('_', '-').capitalize()} task {i + 1}",
+            "xp": rng.choice([1, 1, 2, 3, 5, 10, 20]),
+            "category": rng.sample(CATEGORIES, rng.choice([1, 1, 2])),
+            "description": f"Synthetic {task_type} task {i + 1}",
+            "frequency": rng.choice([1, 1, 1, 2, 3]) if task_type in ("weekly", "monthly") else 1,
+        } for i in range(max(1, round(count * TYPE_SHARE[task_type])))]
+    return tasks
+
+def empty_progress():
+    """
+    Returns a progress state as the app's reset creates it.
+    """
+    return {
+        "current_level": 1,
+        "current_xp": 0,
+        "xp_to_next_level": 100,
+        "daily_logs": [],
+        "detailed_logs": [],
+        "xp_by_category": {},
+        "penalties": [],
+        "completed_tasks": {"daily": {}, "weekly": {}, "monthly": {}, "one_time": {}},
+    }
+
+def empty_rewards():
+    """
+    Returns a rewards state as the app's reset creates it.
+    """
+    return {
+        "rewards": [{"level": lvl, "description": "$50 to spend on yourself", "claimed": False} for lvl in range(5, 55, 5)],
+        "money_tracking": {"total_earned": 0, "total_spent": 0, "current_balance": 0, "spending_history": []},
+    }
+
+def period_keys(day):
+    """
+    Gets the daily, weekly and monthly period keys of a day, in the format the app uses.
+    """
+    iso = day.isocalendar()
+    return {"daily": day.strftime("%Y-%m-%d"), "weekly": f"{iso[0]}-W{iso[1]}", "monthly": day.strftime("%Y-%m"), "one_time": "one-time"}
+
+
+### Generator
+
+def generate(out_dir, years=3, task_count=40, rate=0.7, seed=0):
+    """
+    Writes tasks.json, progress.json and rewards.json with years of synthetic history ending yesterday.
+    Args:
+        out_dir (str): The folder to write the files to (created if needed).
+        years (float): How many years of history to generate.
+        task_count (int): The total number of tasks in tasks.json.
+        rate (float): The chance that a task is completed in a period it is due.
+        seed (int): The random seed.
+    Returns:
+        dict: Counts of what was generated (tasks, days, logs, penalties, spending).
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = make_tasks(task_count, rng)
+    progress = empty_progress()
+    rewards = empty_rewards()
+    days = max(1, int(years * 365))
+    start = date.today() - timedelta(days=days)
+    done_once = set()
+    spending = 0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        keys = period_keys(day)
+        events = []
+        for task_type, task_list in tasks.items():
+            for task in task_list:
+                if task_type == "one_time":
+                    if task['name'] in done_once or rng.random() > 2.0 / days:
+                        continue
+                    done_once.add(task['name'])
+                else:
+                    # Spread weekly and monthly completions over the period
+                    chance = {"daily": rate, "weekly": rate * task['frequency'] / 7, "monthly": rate * task['frequency'] / 30}[task_type]
+                    if rng.random() > chance:
+                        continue
+                    counts = progress['completed_tasks'].get(task_type, {}).get(task['name'], {})
+                    if counts.get(keys[task_type], 0) >= task['frequency']:
+                        continue
+                events.append({
+                    "event": "task_completed", "task_type": task_type, "name": task['name'], "xp": task['xp'],
+                    "category": task['category'], "date": keys['daily'], "period_key": keys[task_type],
+                })
+        if events:
+            completed = {}
+            for event in events:
+                completed.setdefault(event['task_type'], []).append(event['name'])
+            events.append({"event": "day_logged", "date": keys['daily'], "completed": completed, "earned_xp": sum(e['xp'] for e in events)})
+            storage.apply_event(progress, {"event": "batch", "events": events})
+        # Penalty for the daily tasks missed on this day, usually done the next day
+        missed = sum(1 for task in tasks['daily'] if not progress['completed_tasks']['daily'].get(task['name'], {}).get(keys['daily']))
+        if missed:
+            penalty_id = f"pen-{offset}"
+            storage.apply_event(progress, {"event": "penalty_assigned", "penalty": {
+                "id": penalty_id, "due_date": (day + timedelta(days=1)).isoformat(),
+                "description": core.choose_penalty(missed, rng), "completed": False,
+            }})
+            if rng.random() < 0.8:
+                storage.apply_event(progress, {"event": "penalty_completed", "penalty_id": penalty_id, "index": len(progress['penalties']) - 1, "date": (day + timedelta(days=1)).isoformat()})
+        # Claim rewards as levels are reached and spend some of the money
+        for reward in rewards['rewards']:
+            if not reward['claimed'] and progress['current_level'] >= reward['level']:
+                storage.apply_event(rewards, {"event": "reward_claimed", "level": reward['level'], "amount": 50})
+        if rewards['money_tracking']['current_balance'] >= 20 and rng.random() < 0.05:
+            storage.apply_event(rewards, {"event": "spending_added", "date": keys['daily'], "amount": rng.choice([5, 10, 15, 20]), "description": rng.choice(["Coffee", "Book", "Game", "Movie"])})
+            spending += 1
+    counts = {
+        "tasks": sum(len(task_list) for task_list in tasks.values()),
+        "days": days,
+        "logs": len(progress['detailed_logs']),
+        "penalties": len(progress['penalties']),
+        "spending": spending,
+    }
+    # tasks.json is a hand-edited file, so it is written as plain JSON like the one in data/
+    with open(os.path.join(out_dir, "tasks.json"), 'w') as f:
+        json.dump(tasks, f, indent=4)
+    storage.save(os.path.join(out_dir, "progress.json"), progress, force=True)
+    storage.save(os.path.join(out_dir, "rewards.json"), rewards, force=True)
+    return counts
+
+def main():
+    """
+    Parses the command line and writes the synthetic files.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic Level Up data")
+    parser.add_argument("out_dir", help="the folder to write tasks.json, progress.json and rewards.json to")
+    parser.add_argument("--years", type=float, default=3, help="years of history (default: 3)")
+    parser.add_argument("--tasks", type=int, default=40, help="number of tasks (default: 40)")
+    parser.add_argument("--rate", type=float, default=0.7, help="chance a due task is completed (default: 0.7)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    counts = generate(args.out_dir, args.years, args.tasks, args.rate, args.seed)
+    print(f"Wrote {args.out_dir}: " + ", ".join(f"{count:,} {name}" for name, count in counts.items()))
+
+if __name__ == "__main__":
+    main()
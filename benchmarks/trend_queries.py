@@ -0,0 +1,130 @@
+#imports
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+#Times the history analytics (analytics.py) against the same queries written as Python loops over detailed_logs.
+#Usage: python benchmarks/trend_queries.py [--rows 10000,100000,1000000] [--repeat 3]
+#
+#For each size it makes that many detailed_logs entries in memory (40 tasks, 1-2 categories each,
+#spread over the days needed for about 14 logs a day) and reports:
+#   build        turning the logs into the columnar frames (paid once per progress version)
+#   xp_week      XP per category per week
+#   tasks_month  completions per task per month
+#   level_curve  daily XP, running total and level
+#for the frames and for the loops. Needs pandas (pip install -r requirements.txt).
+
+CATEGORIES = ["Health", "Career", "Social", "Learning", "Hobby", "Organization"]
+LOGS_PER_DAY = 14
+
+
+### Data
+
+def make_logs(rows, seed=0):
+    """
+    Makes detailed_logs entries, oldest first.
+    Args:
+        rows (int): The number of entries.
+        seed (int): The random seed.
+    Returns:
+        list: The entries.
+    """
+    rng = random.Random(seed)
+    tasks = [(f"Task {i}", rng.choice(["daily", "weekly", "monthly"]), rng.sample(CATEGORIES, rng.choice([1, 1, 2])), rng.choice([5, 10, 20, 50]))
+             for i in range(40)]
+    start = date(2000, 1, 1)
+    days = [(start + timedelta(days=d)).isoformat() for d in range(rows // LOGS_PER_DAY + 1)]
+    logs = []
+    for i in range(rows):
+        name, task_type, cats, xp = tasks[rng.randrange(len(tasks))]
+        logs.append({"id": i + 1, "name": name, "xp": xp, "category": cats, "type": task_type, "date": days[i // LOGS_PER_DAY], "period_key": ""})
+    return logs
+
+
+### Loop Versions
+
+def loop_xp_week(logs):
+    totals = {}
+    for log in logs:
+        day = date.fromisoformat(log['date'])
+        week = (day - timedelta(days=day.weekday())).isoformat()
+        for cat in log['category']:
+            key = (week, cat)
+            totals[key] = totals.get(key, 0) + log['xp']
+    return totals
+
+def loop_tasks_month(logs):
+    counts = {}
+    for log in logs:
+        if log['type'] == 'penalty':
+            continue
+        key = (log['date'][:7], log['name'])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+def loop_level_curve(logs):
+    per_day = {}
+    for log in logs:
+        per_day[log['date']] = per_day.get(log['date'], 0) + log['xp']
+    total, curve = 0, {}
+    for day in sorted(per_day):
+        total = max(total + per_day[day], 0)
+        curve[day] = (per_day[day], total, total // 100 + 1)
+    return curve
+
+
+### Runner
+
+def best_of(func, repeat):
+    """
+    Runs func repeat times and returns the median wall time in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+def main():
+    """
+    Parses the command line and prints the timings for each size.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the history analytics")
+    parser.add_argument("--rows", default="10000,100000,1000000", help="comma separated numbers of log rows (default: 10000,100000,1000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (default: 3)")
+    args = parser.parse_args()
+    try:
+        import analytics
+    except ImportError as e:
+        raise SystemExit(f"analytics.py needs pandas: {e}")
+
+    print(f"{'rows':>10}  {'query':<12} {'frames':>12} {'loops':>12}")
+    for rows in (int(r) for r in args.rows.split(",")):
+        logs = make_logs(rows)
+        frames = {}
+
+        def build():
+            frames['logs'], frames['categories'] = analytics.frames_from_logs(logs)
+
+        results = [("build", best_of(build, args.repeat), None)]
+        results.append(("xp_week", best_of(lambda: analytics.xp_by_category(frames['categories'], "W-MON"), args.repeat), best_of(lambda: loop_xp_week(logs), args.repeat)))
+        results.append(("tasks_month", best_of(lambda: analytics.completions_by_task(frames['logs'], "MS"), args.repeat), best_of(lambda: loop_tasks_month(logs), args.repeat)))
+        results.append(("level_curve", best_of(lambda: analytics.xp_over_time(frames['logs'], "D"), args.repeat), best_of(lambda: loop_level_curve(logs), args.repeat)))
+        for name, vectorized, loop in results:
+            loop_text = f"{loop:>10.1f}ms" if loop is not None else f"{'-':>12}"
+            print(f"{rows:>10,}  {name:<12} {vectorized:>10.1f}ms {loop_text}")
+
+if __name__ == "__main__":
+    main()
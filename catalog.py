@@ -0,0 +1,154 @@
+#imports
+import os
+import sys
+import threading
+from collections import OrderedDict
+import core
+import storage
+
+#The purpose of this module is to turn tasks.json into a checked, indexed task catalog once per change
+#of the file, instead of working on the raw lists on every rerun.
+#Loading the catalog validates the file (names present and unique per task type, whole-number XP,
+#categories as lists of names, frequency of at least 1) and raises TaskCatalogError listing every problem,
+#so a broken tasks.json is reported when it is loaded and not halfway through drawing the page.
+#The compiled catalog is a dict:
+#   tasks       task type (daily, weekly, monthly, one_time) -> list of tasks in file order, each with
+#               name, xp, category (a list; the old "tags" field is read as the category), description,
+#               frequency and key (the checkbox widget key, e.g. "one-time_Read a book")
+#   by_name     task type -> task name -> task
+#   categories  all category names, sorted
+#   version     the stat signature of tasks.json it was compiled from
+#Names, categories and keys are interned. Catalogs are cached per file and shared between sessions,
+#so treat them as read-only.
+
+
+### Configuration
+CACHE_FILES = 64 #how many compiled catalogs stay cached (one per player)
+
+_catalogs = OrderedDict() #absolute file path -> catalog, least recently used first
+_catalogs_guard = threading.Lock()
+
+
+class TaskCatalogError(ValueError):
+    """
+    Raised when tasks.json has tasks that can't be used. The message lists every problem found.
+    """
+
+
+### Compile Functions
+
+def _task_errors(ttype, index, task):
+    """
+    Checks one task definition.
+    Returns:
+        list: The problems found, empty if the task is valid.
+    """
+    where = f"{ttype}[{index}]"
+    if not isinstance(task, dict):
+        return [f"{where}: is not an object"]
+    name = task.get('name')
+    if not isinstance(name, str) or not name.strip():
+        return [f"{where}: missing name"]
+    where = f"{ttype} task {name!r}"
+    errors = []
+    xp = task.get('xp')
+    if 'xp' not in task:
+        errors.append(f"{where}: missing xp")
+    elif isinstance(xp, bool) or not isinstance(xp, int) or xp < 0:
+        errors.append(f"{where}: xp must be a whole number of 0 or more, not {xp!r}")
+    categories = task.get('category', task.get('tags', []))
+    if not isinstance(categories, list) or not all(isinstance(cat, str) and cat for cat in categories):
+        errors.append(f"{where}: category must be a list of names, not {categories!r}")
+    frequency = task.get('frequency', 1)
+    if isinstance(frequency, bool) or not isinstance(frequency, int) or frequency < 1:
+        errors.append(f"{where}: frequency must be a whole number of 1 or more, not {frequency!r}")
+    return errors
+
+def compile_tasks(raw, version=None):
+    """
+    Validates the contents of tasks.json and builds the catalog from them.
+    Args:
+        raw (dict): The loaded tasks.json.
+        version: What the catalog was compiled from (see the module comment); None for tasks that are not from a file.
+    Returns:
+        dict: The catalog (see the module comment).
+    Raises:
+        TaskCatalogError: If any task is invalid or a name is used twice in one task type.
+    """
+    if not isinstance(raw, dict):
+        raise TaskCatalogError("tasks.json must hold an object with the daily, weekly, monthly and one_time lists")
+    errors = []
+    catalog = {"tasks": {}, "by_name": {}, "categories": (), "version": version}
+    all_categories = set()
+    for ttype in core.TASK_TYPES:
+        entries = raw.get(ttype, [])
+        if not isinstance(entries, list):
+            errors.append(f"{ttype}: must be a list of tasks")
+            entries = []
+        tasks, by_name = [], {}
+        for index, entry in enumerate(entries):
+            task_errors = _task_errors(ttype, index, entry)
+            if task_errors:
+                errors.extend(task_errors)
+                continue
+            name = sys.intern(entry['name'])
+            if name in by_name:
+                errors.append(f"{ttype} task {name!r}: the name is used twice (completions are counted by name)")
+                continue
+            task = {k: v for k, v in entry.items() if k != 'tags'}
+            task.update(
+                name=name,
+                category=[sys.intern(cat) for cat in entry.get('category', entry.get('tags', []))],
+                description=entry.get('description', ""),
+                frequency=entry.get('frequency', 1),
+                key=sys.intern(f"{core.PERIOD_CATEGORY[ttype]}_{name}"),
+            )
+            tasks.append(task)
+            by_name[name] = task
+            all_categories.update(task['category'])
+        catalog['tasks'][ttype] = tasks
+        catalog['by_name'][ttype] = by_name
+    if errors:
+        raise TaskCatalogError("Invalid tasks.json:\n" + "\n".join(f"- {error}" for error in errors))
+    catalog['categories'] = tuple(sorted(all_categories))
+    return catalog
+
+
+### Load Functions
+
+def load(tasks_file):
+    """
+    Gets the compiled catalog of a tasks.json, compiling it only if the file changed since the last load in this process.
+    Args:
+        tasks_file (str): The path to tasks.json.
+    Returns:
+        dict: The catalog (see the module comment). Treat it as read-only; it is shared.
+    Raises:
+        TaskCatalogError: If the file has invalid tasks (checked again on every load until it is fixed).
+        FileNotFoundError: If the file does not exist.
+    """
+    key = os.path.abspath(tasks_file) # one entry per file, however its path is written (as storage's load cache)
+    version = storage.file_version(tasks_file)
+    with _catalogs_guard:
+        cached = _catalogs.get(key)
+        if cached is not None and cached['version'] == version:
+            _catalogs.move_to_end(key)
+            return cached
+    catalog = compile_tasks(storage.load(tasks_file), version)
+    with _catalogs_guard:
+        _catalogs[key] = catalog
+        _catalogs.move_to_end(key)
+        while len(_catalogs) > CACHE_FILES:
+            _catalogs.popitem(last=False)
+    return catalog
+
+def clear_cache():
+    """
+    Drops all compiled catalogs.
+    Args:
+        None
+    Returns:
+        None
+    """
+    with _catalogs_guard:
+        _catalogs.clear()
@@ -0,0 +1,90 @@
+#imports
+import math
+import os
+import threading
+from collections import OrderedDict
+
+#The purpose of this module is to build each chart once per state version instead of on every rerun.
+#A chart is cached under a key that names everything it is drawn from: the chart, the files with their
+#versions (see app.chart_key) and, for charts of the current periods, the period keys. A rerun with the
+#same key gets the figure built before; any change to the data changes the key, so the next rerun
+#builds it again. The cache is shared by all sessions and keeps the CHART_CACHE most recently used charts.
+#Cached figures are shared between sessions, so never change one after it is returned.
+
+
+### Configuration
+CHART_CACHE = int(os.environ.get("LEVELUP_CHART_CACHE", "32")) #how many built charts stay cached
+
+_charts = OrderedDict() #key -> built chart, least recently used first
+_charts_guard = threading.Lock()
+_chart_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+### Cache Functions
+
+def cached(key, build):
+    """
+    Gets a chart from the cache, building it only if its key is not cached.
+    Args:
+        key (tuple): Everything the chart is drawn from (hashable).
+        build (function): Builds the chart when called with no arguments; may return any value (a figure, a tuple of figures, None).
+    Returns:
+        The built chart. Treat it as read-only; it is shared.
+    """
+    with _charts_guard:
+        if key in _charts:
+            _charts.move_to_end(key)
+            _chart_stats["hits"] += 1
+            return _charts[key]
+        _chart_stats["misses"] += 1
+    chart = build() # outside the lock: two sessions may build the same chart once each, which is harmless
+    with _charts_guard:
+        _charts[key] = chart
+        _charts.move_to_end(key)
+        while len(_charts) > max(CHART_CACHE, 1):
+            _charts.popitem(last=False)
+            _chart_stats["evictions"] += 1
+    return chart
+
+def cache_stats():
+    """
+    Gets the chart cache counters for this process.
+    Args:
+        None
+    Returns:
+        dict: hits, misses, evictions, the number of cached charts and the limit.
+    """
+    return dict(_chart_stats, charts=len(_charts), limit=CHART_CACHE)
+
+def clear_cache():
+    """
+    Empties the chart cache and resets its counters.
+    Args:
+        None
+    Returns:
+        None
+    """
+    with _charts_guard:
+        _charts.clear()
+    for name in _chart_stats:
+        _chart_stats[name] = 0
+
+
+### Scale Functions
+
+def nice_ceiling(value, minimum=100):
+    """
+    Rounds an axis maximum up to a round number: 1, 2, 2.5 or 5 times a power of ten.
+    Args:
+        value (float): The largest value on the axis.
+        minimum (float): The smallest maximum to return (for charts with no or very small values).
+    Returns:
+        float: The axis maximum.
+    """
+    if value <= minimum:
+        return minimum
+    tenth = 10 ** max(math.floor(math.log10(value)) - 1, 0) #a tenth of the power of ten, so the steps stay whole numbers
+    for step in (10, 20, 25, 50, 100):
+        if value <= step * tenth:
+            return step * tenth
+    return 100 * tenth
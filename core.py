@@ -0,0 +1,423 @@
+#imports
+import random
+from datetime import date, timedelta
+import periods
+import storage
+import streaks
+
+#The purpose of this module is to hold the Level Up rules without any UI.
+#It has the data model (empty progress and rewards), the XP/level math, period keys, completion
+#counts, and the penalty and reward rules, and builds the events that storage.py records.
+#app.py draws the UI around it and auto_reset.py runs the nightly penalty check with it.
+#It only imports the standard library and the storage modules (no streamlit, pandas or plotly),
+#so scripts that use it start in milliseconds. See benchmarks/import_time.py.
+
+
+### Configuration
+TASK_TYPES = ("daily", "weekly", "monthly", "one_time") #the task lists in tasks.json
+PERIOD_CATEGORY = {"daily": "daily", "weekly": "weekly", "monthly": "monthly", "one_time": "one-time"} #tasks.json list -> period category
+SMALL_PENALTIES = [
+    "Vacuum floor",
+    "15 min stretching/meditating",
+    "Take stairs instead of elevator for the day"
+]
+BIG_PENALTIES = [
+    "1 mile run",
+    "Cold shower"
+]
+REWARD_LEVELS = range(5, 55, 5) #a reward every 5 levels
+REWARD_AMOUNT = 50 #dollars added to the balance when a reward is claimed
+
+
+### Data Model
+
+def initial_progress():
+    """
+    Creates the progress of a new (or reset) player.
+    Args:
+        None
+    Returns:
+        dict: The empty progress.
+    """
+    return {
+        "current_level": 1,
+        "current_xp": 0,
+        "xp_to_next_level": 100,
+        "daily_logs": [],
+        "detailed_logs": [],
+        "xp_by_category": {},
+        "penalties": [],
+        "completed_tasks": {
+            "daily": {},
+            "weekly": {},
+            "monthly": {},
+            "one_time": []
+        },
+        "streaks": streaks.empty_stats()
+    }
+
+def initial_rewards():
+    """
+    Creates the rewards of a new (or reset) player.
+    Args:
+        None
+    Returns:
+        dict: The rewards list (none claimed) and an empty money balance.
+    """
+    return {
+        "rewards": [
+            {"level": lvl, "description": f"${REWARD_AMOUNT} to spend on yourself", "claimed": False}
+            for lvl in REWARD_LEVELS
+        ],
+        "money_tracking": {
+            "total_earned": 0,
+            "total_spent": 0,
+            "current_balance": 0,
+            "spending_history": []
+        }
+    }
+
+
+### XP and Level Functions
+
+calculate_level = storage.calculate_level #(xp // 100) + 1, also used when events change the XP
+
+def calculate_xp_to_next_level(xp):
+    """
+    Calculates the experience points needed to reach the next level.
+    Args:
+        xp (int): The experience points.
+    Returns:
+        int: The experience points needed to reach the next level.
+    """
+    current_level = calculate_level(xp)
+    return current_level * 100 - xp
+
+
+### Period Functions
+
+def get_time_left(category, ctx=None):
+    """
+    Gets the time left for a task based on its category.
+    Args:
+        category (str): The category of the task.
+        ctx (dict): The period context of this run (see periods.py); computed now if not given.
+    Returns:
+        tuple: A tuple containing the time left as a string and a boolean indicating if the grace period is active.
+    """
+    ctx = ctx or periods.period_context()
+    if category not in ctx['timers']:
+        return None, False
+    return ctx['timers'][category], ctx['grace'][category]
+
+def get_period_key(category, ctx=None):
+    """
+    Gets the period key based on the category of the task. This is needed because tasks can be done on different days, weeks, or months due to the grace period.
+    Args:
+        category (str): The category of the task.
+        ctx (dict): The period context of this run (see periods.py); computed now if not given.
+    Returns:
+        str: The period key, which is essentially the date or week or month, for example 2025-06-22, 2025-W25, 2025-06.
+    """
+    ctx = ctx or periods.period_context()
+    return ctx['keys'].get(category)
+
+
+### Completion Functions
+
+def completion_count(progress_file, progress, category, task_name, ctx=None):
+    """
+    Gets the completion count of a task for the current period.
+    Args:
+        progress_file (str): The path to progress.json.
+        progress (dict): The loaded progress.
+        category (str): The category of the task.
+        task_name (str): The name of the task.
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        int: The completion count of the task for the current period.
+    """
+    #returns 0 if the task is not completed for the current period (one-time tasks always use the "one-time" key)
+    return storage.completion_count(progress_file, progress, category, task_name, get_period_key(category, ctx))
+
+def task_completion_events(category, tasks_to_increment, ctx=None):
+    """
+    Builds the events that increment the completion count of tasks for the current period, award their XP and log them.
+    Nothing is changed until the events are recorded.
+    Args:
+        category (str): The category of the tasks.
+        tasks_to_increment (list): The tasks to mark as completed, from the task catalog (see catalog.py).
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        list: One task_completed event per task.
+    """
+    ctx = ctx or periods.period_context()
+    period_key = get_period_key(category, ctx)
+    today = ctx['today'].isoformat()
+    return [{
+        "event": "task_completed",
+        "task_type": category,
+        "name": task['name'],
+        "xp": task['xp'],
+        "category": task['category'],
+        "date": today,
+        "period_key": period_key
+    } for task in tasks_to_increment]
+
+def submission_events(checked, ctx=None):
+    """
+    Builds the events for one submission of checked tasks of any mix of task types, plus its daily_logs summary.
+    Args:
+        checked (dict): The checked task dictionaries per task type, e.g. {"daily": [...], "weekly": [...]}.
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        tuple: The events, the completed task names per task type and the XP earned.
+    """
+    ctx = ctx or periods.period_context()
+    events = []
+    completed = {}
+    for ttype, tasks in checked.items(): #for each task type, build the completion events
+        events.extend(task_completion_events(ttype, tasks, ctx))
+        completed[ttype] = [task['name'] for task in tasks]
+    earned_xp = sum(int(task['xp']) for tasks in checked.values() for task in tasks)
+    events.append({"event": "day_logged", "date": ctx['today'].isoformat(), "completed": completed, "earned_xp": earned_xp})
+    return events, completed, earned_xp
+
+def unchecked_tasks(progress_file, progress, tasks, category, period_key):
+    """
+    Finds the tasks that were not completed in a period.
+    Args:
+        progress_file (str): The path to progress.json.
+        progress (dict): The loaded progress.
+        tasks (list): The task dictionaries to check.
+        category (str): The category of the tasks.
+        period_key (str): The period to check, e.g. yesterday's date.
+    Returns:
+        list: The names of the tasks with no completion in that period.
+    """
+    return [
+        task['name'] for task in tasks
+        if not storage.completion_count(progress_file, progress, category, task['name'], period_key)
+    ]
+
+
+### Penalty Functions
+
+def choose_penalty(unchecked_count, rng=random):
+    """
+    Picks a penalty for a number of missed daily tasks: a small one for 1, a big one for 2 or more.
+    Args:
+        unchecked_count (int): The number of missed daily tasks.
+        rng (random.Random): The random source.
+    Returns:
+        str: The penalty description, or None if nothing was missed.
+    """
+    if unchecked_count == 1:
+        return rng.choice(SMALL_PENALTIES)
+    if unchecked_count >= 2:
+        return rng.choice(BIG_PENALTIES)
+    return None
+
+def new_penalty(unchecked_count, ctx=None, rng=random, missed_date=None):
+    """
+    Creates a penalty due tomorrow for missed daily tasks.
+    Args:
+        unchecked_count (int): The number of missed daily tasks.
+        ctx (dict): The period context of this run (see periods.py).
+        rng (random.Random): The random source.
+        missed_date (str): The day the tasks were missed, e.g. 2025-06-22 (stored with catch-up penalties).
+    Returns:
+        dict: The penalty, or None if nothing was missed.
+    """
+    ctx = ctx or periods.period_context()
+    description = choose_penalty(unchecked_count, rng)
+    if description is None:
+        return None
+    penalty = {
+        'id': f"pen-{ctx['now'].timestamp()}-{rng.randint(1000,9999)}",
+        'due_date': (ctx['today'] + timedelta(days=1)).isoformat(),
+        'description': description,
+        'completed': False
+    }
+    if missed_date:
+        penalty['id'] = f"pen-{ctx['now'].timestamp()}-{missed_date}-{rng.randint(1000,9999)}"
+        penalty['missed_date'] = missed_date
+    return penalty
+
+def penalty_assigned_event(unchecked_count, ctx=None, rng=random):
+    """
+    Builds the event that assigns a penalty due tomorrow for missed daily tasks.
+    Args:
+        unchecked_count (int): The number of missed daily tasks.
+        ctx (dict): The period context of this run (see periods.py).
+        rng (random.Random): The random source.
+    Returns:
+        dict: The penalty_assigned event, or None if nothing was missed.
+    """
+    penalty = new_penalty(unchecked_count, ctx, rng)
+    if penalty is None:
+        return None
+    return {"event": "penalty_assigned", "penalty": penalty}
+
+def assign_penalties(progress_file, progress, unchecked_count, ctx=None):
+    """
+    Assigns a penalty for missed daily tasks. It is appended as an event under the file lock,
+    so completions logged by the app at the same time are kept.
+    Args:
+        progress_file (str): The path to progress.json.
+        progress (dict): The loaded progress, updated in place.
+        unchecked_count (int): The number of missed daily tasks.
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        dict: The assigned penalty, or None if nothing was missed.
+    """
+    event = penalty_assigned_event(unchecked_count, ctx)
+    if event is None:
+        return None
+    storage.record(progress_file, progress, [event])
+    return event['penalty']
+
+def active_penalties(progress):
+    """
+    Gets the penalties that are not completed yet.
+    Args:
+        progress (dict): The loaded progress.
+    Returns:
+        list: (index in penalties, penalty) pairs.
+    """
+    return [(i, p) for i, p in enumerate(progress.get('penalties', [])) if not p.get('completed', False)]
+
+def penalty_completed_event(penalty, index, ctx=None):
+    """
+    Builds the event that marks a penalty as completed and logs it in the history.
+    Args:
+        penalty (dict): The penalty.
+        index (int): Its position in penalties (used for penalties without an id).
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        dict: The penalty_completed event.
+    """
+    ctx = ctx or periods.period_context()
+    #Assign an ID if not present (for backward compatibility)
+    penalty_id = penalty.get('id', f"pen-{ctx['now'].timestamp()}-{index}")
+    return {"event": "penalty_completed", "penalty_id": penalty_id, "index": index, "date": ctx['today'].isoformat()}
+
+
+### Daily Check Functions
+#The nightly check remembers the last day it checked (daily_checked_through in progress), so a run
+#after the machine was off checks every day it missed, and a second run on the same day does nothing.
+
+def days_to_check(progress, ctx=None):
+    """
+    Gets the days the nightly check still has to look at: every day after the last checked day, up to the
+    last closed day. That is the day before the open daily period, so before 1:00 AM (the grace period)
+    yesterday is still open and is not checked yet.
+    Args:
+        progress (dict): The loaded progress.
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        list: The dates, oldest first. Only the last closed day if no day was checked before; empty if it was checked.
+    """
+    ctx = ctx or periods.period_context()
+    last_closed = last_closed_day(ctx)
+    checked = progress.get('daily_checked_through')
+    first = date.fromisoformat(checked) + timedelta(days=1) if checked else last_closed
+    return [first + timedelta(days=i) for i in range((last_closed - first).days + 1)]
+
+def last_closed_day(ctx):
+    """
+    Gets the last day whose daily period is over (the day before the open one, see periods.py).
+    Args:
+        ctx (dict): The period context of this run.
+    Returns:
+        date: The day.
+    """
+    return date.fromisoformat(ctx['previous_keys']['daily'])
+
+def missed_daily_tasks(progress_file, progress, tasks, days):
+    """
+    Finds the daily tasks that were not completed on each of several days.
+    One day is looked up directly; for more days the completion histories of all tasks (including
+    archived periods) are read in one pass, so the archive is loaded once per run.
+    Args:
+        progress_file (str): The path to progress.json.
+        progress (dict): The loaded progress.
+        tasks (list): The daily task dictionaries.
+        days (list): The dates to check.
+    Returns:
+        dict: Day key (2025-06-22) -> names of the tasks missed that day, for every day in days.
+    """
+    keys = [day.isoformat() for day in days]
+    if len(keys) == 1:
+        return {keys[0]: unchecked_tasks(progress_file, progress, tasks, 'daily', keys[0])}
+    missed = {key: [] for key in keys}
+    histories = storage.completion_histories(progress_file, progress, 'daily', [task['name'] for task in tasks])
+    for task in tasks:
+        history = histories[task['name']]
+        for key in keys:
+            if not history.get(key):
+                missed[key].append(task['name'])
+    return missed
+
+def days_checked_event(missed, through, ctx=None, rng=random):
+    """
+    Builds the event that assigns one penalty per day with missed daily tasks and marks the days as checked.
+    Args:
+        missed (dict): Day key -> names of the tasks missed that day (see missed_daily_tasks).
+        through (str): The last day checked, e.g. 2025-06-22.
+        ctx (dict): The period context of this run (see periods.py).
+        rng (random.Random): The random source.
+    Returns:
+        dict: The days_checked event.
+    """
+    ctx = ctx or periods.period_context()
+    penalties = [new_penalty(len(names), ctx, rng, missed_date=day_key) for day_key, names in sorted(missed.items()) if names]
+    return {"event": "days_checked", "through": through, "penalties": penalties}
+
+def check_missed_days(progress_file, progress, tasks, ctx=None):
+    """
+    Checks every day since the last check for missed daily tasks and assigns their penalties.
+    The penalties and the new last checked day are written as one event under the file lock. Days that
+    another run already checked are skipped when the event is applied, so running this twice changes nothing.
+    Args:
+        progress_file (str): The path to progress.json.
+        progress (dict): The loaded progress, updated in place.
+        tasks (list): The daily task dictionaries.
+        ctx (dict): The period context of this run (see periods.py).
+    Returns:
+        tuple: Day key -> missed task names for the days checked (empty if there was nothing to check),
+            and the penalties that were assigned.
+    """
+    ctx = ctx or periods.period_context()
+    days = days_to_check(progress, ctx)
+    if not days:
+        return {}, []
+    missed = missed_daily_tasks(progress_file, progress, tasks, days)
+    event = days_checked_event(missed, days[-1].isoformat(), ctx)
+    storage.record(progress_file, progress, [event])
+    stored = {p.get('id') for p in progress.get('penalties', [])}
+    return missed, [p for p in event['penalties'] if p['id'] in stored]
+
+
+### Reward Functions
+
+def claimable(reward, level):
+    """
+    Checks whether a reward can be claimed at a level.
+    Args:
+        reward (dict): The reward.
+        level (int): The player's current level.
+    Returns:
+        bool: True if the reward is not claimed yet and its level has been reached.
+    """
+    return not reward.get('claimed') and level >= reward['level']
+
+def reward_claimed_event(level):
+    """
+    Builds the event that claims the reward of a level and adds its money to the balance.
+    Args:
+        level (int): The level of the reward.
+    Returns:
+        dict: The reward_claimed event.
+    """
+    return {"event": "reward_claimed", "level": level, "amount": REWARD_AMOUNT}
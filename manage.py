@@ -0,0 +1,251 @@
+#imports
+import argparse
+import os
+import sys
+
+#Maintenance commands for the data folder.
+#Usage: python manage.py <command> [--data-dir DATA_DIR | --user NAME]
+#   migrate   copy progress.json and rewards.json into data/levelup.db for the sqlite backend
+#   verify    check the stored per-category XP totals against a full recompute (--repair to fix them)
+#   convert   rewrite progress.json and rewards.json in another snapshot format (--format json|compact)
+#   archive   move closed completion periods out of progress.json into progress.archive.json
+#   tasks     check tasks.json (unique names, xp, categories, frequency) and summarize it
+#   streaks   build the streak statistics from the whole history (older progress files; the app also does it once)
+#   add-user  create a player's folder in LEVELUP_TENANTS_DIR (python manage.py add-user alice)
+#   users     list the players in LEVELUP_TENANTS_DIR
+#   export    write the history to a folder, one file per table (python manage.py export backup --to jsonl)
+#   import    add the history in an exported folder, skipping what is already there (python manage.py import backup)
+#With --user NAME the other commands work on that player's folder (multi-player mode, see tenants.py).
+
+
+### Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "data")
+
+
+### Commands
+
+def migrate(data_dir, args):
+    """
+    Copies the JSON progress and rewards into the SQLite database (one-shot, the JSON files are kept).
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line.
+    Returns:
+        None
+    """
+    import sqlite_store
+    counts = sqlite_store.migrate(os.path.join(data_dir, "progress.json"), os.path.join(data_dir, "rewards.json"))
+    print(f"Migrated into {sqlite_store.db_path(os.path.join(data_dir, 'progress.json'))}:")
+    for table, count in counts.items():
+        print(f"- {table}: {count} row(s)")
+    print("Set LEVELUP_STORAGE=sqlite to use the database.")
+
+def verify(data_dir, args):
+    """
+    Checks the running per-category XP totals against a full recompute from the task history.
+    Exits with status 1 if they differ and --repair was not given.
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line.
+    Returns:
+        None
+    """
+    import storage
+    mismatches = storage.verify_xp_by_category(os.path.join(data_dir, "progress.json"), repair=args.repair)
+    if not mismatches:
+        print("XP per category is consistent with the task history.")
+        return
+    for cat, (stored, actual) in sorted(mismatches.items()):
+        print(f"- {cat}: stored {stored} XP, recomputed {actual} XP")
+    if args.repair:
+        print(f"Repaired {len(mismatches)} categor{'y' if len(mismatches) == 1 else 'ies'}.")
+    else:
+        print("Run with --repair to replace the stored totals.")
+        sys.exit(1)
+
+def convert(data_dir, args):
+    """
+    Rewrites progress.json and rewards.json in the chosen snapshot format (see snapshot_format.py).
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line.
+    Returns:
+        None
+    """
+    import storage
+    for name in ("progress.json", "rewards.json"):
+        file_path = os.path.join(data_dir, name)
+        if not os.path.exists(file_path):
+            continue
+        before, after = storage.convert(file_path, args.format)
+        print(f"- {name}: {before:,} -> {after:,} bytes ({args.format})")
+    if storage.SNAPSHOT_FORMAT and storage.SNAPSHOT_FORMAT != args.format:
+        print(f"Note: LEVELUP_SNAPSHOT_FORMAT={storage.SNAPSHOT_FORMAT} is set, so the next compaction will switch back.")
+
+def archive(data_dir, args):
+    """
+    Moves the closed daily, weekly and monthly completion periods to the archive (auto_reset.py also does this nightly).
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line.
+    Returns:
+        None
+    """
+    import retention
+    archived = retention.archive_closed_periods(os.path.join(data_dir, "progress.json"))
+    print(f"Archived {archived} closed period count(s).")
+
+def check_tasks(data_dir, args):
+    """
+    Checks tasks.json the way the app and the nightly check load it. Exits with status 1 if it is invalid.
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line.
+    Returns:
+        None
+    """
+    import catalog
+    try:
+        tasks = catalog.load(os.path.join(data_dir, "tasks.json"))
+    except catalog.TaskCatalogError as e:
+        print(e)
+        sys.exit(1)
+    counts = ", ".join(f"{len(tasks['tasks'][ttype])} {ttype}" for ttype in tasks['tasks'])
+    print(f"tasks.json is valid: {counts} task(s) in {len(tasks['categories'])} categories ({', '.join(tasks['categories'])}).")
+
+def build_streaks(data_dir, args):
+    """
+    Builds the streak statistics (see streaks.py) from the whole task history and stores them in progress.
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line.
+    Returns:
+        None
+    """
+    import storage
+    stats = storage.rebuild_streaks(os.path.join(data_dir, "progress.json"))
+    print(f"Built streaks: longest overall streak {stats['overall']['longest']} day(s), {len(stats['activity'])} active day(s).")
+
+def add_user(data_dir, args):
+    """
+    Creates a new player's folder with a copy of data/tasks.json and empty progress and rewards.
+    Args:
+        data_dir (str): Unused; the folder is made in LEVELUP_TENANTS_DIR.
+        args (argparse.Namespace): The parsed command line (the user name is args.name).
+    Returns:
+        None
+    """
+    import tenants
+    try:
+        folder = tenants.add_user(args.name)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Added {args.name} in {folder}. Open the app with ?user={args.name}")
+
+def users(data_dir, args):
+    """
+    Lists the players in LEVELUP_TENANTS_DIR.
+    Args:
+        data_dir (str): Unused.
+        args (argparse.Namespace): The parsed command line.
+    Returns:
+        None
+    """
+    import tenants
+    if not tenants.enabled():
+        print("Single-player mode (LEVELUP_TENANTS_DIR is not set).")
+        return
+    names = tenants.list_users()
+    print(f"{len(names)} player(s) in {tenants.TENANTS_DIR}:")
+    for name in names:
+        print(f"- {name}")
+
+def export_history(data_dir, args):
+    """
+    Exports detailed_logs, daily_logs, penalties and spending_history to a folder (see transfer.py).
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line (the folder is args.name).
+    Returns:
+        None
+    """
+    import transfer
+    try:
+        written = transfer.export(data_dir, args.name, args.to, args.tables)
+    except ImportError:
+        print("Error: Parquet export needs pyarrow (pip install pyarrow).")
+        sys.exit(1)
+    for table, (path, count) in written.items():
+        print(f"- {table}: {count} row(s) -> {path}")
+
+def import_history(data_dir, args):
+    """
+    Imports an exported folder, adding only the rows the data folder does not have yet (see transfer.py).
+    Args:
+        data_dir (str): The data folder.
+        args (argparse.Namespace): The parsed command line (the folder is args.name).
+    Returns:
+        None
+    """
+    import transfer
+    try:
+        report = transfer.import_history(data_dir, args.name, args.tables)
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not report:
+        print(f"No exported files found in {args.name}.")
+    for table, (added, skipped) in report.items():
+        print(f"- {table}: {added} added, {skipped} already present or skipped")
+
+COMMANDS = {
+    "migrate": migrate,
+    "verify": verify,
+    "convert": convert,
+    "archive": archive,
+    "tasks": check_tasks,
+    "streaks": build_streaks,
+    "add-user": add_user,
+    "users": users,
+    "export": export_history,
+    "import": import_history,
+}
+
+def main():
+    """
+    Parses the command line and runs the chosen command.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Level Up data maintenance")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("name", nargs="?", help="add-user: the new player's name; export/import: the folder")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="the data folder (default: ./data)")
+    parser.add_argument("--user", help="multi-player mode: work on this player's folder instead of --data-dir")
+    parser.add_argument("--repair", action="store_true", help="verify: replace wrong totals with the recomputed ones")
+    parser.add_argument("--format", choices=["json", "compact"], default="compact", help="convert: the snapshot format to write (default: compact)")
+    parser.add_argument("--to", choices=["csv", "jsonl", "parquet"], default="csv", help="export: the file format (default: csv)")
+    parser.add_argument("--tables", type=lambda s: s.split(","), default=["detailed_logs", "daily_logs", "penalties", "spending_history"],
+                        help="export/import: comma-separated tables (default: all)")
+    args = parser.parse_args()
+    if args.command == "add-user" and not args.name:
+        parser.error("add-user needs a name")
+    if args.command in ("export", "import") and not args.name:
+        parser.error(f"{args.command} needs a folder")
+    unknown = set(args.tables) - {"detailed_logs", "daily_logs", "penalties", "spending_history"}
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(sorted(unknown))}")
+    data_dir = args.data_dir
+    if args.user:
+        import tenants
+        if not tenants.exists(args.user):
+            parser.error(f"unknown user {args.user!r} (is LEVELUP_TENANTS_DIR set?)")
+        data_dir = tenants.data_dir(args.user)
+    COMMANDS[args.command](data_dir, args)
+
+if __name__ == "__main__":
+    main()
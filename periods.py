@@ -0,0 +1,96 @@
+#imports
+from datetime import datetime, timedelta
+
+#The purpose of this module is to work out the current periods once per run.
+#Every task row needs its period key (2025-06-22, 2025-W25, 2025-06) and the task sections need
+#the time left and grace state, all of which depend on "now". period_context() computes all of them
+#from one datetime.now() reading, and the result is passed through the render and submit functions,
+#so one rerun of the app (or one run of auto_reset.py) sees a single consistent "now".
+#
+#A new period starts at 1:00 AM: before that the previous day, week (on Mondays) or month
+#(on the 1st) is still open. This is the grace period.
+
+
+### Configuration
+GRACE = timedelta(hours=1)
+PERIOD_TYPES = ("daily", "weekly", "monthly")
+
+
+### Period Context
+
+def period_context(now=None):
+    """
+    Computes the period keys, boundaries, grace state and timers for one moment.
+    Args:
+        now (datetime): The moment to use (default: datetime.now()).
+    Returns:
+        dict: The period context with the keys
+            now (datetime), today (date),
+            keys (task type -> current period key, including "one-time"),
+            previous_keys (task type -> the period before the current one),
+            starts and ends (task type -> datetime the calendar period starts and ends),
+            grace (task type -> True if the previous period is still open),
+            timers (task type -> the time left text shown above the task section).
+    """
+    now = now or datetime.now()
+    today = now.date()
+    day_start = datetime.combine(today, datetime.min.time())
+    week_start = day_start - timedelta(days=now.weekday())
+    month_start = day_start.replace(day=1)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+    last_day = (next_month_start - timedelta(days=1)).day
+    starts = {"daily": day_start, "weekly": week_start, "monthly": month_start}
+    ends = {
+        "daily": day_start + timedelta(days=1),
+        "weekly": week_start + timedelta(weeks=1),
+        "monthly": next_month_start,
+    }
+    grace = {period_type: now < starts[period_type] + GRACE for period_type in PERIOD_TYPES}
+
+    # Before 1am the previous period is the current one
+    open_day = today - timedelta(days=1) if grace["daily"] else today
+    open_week = now - timedelta(weeks=1) if grace["weekly"] else now
+    open_month = month_start - timedelta(days=1) if grace["monthly"] else now
+    keys = {
+        "daily": _day_key(open_day),
+        "weekly": _week_key(open_week),
+        "monthly": open_month.strftime("%Y-%m"),
+        "one-time": "one-time",
+    }
+    previous_keys = {
+        "daily": _day_key(open_day - timedelta(days=1)),
+        "weekly": _week_key(open_week - timedelta(weeks=1)),
+        "monthly": (open_month.replace(day=1) - timedelta(days=1)).strftime("%Y-%m"),
+    }
+
+    hours_left = (ends["daily"] - now).total_seconds() / 3600
+    days_left_week = 6 - now.weekday()
+    days_left_month = last_day - now.day
+    timers = {
+        "daily": f"⏰ {int(hours_left)}h {int((hours_left%1)*60)}m left today",
+        "weekly": f"⏰ {days_left_week+1} day{'s' if days_left_week else ''} left this week",
+        "monthly": f"⏰ {days_left_month+1} day{'s' if days_left_month else ''} left this month",
+    }
+    return {
+        "now": now,
+        "today": today,
+        "keys": keys,
+        "previous_keys": previous_keys,
+        "starts": starts,
+        "ends": ends,
+        "grace": grace,
+        "timers": timers,
+    }
+
+def _day_key(day):
+    """
+    Formats a daily period key, e.g. 2025-06-22.
+    """
+    return day.strftime("%Y-%m-%d")
+
+def _week_key(moment):
+    """
+    Formats a weekly period key from the ISO week, e.g. 2025-W25.
+    """
+    iso = moment.isocalendar()
+    return f"{iso[0]}-W{iso[1]}"
@@ -0,0 +1,82 @@
+#imports
+from datetime import date, timedelta
+import storage
+
+#The purpose of this module is to keep completed_tasks small.
+#completed_tasks gets a new period key for every task every day, week or month, but only the
+#current period (and the previous one, during the grace period and for the 1:00 AM penalty check)
+#is ever looked up. Older periods are closed: archive_closed_periods() moves their counts to
+#progress.archive.json and adds them to per-task monthly and yearly totals (completed_rollups).
+#auto_reset.py runs it every night; it can also be run with: python manage.py archive
+#Completions imported into a period that was already archived (transfer.py) wait in completed_tasks
+#until the next run adds them to the archived count and the totals.
+#
+#Deleting a task from the history after its period was archived does not change the archive (the streak
+#statistics still follow it, see storage._apply_log_deleted).
+
+
+### Configuration
+KEEP_PERIODS = {"daily": 2, "weekly": 2, "monthly": 2} #how many of the newest periods stay in completed_tasks
+
+
+### Helper Functions
+
+def period_order(task_type, period_key):
+    """
+    Turns a period key into something that sorts in time order (2025-W9 comes before 2025-W10).
+    Args:
+        task_type (str): The task type (daily, weekly or monthly).
+        period_key (str): The period key, e.g. 2025-06-22, 2025-W25 or 2025-06.
+    Returns:
+        tuple: The sort key, or None if the key is not a period of this task type.
+    """
+    try:
+        if task_type == "daily":
+            return tuple(int(part) for part in period_key.split("-"))
+        if task_type == "weekly":
+            year, week = period_key.split("-W")
+            return (int(year), int(week))
+        if task_type == "monthly":
+            year, month = period_key.split("-")
+            return (int(year), int(month))
+    except ValueError:
+        pass
+    return None
+
+def oldest_open_periods(today=None):
+    """
+    Gets the oldest period of each task type that is still open (kept in completed_tasks).
+    Args:
+        today (date): The day to count from (default: today).
+    Returns:
+        dict: Task type -> sort key of the oldest open period (see period_order).
+    """
+    today = today or date.today()
+    oldest_day = today - timedelta(days=KEEP_PERIODS["daily"] - 1)
+    oldest_week = (today - timedelta(weeks=KEEP_PERIODS["weekly"] - 1)).isocalendar()
+    month_index = today.year * 12 + today.month - 1 - (KEEP_PERIODS["monthly"] - 1)
+    return {
+        "daily": (oldest_day.year, oldest_day.month, oldest_day.day),
+        "weekly": (oldest_week[0], oldest_week[1]),
+        "monthly": (month_index // 12, month_index % 12 + 1),
+    }
+
+
+### Archive
+
+def archive_closed_periods(progress_file, today=None):
+    """
+    Moves the closed daily, weekly and monthly periods out of completed_tasks. One-time tasks are never archived.
+    Args:
+        progress_file (str): The path to progress.json.
+        today (date): The day to count from (default: today).
+    Returns:
+        int: The number of period entries archived.
+    """
+    oldest = oldest_open_periods(today)
+
+    def is_closed(task_type, period_key):
+        order = period_order(task_type, period_key) if task_type in oldest else None
+        return order is not None and order < oldest[task_type]
+
+    return storage.archive_periods(progress_file, is_closed)
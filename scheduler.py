@@ -0,0 +1,189 @@
+#imports
+import argparse
+import threading
+from datetime import datetime, timedelta
+import periods
+
+#The purpose of this module is to run the nightly check (auto_reset.py) without a cron job.
+#New periods start at the end of the grace period: every day at 1:00 AM, Mondays at 1:00 AM for
+#weeks and the 1st at 1:00 AM for months (see periods.py). The scheduler keeps one timer that is
+#set for the next of these boundaries; when it fires, auto_reset checks the missed daily tasks
+#and archives the closed periods, then the timer is set for the next boundary.
+#
+#It runs once right away when it starts, so a laptop that was closed at 1:00 AM catches up when
+#the app opens (auto_reset remembers the days it checked, so extra runs change nothing). Started
+#between midnight and 1:00 AM, while yesterday is still open, it waits for the 1:00 AM run instead.
+#A timer does not count time while the computer sleeps, so it never waits longer than MAX_WAIT
+#before looking at the clock again.
+#
+#Two ways to run it:
+#   python scheduler.py                  a sidecar process (the desktop launcher starts one)
+#   LEVELUP_SCHEDULER=app streamlit run app.py    inside the app's server process
+#python scheduler.py --status prints the next run times.
+
+
+### Configuration
+MAX_WAIT = timedelta(hours=1) #longest single timer wait; the clock is checked again after it
+
+_lock = threading.Lock()
+_timer = None
+_status = {"started": None, "last_run": None, "last_summary": None, "last_error": None, "next_run": None, "runs": 0}
+
+
+### Schedule
+
+def next_runs(ctx=None):
+    """
+    Gets the next time each kind of period rolls over (the end of its grace period).
+    Args:
+        ctx (dict): The period context to count from (see periods.py); computed now if not given.
+    Returns:
+        dict: "daily", "weekly" and "monthly" -> datetime of the next rollover.
+    """
+    ctx = ctx or periods.period_context()
+    runs = {}
+    for period_type in periods.PERIOD_TYPES:
+        boundary = ctx['starts'][period_type] + periods.GRACE
+        runs[period_type] = boundary if ctx['now'] < boundary else ctx['ends'][period_type] + periods.GRACE
+    return runs
+
+def next_run(ctx=None):
+    """
+    Gets the next time the nightly check is due (the earliest rollover).
+    Args:
+        ctx (dict): The period context to count from (see periods.py); computed now if not given.
+    Returns:
+        datetime: The next run time.
+    """
+    return min(next_runs(ctx).values())
+
+def catch_up_now(ctx=None):
+    """
+    Checks whether a scheduler starting now should run the check right away. Not during the daily grace
+    period: yesterday is still open then, and the timer runs the check when it closes at 1:00 AM.
+    Args:
+        ctx (dict): The period context to check (see periods.py); computed now if not given.
+    Returns:
+        bool: True if the catch-up run can happen now.
+    """
+    ctx = ctx or periods.period_context()
+    return not ctx['grace']['daily']
+
+def status():
+    """
+    Gets what the scheduler of this process has done and when it runs next.
+    Args:
+        None
+    Returns:
+        dict: started, last_run, last_summary (see auto_reset.summarize), last_error, next_run and runs.
+    """
+    with _lock:
+        return dict(_status)
+
+
+### Timer
+
+def run_check(argv=None):
+    """
+    Runs the nightly check once and records the result in the status.
+    Args:
+        argv (list): Command line for auto_reset.main (default: none, i.e. data/ or every player).
+    Returns:
+        dict: The run summary, or None if the check failed.
+    """
+    import auto_reset # only loaded when a check runs
+    summary, error = None, None
+    try:
+        summary = auto_reset.main(argv or [])
+    except Exception as e: # keep the timer alive; the next run tries again
+        error = f"{type(e).__name__}: {e}"
+        print(f"Scheduled check failed: {error}")
+    with _lock:
+        _status.update(last_run=datetime.now(), last_summary=summary, last_error=error, runs=_status['runs'] + 1)
+    return summary
+
+def _arm(argv):
+    """
+    Sets the timer for the next run (or for MAX_WAIT, whichever comes first). Call with _lock held.
+    """
+    global _timer
+    due = next_run()
+    wait = min(max((due - datetime.now()).total_seconds(), 0), MAX_WAIT.total_seconds())
+    _status['next_run'] = due
+    _timer = threading.Timer(wait, _fire, args=(argv, False))
+    _timer.daemon = True
+    _timer.start()
+
+def _fire(argv, force):
+    """
+    Runs the check if it is due (or force is True) and sets the timer again.
+    """
+    with _lock:
+        if _timer is None: # stopped
+            return
+        due = force or datetime.now() >= _status['next_run']
+    if due:
+        run_check(argv)
+    with _lock:
+        if _timer is not None:
+            _arm(argv)
+
+def start(argv=None, run_now=True):
+    """
+    Starts the scheduler in this process, on a daemon thread. Does nothing if it is already running.
+    Args:
+        argv (list): Command line for auto_reset.main, e.g. ["--workers", "1"].
+        run_now (bool): If True, run the check right away to catch up on missed nights (after the grace period, see catch_up_now).
+    Returns:
+        bool: True if it was started, False if it was already running.
+    """
+    global _timer
+    with _lock:
+        if _timer is not None:
+            return False
+        _status['started'] = datetime.now()
+        _status['next_run'] = next_run()
+        _timer = threading.Timer(0, _fire, args=(argv, run_now and catch_up_now()))
+        _timer.daemon = True
+        _timer.start()
+    return True
+
+def stop():
+    """
+    Stops the scheduler of this process.
+    Args:
+        None
+    Returns:
+        None
+    """
+    global _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = None
+
+def main():
+    """
+    Runs the scheduler as a sidecar process until it is stopped, or prints the next run times with --status.
+    Args:
+        None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Run the Level Up nightly check at every period rollover")
+    parser.add_argument("--status", action="store_true", help="print the next run times and exit")
+    parser.add_argument("--no-catch-up", action="store_true", help="don't run the check right away on start")
+    args = parser.parse_args()
+
+    for period_type, when in next_runs().items():
+        print(f"Next {period_type} rollover: {when:%Y-%m-%d %H:%M}")
+    if args.status:
+        return
+    start(run_now=not args.no_catch_up)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#imports
+import json
+
+#Snapshot encodings for progress.json and rewards.json.
+#
+#"json" is the original layout: one indented JSON object, easy to read and edit by hand.
+#
+#"compact" is still JSON text (so the journal, atomic writes and hand inspection keep working),
+#but without indentation and with every top-level list of flat records (detailed_logs,
+#spending_history, penalties) stored column by column instead of as one object per entry:
+#
+#   {"__format__": "levelup-compact", "format_version": 2,
+#    "strings": ["2024-06-01", "Workout", "Health", ...],
+#    "lists": [[2], [2, 5], ...],
+#    "tables": {"detailed_logs": {"rows": 2, "columns": {"date": [0, 0], "category": [0, 1], "xp": [20, 10], ...},
+#                                 "interned": ["date", ...], "interned_lists": ["category"],
+#                                 "missing": {"penalty_id": [0]}}},
+#    "state": {... every other key, unchanged ...}, "order": [the original key order]}
+#
+#Columns whose values are all strings are interned: the column holds indexes into "strings",
+#so a task name or date that repeats thousands of times is stored once. Columns whose values are
+#all lists of strings (a log's categories) are interned the same way: each different list is stored
+#once in "lists" as string indexes, and the column holds indexes into "lists". Keys an entry does not
+#have are listed under "missing" by row, so decoding gives back exactly the dicts that were encoded.
+#Version 1 files (without "lists") are still read.
+
+FORMAT_TAG = "levelup-compact"
+FORMAT_VERSION = 2
+FORMATS = ("json", "compact")
+_SCALARS = (str, int, float, bool, type(None))
+
+
+### Helper Functions
+
+def detect(text):
+    """
+    Works out which format a snapshot was written in from its first characters.
+    Args:
+        text (str): The start of the snapshot (the first 32 characters are enough).
+    Returns:
+        str: "compact" or "json".
+    """
+    return "compact" if text.lstrip().startswith('{"__format__"') else "json"
+
+def _is_table(value):
+    """
+    Checks whether a value is a non-empty list of dicts whose values are scalars or lists of scalars,
+    which can be stored by column.
+    """
+    if not isinstance(value, list) or not value:
+        return False
+    for entry in value:
+        if not isinstance(entry, dict):
+            return False
+        for item in entry.values():
+            if not isinstance(item, _SCALARS) and not (type(item) is list and all(isinstance(v, _SCALARS) for v in item)):
+                return False
+    return True
+
+def _intern(value, strings, string_ids):
+    """
+    Gets the index of a string in strings, adding it if it is new.
+    """
+    index = string_ids.get(value)
+    if index is None:
+        index = string_ids[value] = len(strings)
+        strings.append(value)
+    return index
+
+def _encode_table(rows, strings, string_ids, lists, list_ids):
+    """
+    Turns a list of flat dicts into columns, interning the all-string columns into strings and the
+    all-string-list columns into lists.
+    """
+    names = {}
+    for entry in rows:
+        for key in entry:
+            if key not in names:
+                names[key] = None
+    columns = {}
+    missing = {}
+    interned = []
+    interned_lists = []
+    for key in names:
+        column = []
+        gaps = []
+        for i, entry in enumerate(rows):
+            if key in entry:
+                column.append(entry[key])
+            else:
+                column.append(None)
+                gaps.append(i)
+        if gaps:
+            missing[key] = gaps
+        skip = set(gaps)
+        present = [v for i, v in enumerate(column) if i not in skip]
+        if all(type(v) is str for v in present):
+            # 0 is a placeholder for a missing key
+            column = [0 if i in skip else _intern(v, strings, string_ids) for i, v in enumerate(column)]
+            interned.append(key)
+        elif all(type(v) is list and all(type(item) is str for item in v) for v in present):
+            ids = []
+            for i, v in enumerate(column):
+                if i in skip:
+                    ids.append(0)
+                    continue
+                members = tuple(_intern(item, strings, string_ids) for item in v)
+                index = list_ids.get(members)
+                if index is None:
+                    index = list_ids[members] = len(lists)
+                    lists.append(list(members))
+                ids.append(index)
+            column = ids
+            interned_lists.append(key)
+        columns[key] = column
+    table = {"rows": len(rows), "columns": columns}
+    if interned:
+        table["interned"] = interned
+    if interned_lists:
+        table["interned_lists"] = interned_lists
+    if missing:
+        table["missing"] = missing
+    return table
+
+def _decode_table(table, strings, lists):
+    """
+    Rebuilds the list of dicts from a column table. Every row gets its own copy of an interned list.
+    """
+    columns = table["columns"]
+    for key in table.get("interned", ()):
+        columns[key] = list(map(strings.__getitem__, columns[key]))
+    for key in table.get("interned_lists", ()):
+        columns[key] = [list(lists[i]) for i in columns[key]]
+    keys = list(columns)
+    rows = [dict(zip(keys, values)) for values in zip(*(columns[key] for key in keys))]
+    if not keys:
+        rows = [{} for _ in range(table["rows"])]
+    for key, gaps in table.get("missing", {}).items():
+        for i in gaps:
+            del rows[i][key]
+    return rows
+
+
+### Encode and Decode
+
+def encode(state, fmt="json"):
+    """
+    Serializes a state dictionary for writing to disk.
+    Args:
+        state (dict): The state (progress or rewards).
+        fmt (str): "json" (indented, the original layout) or "compact" (columnar, interned).
+    Returns:
+        str: The snapshot text.
+    """
+    if fmt == "json":
+        return json.dumps(state, indent=4)
+    if fmt != "compact":
+        raise ValueError(f"Unknown snapshot format: {fmt} (expected one of {', '.join(FORMATS)})")
+    strings = []
+    string_ids = {}
+    lists = []
+    list_ids = {}
+    tables = {}
+    rest = {}
+    for key, value in state.items():
+        if _is_table(value):
+            tables[key] = _encode_table(value, strings, string_ids, lists, list_ids)
+        else:
+            rest[key] = value
+    # __format__ goes first so detect() only has to look at the start of the file
+    compact = {
+        "__format__": FORMAT_TAG, "format_version": FORMAT_VERSION, "strings": strings, "lists": lists,
+        "tables": tables, "state": rest, "order": list(state)
+    }
+    return json.dumps(compact, separators=(',', ':'))
+
+def decode(text):
+    """
+    Parses a snapshot written in either format.
+    Args:
+        text (str): The snapshot text.
+    Returns:
+        dict: The state.
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict) or data.get("__format__") != FORMAT_TAG:
+        return data
+    if data.get("format_version", 1) > FORMAT_VERSION:
+        raise ValueError(f"Snapshot format version {data['format_version']} is newer than this version of the app supports")
+    strings = data["strings"]
+    lists = [[strings[i] for i in members] for members in data.get("lists", ())]
+    rest = data["state"]
+    tables = {key: _decode_table(table, strings, lists) for key, table in data["tables"].items()}
+    # Rebuild the keys in their original order
+    return {key: tables[key] if key in tables else rest[key] for key in data.get("order", list(rest) + list(tables))}
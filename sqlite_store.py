@@ -0,0 +1,987 @@
+#imports
+import json
+import os
+import sqlite3
+import threading
+import time
+import storage
+import streaks
+
+#The purpose of this module is to keep progress and rewards in a local SQLite file instead of JSON.
+#It is used by storage.py when LEVELUP_STORAGE=sqlite is set (no server, just data/levelup.db).
+#detailed_logs, period completion counts, penalties and spending history live in their own indexed
+#tables, so history pages and period lookups are indexed queries instead of full scans, and
+#per-category XP is read from the running totals in category_xp.
+#Only the small parts of progress (XP, level, penalties) are loaded into session state.
+#The streak statistics (see streaks.py) are kept in the streak tables, one row per series or bucket,
+#so logging a task reads and writes only the rows of that task, its categories and the overall series.
+#Each thread keeps one open connection per database (see connect), so a lookup such as
+#completion_count is a single indexed query, not a connect plus the schema script.
+#Migrate existing JSON files once with: python manage.py migrate
+
+
+### Configuration
+DB_NAME = "levelup.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    file TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (file, key)
+);
+CREATE TABLE IF NOT EXISTS detailed_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    xp INTEGER NOT NULL,
+    type TEXT,
+    period_key TEXT,
+    penalty_id TEXT,
+    category TEXT NOT NULL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logs_date_id ON detailed_logs (date, id);
+CREATE TABLE IF NOT EXISTS log_categories (
+    log_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    xp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_log_categories_category ON log_categories (category, xp);
+CREATE INDEX IF NOT EXISTS idx_log_categories_log ON log_categories (log_id);
+CREATE TABLE IF NOT EXISTS category_xp (
+    category TEXT PRIMARY KEY,
+    xp INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completions (
+    task_type TEXT NOT NULL,
+    task_name TEXT NOT NULL,
+    period_key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (task_type, task_name, period_key)
+);
+CREATE TABLE IF NOT EXISTS completions_archive (
+    task_type TEXT NOT NULL,
+    task_name TEXT NOT NULL,
+    period_key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (task_type, task_name, period_key)
+);
+CREATE TABLE IF NOT EXISTS completion_rollups (
+    task_type TEXT NOT NULL,
+    task_name TEXT NOT NULL,
+    period TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (task_type, task_name, period)
+);
+CREATE TABLE IF NOT EXISTS penalties (
+    position INTEGER PRIMARY KEY,
+    id TEXT UNIQUE,
+    completed INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spending_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS streak_series (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    runs TEXT NOT NULL,
+    longest INTEGER NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+CREATE TABLE IF NOT EXISTS streak_activity (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, category)
+);
+CREATE TABLE IF NOT EXISTS streak_done (
+    task_type TEXT NOT NULL,
+    period_key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (task_type, period_key)
+);
+INSERT OR IGNORE INTO meta (file, key, value) SELECT 'detailed_logs', 'count', (SELECT COUNT(*) FROM detailed_logs)
+    WHERE NOT EXISTS (SELECT 1 FROM meta WHERE file = 'detailed_logs' AND key = 'count');
+"""
+
+LOG_FIELDS = ('id', 'date', 'name', 'xp', 'type', 'period_key', 'penalty_id', 'category')
+
+_local = threading.local() #per thread: database path -> (inode, open connection)
+_schema_ready = set() #(database path, inode) whose tables were created by this process
+_schema_guard = threading.Lock()
+_inherited = [] #connections of the parent process, in a forked child (never used or closed)
+
+
+### Connection Functions
+
+def db_path(file_path):
+    """
+    Gets the database that replaces a JSON file (it sits in the same data folder).
+    Args:
+        file_path (str): The path to the JSON file, e.g. data/progress.json.
+    Returns:
+        str: The path to the SQLite database.
+    """
+    return os.path.join(os.path.dirname(file_path), DB_NAME)
+
+def file_key(file_path):
+    """
+    Gets the name a JSON file is stored under in the database ('progress' or 'rewards').
+    Args:
+        file_path (str): The path to the JSON file.
+    Returns:
+        str: The file name without the .json extension.
+    """
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def _inode(path):
+    """
+    Gets the inode of a file, or None if it does not exist.
+    """
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+def _drop_inherited_connections():
+    """
+    Makes a forked child open its own connections. The parent's are kept referenced (not closed),
+    because closing them in the child could clean up files the parent is still using.
+    """
+    _inherited.append(_local.__dict__.pop("connections", None))
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_drop_inherited_connections)
+
+def connect(file_path):
+    """
+    Gets this thread's connection to the database for a JSON file. The connection is opened on the
+    first call and kept for the next ones, and the tables are created once per database file, so a
+    query costs a stat instead of a connect and the schema script. A database that was deleted or
+    replaced gets a new connection. Don't close the connection; use it as a context manager
+    (with connect(...) as conn:) to commit or roll back a transaction.
+    Args:
+        file_path (str): The path to the JSON file.
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    path = os.path.abspath(db_path(file_path))
+    connections = _local.__dict__.setdefault("connections", {})
+    inode = _inode(path)
+    cached = connections.get(path)
+    if cached is not None and cached[0] == inode:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    created = inode is None # a new file can get the inode number of a deleted one
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute(f"PRAGMA synchronous={'FULL' if storage.FSYNC else 'OFF'}")
+    inode = _inode(path)
+    with _schema_guard:
+        if created or (path, inode) not in _schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL") # stored in the file, so once is enough
+            conn.executescript(SCHEMA)
+            _move_streaks(conn)
+            _schema_ready.add((path, inode))
+    connections[path] = (inode, conn)
+    return conn
+
+
+def _move_streaks(conn):
+    """
+    Moves streak statistics kept as one meta value (databases from before the streak tables) into the tables.
+    """
+    if 'tasks' not in _get_meta(conn, 'progress').get('streaks', {}):
+        return
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        stats = _get_meta(conn, 'progress').get('streaks', {})
+        if 'tasks' in stats: # not moved by another process in the meantime
+            _save_streaks(conn, stats)
+
+def _begin(conn):
+    """
+    Starts a write transaction, taking the database write lock right away so the version check
+    and the write see the same data. The wait is added to storage.lock_stats().
+    """
+    start = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    storage.note_lock_wait(time.perf_counter() - start)
+
+def _bump_version(conn, name):
+    """
+    Advances the version of a file by one and returns the new version.
+    """
+    version = _get_meta(conn, name).get('version', 0) + 1
+    _set_meta(conn, name, 'version', version)
+    return version
+
+
+### Row Helpers
+
+def _get_meta(conn, name):
+    """
+    Gets all top-level scalar values stored for a file.
+    """
+    rows = conn.execute("SELECT key, value FROM meta WHERE file = ?", (name,))
+    return {key: json.loads(value) for key, value in rows}
+
+def _set_meta(conn, name, key, value):
+    """
+    Stores one top-level value for a file.
+    """
+    conn.execute(
+        "INSERT INTO meta (file, key, value) VALUES (?, ?, ?) "
+        "ON CONFLICT (file, key) DO UPDATE SET value = excluded.value",
+        (name, key, json.dumps(value))
+    )
+
+def _row_to_log(row):
+    """
+    Converts a detailed_logs row back into the dictionary shape used in progress.json.
+    """
+    log_id, date, name, xp, log_type, period_key, penalty_id, category, extra = row
+    log = {"name": name, "xp": xp, "category": json.loads(category), "type": log_type, "date": date, "id": log_id}
+    if period_key is not None:
+        log['period_key'] = period_key
+    if penalty_id is not None:
+        log['penalty_id'] = penalty_id
+    if extra:
+        log.update(json.loads(extra))
+    return log
+
+def _insert_log(conn, log):
+    """
+    Inserts a detailed_logs entry and its per-category rows. Entries without an id get the next row id.
+    """
+    extra = {k: v for k, v in log.items() if k not in LOG_FIELDS}
+    cursor = conn.execute(
+        "INSERT INTO detailed_logs (id, date, name, xp, type, period_key, penalty_id, category, extra) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (log.get('id'), log.get('date', ''), log.get('name', ''), log.get('xp', 0), log.get('type'), log.get('period_key'),
+         log.get('penalty_id'), json.dumps(log.get('category', [])), json.dumps(extra) if extra else None)
+    )
+    conn.executemany(
+        "INSERT INTO log_categories (log_id, category, xp) VALUES (?, ?, ?)",
+        [(cursor.lastrowid, cat, log.get('xp', 0)) for cat in log.get('category', [])]
+    )
+    _add_category_xp(conn, log, 1)
+    _add_log_count(conn, 1)
+
+def _add_log_count(conn, delta):
+    """
+    Adds delta to the number of detailed_logs rows kept in meta, so history pages don't count the table.
+    """
+    conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE file = 'detailed_logs' AND key = 'count'", (delta,))
+
+def _add_category_xp(conn, log, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) a log entry's XP from the running per-category totals.
+    """
+    conn.executemany(
+        "INSERT INTO category_xp (category, xp) VALUES (?, ?) "
+        "ON CONFLICT (category) DO UPDATE SET xp = xp + excluded.xp",
+        [(cat, sign * log.get('xp', 0)) for cat in log.get('category', [])]
+    )
+
+def _set_xp(conn, xp):
+    """
+    Stores the XP total with its level and XP to the next level.
+    """
+    xp = max(xp, 0)
+    level = storage.calculate_level(xp)
+    _set_meta(conn, 'progress', 'current_xp', xp)
+    _set_meta(conn, 'progress', 'current_level', level)
+    _set_meta(conn, 'progress', 'xp_to_next_level', level * 100 - xp)
+
+def _add_completion(conn, task_type, task_name, period_key, delta):
+    """
+    Adds delta to the completion count of a task for a period (never below 0).
+    """
+    conn.execute(
+        "INSERT INTO completions (task_type, task_name, period_key, count) VALUES (?, ?, ?, MAX(?, 0)) "
+        "ON CONFLICT (task_type, task_name, period_key) DO UPDATE SET count = MAX(count + ?, 0)",
+        (task_type, task_name, period_key, delta, delta)
+    )
+
+def _completion(conn, task_type, task_name, period_key):
+    """
+    Gets the completion count of a task for a period.
+    """
+    row = conn.execute(
+        "SELECT count FROM completions WHERE task_type = ? AND task_name = ? AND period_key = ?", (task_type, task_name, period_key)
+    ).fetchone()
+    return row[0] if row else 0
+
+def _day_categories(conn, day):
+    """
+    Gets the categories of each task log (not penalties) left on one day, for a day whose streak activity was dropped.
+    """
+    rows = conn.execute("SELECT category FROM detailed_logs WHERE date = ? AND type IS NOT NULL AND type != 'penalty'", (day,))
+    return [json.loads(category) for (category,) in rows]
+
+def _series_rows(stats):
+    """
+    Gets the (kind, name, series) of every series in streak statistics: tasks by their task type,
+    categories as "category" and the overall series as ("overall", "").
+    """
+    rows = [(kind, name, series) for kind in streaks.KINDS for name, series in stats['tasks'][kind].items()]
+    rows += [("category", cat, series) for cat, series in stats['categories'].items()]
+    return rows + [("overall", "", stats['overall'])]
+
+def _write_series(conn, rows):
+    conn.executemany(
+        "INSERT INTO streak_series (kind, name, runs, longest) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (kind, name) DO UPDATE SET runs = excluded.runs, longest = excluded.longest",
+        [(kind, name, json.dumps(series['runs']), series['longest']) for kind, name, series in rows]
+    )
+
+def _save_streaks(conn, stats):
+    """
+    Replaces the stored streak statistics: the series and buckets go in the streak tables, and
+    meta keeps only kept_from under progress 'streaks' (which marks that the statistics are kept).
+    """
+    for table in ('streak_series', 'streak_activity', 'streak_done'):
+        conn.execute(f"DELETE FROM {table}")
+    _write_series(conn, _series_rows(stats))
+    conn.executemany(
+        "INSERT INTO streak_activity (day, category, count) VALUES (?, ?, ?)",
+        [(day, cat, count) for day, counts in stats['activity'].items() for cat, count in counts.items()]
+    )
+    conn.executemany(
+        "INSERT INTO streak_done (task_type, period_key, count) VALUES (?, ?, ?)",
+        [(kind, key, count) for kind, done in stats['done'].items() for key, count in done.items()]
+    )
+    _set_meta(conn, 'progress', 'streaks', {"kept_from": stats.get('kept_from', {})})
+
+def _load_streaks(conn, header):
+    """
+    Gets the whole streak statistics from the streak tables (see _save_streaks).
+    """
+    stats = streaks.empty_stats()
+    stats['kept_from'] = header.get('kept_from', {})
+    for kind, name, runs, longest in conn.execute("SELECT kind, name, runs, longest FROM streak_series"):
+        series = {"runs": json.loads(runs), "longest": longest}
+        if kind == "overall":
+            stats['overall'] = series
+        elif kind == "category":
+            stats['categories'][name] = series
+        else:
+            stats['tasks'][kind][name] = series
+    for day, cat, count in conn.execute("SELECT day, category, count FROM streak_activity ORDER BY day"):
+        stats['activity'].setdefault(day, {})[cat] = count
+    for kind, key, count in conn.execute("SELECT task_type, period_key, count FROM streak_done"):
+        stats['done'][kind][key] = count
+    return stats
+
+def _update_streaks(conn, change, task_type, name, key, flag, day, categories, *args):
+    """
+    Applies a streaks.py update to the stored statistics, if this database has them (see storage.rebuild_streaks).
+    Only the rows the update can touch are read into a partial statistics dict and written back: the task's,
+    its categories' and the overall series, the done count of its period and the (few) activity buckets.
+    """
+    row = conn.execute("SELECT value FROM meta WHERE file = 'progress' AND key = 'streaks'").fetchone()
+    if row is None:
+        return
+    kept_from = json.loads(row[0]).get('kept_from', {})
+    stats = streaks.empty_stats()
+    stats['kept_from'] = dict(kept_from)
+    wanted = [(task_type, name)] if task_type in streaks.KINDS else []
+    wanted += [("category", cat) for cat in categories] + [("overall", "")]
+    for kind, series_name in wanted:
+        found = conn.execute("SELECT runs, longest FROM streak_series WHERE kind = ? AND name = ?", (kind, series_name)).fetchone()
+        series = {"runs": json.loads(found[0]), "longest": found[1]} if found else streaks.new_series()
+        if kind == "overall":
+            stats['overall'] = series
+        elif found and kind == "category":
+            stats['categories'][series_name] = series
+        elif found:
+            stats['tasks'][kind][series_name] = series
+    for bucket_day, cat, count in conn.execute("SELECT day, category, count FROM streak_activity ORDER BY day"):
+        stats['activity'].setdefault(bucket_day, {})[cat] = count
+    days = set(stats['activity'])
+    done = stats['done'].get(task_type)
+    if done is not None:
+        found = conn.execute("SELECT count FROM streak_done WHERE task_type = ? AND period_key = ?", (task_type, key)).fetchone()
+        if found:
+            done[key] = found[0]
+
+    change(stats, task_type, name, key, flag, day, categories, *args)
+
+    _write_series(conn, _series_rows(stats))
+    conn.executemany("DELETE FROM streak_activity WHERE day = ?", [(d,) for d in days - set(stats['activity']) | {day}])
+    conn.executemany(
+        "INSERT INTO streak_activity (day, category, count) VALUES (?, ?, ?)",
+        [(day, cat, count) for cat, count in stats['activity'].get(day, {}).items()]
+    )
+    if done is not None:
+        if key in done:
+            conn.execute(
+                "INSERT INTO streak_done (task_type, period_key, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (task_type, period_key) DO UPDATE SET count = excluded.count", (task_type, key, done[key])
+            )
+            if done[key] == 1:
+                _trim_done(conn, stats, task_type)
+        else:
+            conn.execute("DELETE FROM streak_done WHERE task_type = ? AND period_key = ?", (task_type, key))
+    if stats['kept_from'] != kept_from:
+        _set_meta(conn, 'progress', 'streaks', {"kept_from": stats['kept_from']})
+
+def _trim_done(conn, stats, task_type):
+    """
+    Drops the done counts of a task type that streaks.KEEP no longer keeps, once there are too many of them.
+    """
+    if conn.execute("SELECT COUNT(*) FROM streak_done WHERE task_type = ?", (task_type,)).fetchone()[0] <= 2 * streaks.KEEP[task_type]:
+        return
+    done = dict(conn.execute("SELECT period_key, count FROM streak_done WHERE task_type = ?", (task_type,)).fetchall())
+    kept = set(done)
+    streaks._trim(stats, task_type, done, task_type)
+    conn.executemany("DELETE FROM streak_done WHERE task_type = ? AND period_key = ?", [(task_type, k) for k in kept - set(done)])
+
+
+### Load and Save Functions
+
+def load(file_path):
+    """
+    Loads the session-state view of progress or rewards from the database.
+    For progress this holds XP, level, penalties and XP per category but not detailed_logs or completed_tasks,
+    which are read with the query functions below.
+    Args:
+        file_path (str): The path to the JSON file the data replaces.
+    Returns:
+        dict: The loaded state.
+    """
+    name = file_key(file_path)
+    with connect(file_path) as conn:
+        state = _get_meta(conn, name)
+        if name == 'progress':
+            rows = conn.execute("SELECT data FROM penalties ORDER BY position")
+            state['penalties'] = [json.loads(data) for (data,) in rows]
+            state['xp_by_category'] = dict(conn.execute("SELECT category, xp FROM category_xp").fetchall())
+            if 'streaks' in state:
+                state['streaks'] = _load_streaks(conn, state['streaks'])
+        elif name == 'rewards':
+            money = state.setdefault('money_tracking', {})
+            rows = conn.execute("SELECT date, amount, description FROM spending_history ORDER BY id")
+            money['spending_history'] = [
+                {'date': date, 'amount': amount, 'description': description} for date, amount, description in rows
+            ]
+    return state
+
+def save(file_path, data, force=False):
+    """
+    Replaces the stored data for progress or rewards.
+    detailed_logs, completed_tasks and daily_logs are only replaced if they are in data,
+    so saving the session-state view (without them) keeps the history.
+    Args:
+        file_path (str): The path to the JSON file the data replaces.
+        data (dict): The data to store. Its version is advanced.
+        force (bool): If True, overwrite even if the data was written since data was loaded.
+    Returns:
+        None
+    """
+    name = file_key(file_path)
+    with connect(file_path) as conn:
+        _begin(conn)
+        version = _get_meta(conn, name).get('version', 0)
+        if not force and data.get('version') != version:
+            storage._lock_stats["stale_saves"] += 1
+            raise storage.StaleStateError(f"{name} changed since it was loaded (version {data.get('version')}, now {version})")
+        conn.execute("DELETE FROM meta WHERE file = ?", (name,))
+        for key, value in data.items():
+            if name == 'progress' and key in ('detailed_logs', 'completed_tasks', 'completed_rollups', 'penalties', 'daily_logs', 'xp_by_category', 'next_log_id'):
+                continue
+            if name == 'progress' and key == 'streaks':
+                _save_streaks(conn, value)
+                continue
+            if name == 'rewards' and key == 'money_tracking':
+                value = {k: v for k, v in value.items() if k != 'spending_history'}
+            _set_meta(conn, name, key, value)
+        data['version'] = version + 1
+        _set_meta(conn, name, 'version', data['version'])
+
+        if name == 'progress':
+            conn.execute("DELETE FROM penalties")
+            conn.executemany(
+                "INSERT INTO penalties (position, id, completed, data) VALUES (?, ?, ?, ?)",
+                [(i, p.get('id'), int(p.get('completed', False)), json.dumps(p)) for i, p in enumerate(data.get('penalties', []))]
+            )
+            if 'detailed_logs' in data:
+                conn.execute("DELETE FROM detailed_logs")
+                conn.execute("DELETE FROM log_categories")
+                conn.execute("DELETE FROM category_xp")
+                _set_meta(conn, 'detailed_logs', 'count', 0)
+                for log in data['detailed_logs']:
+                    _insert_log(conn, log)
+            if 'completed_tasks' in data:
+                conn.execute("DELETE FROM completions")
+                for task_type, tasks in data['completed_tasks'].items():
+                    if not isinstance(tasks, dict): # older resets stored one_time as a list
+                        continue
+                    for task_name, counts in tasks.items():
+                        for period_key, count in counts.items():
+                            _add_completion(conn, task_type, task_name, period_key, count)
+            if 'completed_rollups' in data:
+                conn.execute("DELETE FROM completion_rollups")
+                for task_type, tasks in data['completed_rollups'].items():
+                    for task_name, totals in tasks.items():
+                        conn.executemany(
+                            "INSERT INTO completion_rollups (task_type, task_name, period, count) VALUES (?, ?, ?, ?)",
+                            [(task_type, task_name, period, count) for period, count in totals.items()]
+                        )
+            if 'daily_logs' in data:
+                conn.execute("DELETE FROM daily_logs")
+                conn.executemany("INSERT INTO daily_logs (data) VALUES (?)", [(json.dumps(d),) for d in data['daily_logs']])
+        elif name == 'rewards':
+            conn.execute("DELETE FROM spending_history")
+            conn.executemany(
+                "INSERT INTO spending_history (date, amount, description) VALUES (?, ?, ?)",
+                [(s['date'], float(s['amount']), s['description']) for s in data.get('money_tracking', {}).get('spending_history', [])]
+            )
+
+
+### Event Functions
+
+def _apply_task_completed(conn, event):
+    """
+    Increments the period count, awards XP and logs the task.
+    """
+    _add_completion(conn, event['task_type'], event['name'], event['period_key'], 1)
+    first = _completion(conn, event['task_type'], event['name'], event['period_key']) == 1
+    _update_streaks(conn, streaks.task_logged, event['task_type'], event['name'], event['period_key'], first, event['date'], event['category'])
+    meta = _get_meta(conn, 'progress')
+    _set_xp(conn, meta.get('current_xp', 0) + event['xp'])
+    _insert_log(conn, {
+        "name": event['name'],
+        "xp": event['xp'],
+        "category": event['category'],
+        "type": event['task_type'],
+        "date": event['date'],
+        "period_key": event['period_key']
+    })
+
+def _apply_penalty_completed(conn, event):
+    """
+    Marks a penalty as completed (by id, or by position for penalties without an id) and logs it.
+    """
+    row = conn.execute("SELECT position, data FROM penalties WHERE id = ?", (event['penalty_id'],)).fetchone()
+    if row is None:
+        row = conn.execute("SELECT position, data FROM penalties WHERE position = ?", (event.get('index', -1),)).fetchone()
+    if row is None:
+        return
+    position, data = row
+    penalty = json.loads(data)
+    penalty.setdefault('id', event['penalty_id'])
+    penalty['completed'] = True
+    conn.execute(
+        "UPDATE penalties SET id = ?, completed = 1, data = ? WHERE position = ?",
+        (penalty['id'], json.dumps(penalty), position)
+    )
+    _insert_log(conn, {
+        "name": penalty['description'],
+        "xp": 0,
+        "category": ["Penalty"],
+        "type": "penalty",
+        "date": event['date'],
+        "penalty_id": penalty['id']
+    })
+
+def _period_logged(conn, task_type, task_name, period_key):
+    """
+    Checks whether detailed_logs still has an entry of a task in a period, looking only at the days it can be logged on.
+    """
+    days = streaks.log_days(task_type, period_key)
+    if days is None:
+        return False
+    return conn.execute(
+        "SELECT 1 FROM detailed_logs WHERE date BETWEEN ? AND ? AND type = ? AND name = ? AND period_key = ? LIMIT 1",
+        (days[0], days[1], task_type, task_name, period_key)
+    ).fetchone() is not None
+
+def _apply_log_deleted(conn, event):
+    """
+    Deletes a detailed_logs row by its id and undoes its effect.
+    """
+    row = conn.execute("SELECT * FROM detailed_logs WHERE id = ?", (event['log_id'],)).fetchone()
+    if row is None:
+        return
+    log = _row_to_log(row)
+    conn.execute("DELETE FROM detailed_logs WHERE id = ?", (event['log_id'],))
+    conn.execute("DELETE FROM log_categories WHERE log_id = ?", (event['log_id'],))
+    _add_log_count(conn, -1)
+    _add_category_xp(conn, log, -1)
+
+    if log.get('type') == 'penalty':
+        penalty_id = log.get('penalty_id')
+        row = conn.execute("SELECT position, data FROM penalties WHERE id = ?", (penalty_id,)).fetchone()
+        if penalty_id and row:
+            penalty = json.loads(row[1])
+            penalty['completed'] = False
+            conn.execute("UPDATE penalties SET completed = 0, data = ? WHERE position = ?", (json.dumps(penalty), row[0]))
+        return
+
+    if log.get('type') and log.get('period_key'):
+        had = _completion(conn, log['type'], log['name'], log['period_key'])
+        if had:
+            _add_completion(conn, log['type'], log['name'], log['period_key'], -1)
+            emptied = had == 1
+        else: # the period was archived (see retention.py); look at the history instead
+            emptied = not _period_logged(conn, log['type'], log['name'], log['period_key'])
+        _update_streaks(conn, streaks.task_unlogged, log['type'], log['name'], log['period_key'], emptied, log['date'], log.get('category', []),
+                        _day_categories(conn, log['date']))
+    meta = _get_meta(conn, 'progress')
+    _set_xp(conn, meta.get('current_xp', 0) - log.get('xp', 0))
+
+def _apply_spending_added(conn, event):
+    """
+    Records a spending entry against the money tracking balance.
+    """
+    money = _get_meta(conn, 'rewards').get('money_tracking', {})
+    money['total_spent'] = float(money.get('total_spent', 0)) + float(event['amount'])
+    money['current_balance'] = float(money.get('current_balance', 0)) - float(event['amount'])
+    _set_meta(conn, 'rewards', 'money_tracking', money)
+    conn.execute(
+        "INSERT INTO spending_history (date, amount, description) VALUES (?, ?, ?)",
+        (event['date'], float(event['amount']), event['description'])
+    )
+
+def _apply_day_logged(conn, event):
+    """
+    Adds a summary of one submission to daily_logs, with the level reached.
+    """
+    level = event['level'] if 'level' in event else _get_meta(conn, 'progress').get('current_level', 1) # imported summaries keep their level
+    conn.execute("INSERT INTO daily_logs (data) VALUES (?)", (json.dumps({
+        "date": event['date'],
+        "completed": event['completed'],
+        "earned_xp": event['earned_xp'],
+        "level": level
+    }),))
+
+def _apply_batch(conn, event):
+    """
+    Applies a group of events recorded together (already inside one transaction).
+    """
+    for sub_event in event['events']:
+        _apply(conn, sub_event)
+
+def _apply_penalty_assigned(conn, event):
+    """
+    Adds a new penalty after the existing ones.
+    """
+    position = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM penalties").fetchone()[0]
+    penalty = event['penalty']
+    conn.execute(
+        "INSERT INTO penalties (position, id, completed, data) VALUES (?, ?, ?, ?)",
+        (position, penalty.get('id'), int(penalty.get('completed', False)), json.dumps(penalty))
+    )
+
+def _apply_days_checked(conn, event):
+    """
+    Adds the penalties of the nightly check, skipping days that were already checked, and moves daily_checked_through.
+    """
+    checked = _get_meta(conn, 'progress').get('daily_checked_through')
+    for penalty in event['penalties']:
+        if checked is None or penalty['missed_date'] > checked:
+            _apply_penalty_assigned(conn, {"penalty": penalty})
+    if checked is None or event['through'] > checked:
+        _set_meta(conn, 'progress', 'daily_checked_through', event['through'])
+
+def _apply_reward_claimed(conn, event):
+    """
+    Marks a level reward as claimed and adds its money to the balance.
+    """
+    meta = _get_meta(conn, 'rewards')
+    reward = next((r for r in meta.get('rewards', []) if r.get('level') == event['level']), None)
+    if reward is None or reward.get('claimed'):
+        return
+    reward['claimed'] = True
+    money = meta['money_tracking']
+    money['total_earned'] = float(money['total_earned']) + float(event['amount'])
+    money['current_balance'] = float(money['current_balance']) + float(event['amount'])
+    _set_meta(conn, 'rewards', 'rewards', meta['rewards'])
+    _set_meta(conn, 'rewards', 'money_tracking', money)
+
+EVENT_HANDLERS = {
+    "task_completed": _apply_task_completed,
+    "penalty_completed": _apply_penalty_completed,
+    "log_deleted": _apply_log_deleted,
+    "spending_added": _apply_spending_added,
+    "penalty_assigned": _apply_penalty_assigned,
+    "days_checked": _apply_days_checked,
+    "reward_claimed": _apply_reward_claimed,
+    "day_logged": _apply_day_logged,
+    "batch": _apply_batch,
+}
+
+def _apply(conn, event):
+    """
+    Applies one event to the database.
+    """
+    handler = EVENT_HANDLERS.get(event.get('event'))
+    if handler is None:
+        raise ValueError(f"Unknown event type: {event.get('event')}")
+    handler(conn, event)
+
+def record(file_path, state, events):
+    """
+    Applies events to the database in one transaction and refreshes the in-memory state.
+    If any event fails the transaction is rolled back and nothing is applied.
+    Args:
+        file_path (str): The path to the JSON file the data replaces.
+        state (dict): The session-state view, updated in place.
+        events (list): The event records (see storage.py).
+    Returns:
+        None
+    """
+    with connect(file_path) as conn:
+        _begin(conn)
+        if state.get('version', 0) != _get_meta(conn, file_key(file_path)).get('version', 0):
+            #Another writer got in first; the events apply on top of its changes
+            storage._lock_stats["conflicts"] += 1
+        for event in events:
+            _apply(conn, event)
+        _bump_version(conn, file_key(file_path))
+    state.clear()
+    state.update(load(file_path))
+
+def update(file_path, mutate):
+    """
+    Changes the session-state view of a file safely: loads it, lets mutate change it and saves it,
+    retrying if another writer got in between.
+    Args:
+        file_path (str): The path to the JSON file the data replaces.
+        mutate (function): Called with the state dictionary; changes it in place.
+    Returns:
+        dict: The saved state.
+    """
+    while True:
+        state = load(file_path)
+        mutate(state)
+        try:
+            save(file_path, state)
+            return state
+        except storage.StaleStateError:
+            continue
+
+
+### Query Functions
+
+def history_page(file_path, cursor, limit):
+    """
+    Gets one page of detailed_logs, newest first, starting after a cursor.
+    Uses the (date, id) index, so the cost does not depend on how deep the page is. The total comes from
+    the count kept in meta and the number of newer entries from the cursor; only a cursor without it
+    (jump to date) counts the newer entries.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        cursor (list): The [date, id] key of the last entry of the previous page, optionally followed by the
+            number of entries up to it (next-page cursors have it), or None for the newest page.
+        limit (int): The number of entries to return.
+    Returns:
+        tuple: The entries on this page, the cursor for the next page (None if this is the last page),
+            the number of newer entries before this page and the total number of entries.
+    """
+    with connect(file_path) as conn:
+        if cursor is None:
+            rows = conn.execute("SELECT * FROM detailed_logs ORDER BY date DESC, id DESC LIMIT ?", (limit + 1,)).fetchall()
+            newer = 0
+        else:
+            rows = conn.execute(
+                "SELECT * FROM detailed_logs WHERE (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?",
+                (cursor[0], cursor[1], limit + 1)
+            ).fetchall()
+            if len(cursor) > 2:
+                newer = cursor[2]
+            else:
+                newer = conn.execute(
+                    "SELECT COUNT(*) FROM detailed_logs WHERE (date, id) >= (?, ?)", (cursor[0], cursor[1])
+                ).fetchone()[0]
+        total = _get_meta(conn, 'detailed_logs')['count']
+    page = [_row_to_log(row) for row in rows[:limit]]
+    next_cursor = [page[-1]['date'], page[-1]['id'], newer + len(page)] if len(rows) > limit else None
+    return page, next_cursor, newer, total
+
+def xp_per_category(file_path):
+    """
+    Gets the XP earned per category from the running totals (one row per category).
+    Args:
+        file_path (str): The path to the progress JSON file.
+    Returns:
+        dict: A dictionary with the category as the key and the XP earned as the value.
+    """
+    with connect(file_path) as conn:
+        return dict(conn.execute("SELECT category, xp FROM category_xp").fetchall())
+
+def verify_xp_by_category(file_path, repair=False):
+    """
+    Checks the running per-category XP totals against a full recompute from log_categories.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        repair (bool): If True, rebuild the totals when they differ.
+    Returns:
+        dict: The mismatched categories, mapped to (stored XP, recomputed XP).
+    """
+    with connect(file_path) as conn:
+        stored = dict(conn.execute("SELECT category, xp FROM category_xp").fetchall())
+        actual = dict(conn.execute("SELECT category, SUM(xp) FROM log_categories GROUP BY category").fetchall())
+        mismatches = {
+            cat: (stored.get(cat, 0), actual.get(cat, 0))
+            for cat in set(stored) | set(actual) if stored.get(cat, 0) != actual.get(cat, 0)
+        }
+        if mismatches and repair:
+            conn.execute("DELETE FROM category_xp")
+            conn.executemany("INSERT INTO category_xp (category, xp) VALUES (?, ?)", actual.items())
+    return mismatches
+
+def completion_count(file_path, task_type, task_name, period_key):
+    """
+    Gets the completion count of a task for one period with a primary key lookup.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        task_type (str): The task type (daily, weekly, monthly, one-time).
+        task_name (str): The name of the task.
+        period_key (str): The period key, e.g. 2025-06-22.
+    Returns:
+        int: The completion count.
+    """
+    with connect(file_path) as conn:
+        row = conn.execute(
+            "SELECT count FROM completions WHERE task_type = ? AND task_name = ? AND period_key = ?",
+            (task_type, task_name, period_key)
+        ).fetchone()
+    return row[0] if row else 0
+
+
+def completion_history(file_path, task_type, task_name):
+    """
+    Gets every completion count of a task from the open and the archived periods.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        task_type (str): The task type.
+        task_name (str): The name of the task.
+    Returns:
+        dict: Period key -> completion count, for all periods with a count.
+    """
+    return completion_histories(file_path, task_type, [task_name])[task_name]
+
+def completion_histories(file_path, task_type, task_names):
+    """
+    Gets every completion count of several tasks of one type with one query.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        task_type (str): The task type.
+        task_names (list): The names of the tasks.
+    Returns:
+        dict: Task name -> period key -> completion count, for all periods with a count.
+    """
+    histories = {name: {} for name in task_names}
+    with connect(file_path) as conn:
+        rows = conn.execute(
+            "SELECT task_name, period_key, count FROM completions_archive WHERE task_type = ? AND count > 0 "
+            "UNION ALL SELECT task_name, period_key, count FROM completions WHERE task_type = ? AND count > 0",
+            (task_type, task_type)
+        )
+        for task_name, period_key, count in rows:
+            if task_name in histories: # a closed period can have both: completions imported after it was archived
+                histories[task_name][period_key] = histories[task_name].get(period_key, 0) + count
+    return histories
+
+def completion_rollups(file_path, task_type, task_name):
+    """
+    Gets the monthly and yearly completion totals of a task's archived periods.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        task_type (str): The task type.
+        task_name (str): The name of the task.
+    Returns:
+        dict: Month (2025-06) or year (2025) -> completion count.
+    """
+    with connect(file_path) as conn:
+        return dict(conn.execute(
+            "SELECT period, count FROM completion_rollups WHERE task_type = ? AND task_name = ?", (task_type, task_name)
+        ).fetchall())
+
+def rebuild_streaks(file_path):
+    """
+    Builds the streak statistics from the whole task history and stores them (one transaction).
+    """
+    with connect(file_path) as conn:
+        _begin(conn)
+        rows = conn.execute("SELECT * FROM detailed_logs ORDER BY date, id")
+        stats = streaks.build(_row_to_log(row) for row in rows)
+        _save_streaks(conn, stats)
+        _bump_version(conn, 'progress')
+    return stats
+
+def archive_periods(file_path, is_closed):
+    """
+    Moves closed completion periods to completions_archive and adds them to completion_rollups, in one transaction.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        is_closed (function): Called with (task_type, period_key); True if the period can be archived.
+    Returns:
+        int: The number of period entries archived.
+    """
+    with connect(file_path) as conn:
+        _begin(conn)
+        rows = conn.execute("SELECT task_type, task_name, period_key, count FROM completions").fetchall()
+        closed = [row for row in rows if is_closed(row[0], row[2])]
+        if not closed:
+            return 0
+        conn.executemany( # added, not replaced: an import can add completions to a period that was already archived
+            "INSERT INTO completions_archive (task_type, task_name, period_key, count) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (task_type, task_name, period_key) DO UPDATE SET count = count + excluded.count", closed
+        )
+        for task_type, task_name, period_key, count in closed:
+            for period in storage.rollup_keys(task_type, period_key):
+                conn.execute(
+                    "INSERT INTO completion_rollups (task_type, task_name, period, count) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (task_type, task_name, period) DO UPDATE SET count = count + ?",
+                    (task_type, task_name, period, count, count)
+                )
+        conn.executemany(
+            "DELETE FROM completions WHERE task_type = ? AND task_name = ? AND period_key = ?", [row[:3] for row in closed]
+        )
+        _bump_version(conn, file_key(file_path))
+    return len(closed)
+
+
+### Migration
+
+def migrate(progress_file, rewards_file):
+    """
+    Copies the current JSON progress and rewards (including their event logs) into the database.
+    The JSON files are left in place as a backup.
+    Args:
+        progress_file (str): The path to progress.json.
+        rewards_file (str): The path to rewards.json.
+    Returns:
+        dict: The number of rows migrated per table.
+    """
+    progress = storage.load_json(progress_file)
+    rewards = storage.load_json(rewards_file)
+    save(progress_file, progress, force=True)
+    save(rewards_file, rewards, force=True)
+    archive_file = storage.archive_path(progress_file)
+    archived = storage.load_json(archive_file).get('completed_tasks', {}) if os.path.exists(archive_file) else {}
+    with connect(progress_file) as conn:
+        conn.execute("DELETE FROM completions_archive")
+        for task_type, tasks in archived.items():
+            for task_name, counts in tasks.items():
+                conn.executemany(
+                    "INSERT INTO completions_archive (task_type, task_name, period_key, count) VALUES (?, ?, ?, ?)",
+                    [(task_type, task_name, period_key, count) for period_key, count in counts.items()]
+                )
+    return {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ('detailed_logs', 'completions', 'completions_archive', 'penalties', 'daily_logs', 'spending_history')
+    }
@@ -0,0 +1,1362 @@
+#imports
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import date
+import snapshot_format
+import streaks
+try:
+    import fcntl
+except ImportError: # Windows: only threads in this process are locked out
+    fcntl = None
+
+#The purpose of this module is to stop rewriting the whole progress.json on every click.
+#Each change (completing a task, completing a penalty, deleting a log, recording spending) is
+#appended as a small event record to a log file that sits next to the snapshot, e.g.
+#data/progress.json.log. When the file is loaded, the snapshot is read and the events are
+#folded into it. Once the log grows past COMPACT_BYTES it is compacted back into the snapshot.
+#Both app.py and auto_reset.py load and save their JSON files through this module.
+#
+#Loads are cached per process. A file is only parsed again when the stat signature
+#(inode, mtime, size) of its snapshot or its log changes, so changes written by the
+#cron job are still picked up on the next rerun. Every caller gets its own copy of the state.
+#The cache keeps the CACHE_FILES most recently used files, so a server with many users (see
+#tenants.py) holds the active users' states in memory and drops the idle ones.
+#
+#With LEVELUP_STORAGE=sqlite, progress and rewards are kept in data/levelup.db instead
+#(see sqlite_store.py). tasks.json is always a plain JSON file. Code that reads history,
+#XP per category or completion counts should use the query functions at the bottom of this
+#module so it works with both backends.
+#
+#Every detailed_logs entry has a stable integer 'id', and the list is kept sorted by
+#(date, id). The list itself is the history index: pages are fetched with a cursor
+#(the (date, id) key of the last entry shown) and entries are found by binary search.
+#
+#Writes are crash safe. Snapshots are written to a temp file and renamed over the old one,
+#so a reader never sees a half-written progress.json. Compaction (new snapshot + clearing
+#the log) is two steps, so the new snapshot is first written to a journal
+#(progress.json.journal); if the process dies part way, recover() finishes the job the next
+#time the file is loaded. A half-written last log line is cut off before the next append.
+#
+#Snapshots of progress and rewards can be written in the "compact" columnar format
+#(see snapshot_format.py) instead of indented JSON. Loading detects the format; writing keeps
+#the format the file already has unless LEVELUP_SNAPSHOT_FORMAT picks one.
+#
+#completed_tasks only keeps the periods that are still open (see retention.py). Closed periods
+#are moved to an archive file next to the snapshot (progress.archive.json) and summed into
+#per-task monthly and yearly totals in completed_rollups. The archive is only read by
+#completion_history() and completion_histories(), e.g. for the nightly check.
+
+
+### Configuration
+BACKEND = os.environ.get("LEVELUP_STORAGE", "json") #"json" or "sqlite"
+SQLITE_FILES = ("progress", "rewards") #files that move into the database with the sqlite backend
+LOG_SUFFIX = ".log"
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+ARCHIVE_SUFFIX = ".archive.json"
+FSYNC = os.environ.get("LEVELUP_FSYNC", "1") != "0" #set LEVELUP_FSYNC=0 to skip fsync (faster, but a power cut can lose the last writes)
+MAX_LOG_ID = 2 ** 62 #larger than any log id, used for "everything on or before this date" cursors
+COMPACT_BYTES = 64 * 1024 #compact the log into the snapshot once it is bigger than this
+SNAPSHOT_FORMAT = os.environ.get("LEVELUP_SNAPSHOT_FORMAT") #"json" or "compact"; unset keeps each file's current format
+CACHE_FILES = int(os.environ.get("LEVELUP_CACHE_FILES", "64")) #how many loaded files stay cached (3 per user)
+# Process-wide load cache: absolute file path (see _file_key) -> (signature, state), least recently used first
+_cache = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_cache_guard = threading.Lock()
+
+# Lock and conflict metrics for this process
+_lock_stats = {"acquisitions": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0, "conflicts": 0, "stale_saves": 0}
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+class StaleStateError(Exception):
+    """
+    Raised when saving a whole state that was loaded before another write to the same file.
+    """
+
+
+### Helper Functions
+
+def archive_path(file_path):
+    """
+    Gets the path of the archive that holds the closed completion periods of a snapshot.
+    Args:
+        file_path (str): The path to the JSON snapshot, e.g. data/progress.json.
+    Returns:
+        str: The archive path, e.g. data/progress.archive.json.
+    """
+    return os.path.splitext(file_path)[0] + ARCHIVE_SUFFIX
+
+def log_path(file_path):
+    """
+    Gets the path of the event log that belongs to a snapshot file.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        str: The path to the event log.
+    """
+    return file_path + LOG_SUFFIX
+
+def calculate_level(xp):
+    """
+    Calculates the level based on the experience points (XP).
+    Args:
+        xp (int): The experience points.
+    Returns:
+        int: The calculated level.
+    """
+    return (xp // 100) + 1
+
+def _set_xp(progress, xp):
+    """
+    Sets the current XP and recalculates the level and XP to the next level.
+    Args:
+        progress (dict): The progress dictionary.
+        xp (int): The new XP total.
+    Returns:
+        None
+    """
+    progress['current_xp'] = max(xp, 0)
+    progress['current_level'] = calculate_level(progress['current_xp'])
+    progress['xp_to_next_level'] = progress['current_level'] * 100 - progress['current_xp']
+
+def recompute_xp_by_category(logs):
+    """
+    Adds up the XP earned per category with a full pass over detailed_logs.
+    Only used to backfill and verify the running totals kept in progress['xp_by_category'].
+    Args:
+        logs (list): The detailed_logs entries.
+    Returns:
+        dict: A dictionary with the category as the key and the XP earned as the value.
+    """
+    xp_by_cat = {}
+    for entry in logs:
+        for cat in entry.get('category', []):
+            xp_by_cat[cat] = xp_by_cat.get(cat, 0) + entry.get('xp', 0)
+    return xp_by_cat
+
+def _add_category_xp(progress, log_entry, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) a log entry's XP from the running per-category totals.
+    Args:
+        progress (dict): The progress dictionary.
+        log_entry (dict): The detailed_logs entry.
+        sign (int): 1 when the entry is logged, -1 when it is deleted.
+    Returns:
+        None
+    """
+    totals = progress.setdefault('xp_by_category', {})
+    for cat in log_entry.get('category', []):
+        totals[cat] = totals.get(cat, 0) + sign * log_entry.get('xp', 0)
+
+def _copy(obj):
+    """
+    Copies JSON-like data (dicts, lists and scalars). Much faster than copy.deepcopy for this shape of data.
+    Args:
+        obj: The data to copy.
+    Returns:
+        A copy that shares no dicts or lists with the original.
+    """
+    if isinstance(obj, dict):
+        return {k: _copy(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy(v) for v in obj]
+    return obj
+
+def _stat_key(path):
+    """
+    Gets the (inode, mtime, size) of a file, or None if it does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _signature(file_path):
+    """
+    Gets the stat signature of a snapshot together with its event log.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        tuple: The signatures of the snapshot and the log.
+    """
+    return (_stat_key(file_path), _stat_key(log_path(file_path)))
+
+def file_version(file_path):
+    """
+    Gets a key that changes whenever a file or its event log changes on disk, for files without a
+    state version (like tasks.json, which is edited by hand).
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        tuple: The stat signature of the snapshot and its log.
+    """
+    return _signature(file_path)
+
+def cache_stats():
+    """
+    Gets the load cache counters for this process.
+    Args:
+        None
+    Returns:
+        dict: The number of cache hits and misses and the number of cached files.
+    """
+    return dict(_cache_stats, files=len(_cache), limit=CACHE_FILES)
+
+def clear_cache():
+    """
+    Empties the load cache and resets its counters.
+    Args:
+        None
+    Returns:
+        None
+    """
+    with _cache_guard:
+        _cache.clear()
+    _cache_stats["hits"] = 0
+    _cache_stats["misses"] = 0
+    _cache_stats["evictions"] = 0
+
+def _file_key(file_path):
+    """
+    Gets the key a file is cached and locked under in this process, so "data/progress.json" and its
+    absolute path (as the watcher uses) share one cache entry and one thread lock.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        str: The absolute path.
+    """
+    return os.path.abspath(file_path)
+
+def _cache_get(file_path):
+    """
+    Gets the cached (signature, state) of a file and marks it as recently used.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        tuple: (signature, state), or None if the file is not cached.
+    """
+    key = _file_key(file_path)
+    with _cache_guard:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+        return cached
+
+def _cache_put(file_path, signature, state):
+    """
+    Caches the state of a file, dropping the least recently used files beyond CACHE_FILES.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+        signature (tuple): The stat signature the state belongs to (see _signature).
+        state (dict): The state, owned by the cache from now on.
+    Returns:
+        None
+    """
+    key = _file_key(file_path)
+    with _cache_guard:
+        _cache[key] = (signature, state)
+        _cache.move_to_end(key)
+        while len(_cache) > max(CACHE_FILES, 1):
+            _cache.popitem(last=False)
+            _cache_stats["evictions"] += 1
+
+
+### History Index Functions
+
+def _log_key(log_entry):
+    """
+    Gets the sort key of a detailed_logs entry: its date, then its id.
+    """
+    return (log_entry.get('date', ''), log_entry.get('id', 0))
+
+def _bisect_left(logs, key):
+    """
+    Finds the first position in the sorted detailed_logs whose key is not less than key (binary search).
+    Args:
+        logs (list): The detailed_logs entries, sorted by (date, id).
+        key (tuple): The (date, id) key to search for.
+    Returns:
+        int: The position where key is, or would be inserted.
+    """
+    lo, hi = 0, len(logs)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _log_key(logs[mid]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def logs_on(progress, day):
+    """
+    Gets the detailed_logs entries of one day (a binary search on the sorted list).
+    Args:
+        progress (dict): The progress dictionary.
+        day (str): The day, e.g. 2025-06-22.
+    Returns:
+        list: The entries of that day, oldest first.
+    """
+    logs = progress.get('detailed_logs', [])
+    return logs[_bisect_left(logs, (day, 0)):_bisect_left(logs, (day, MAX_LOG_ID))]
+
+def _index_logs(progress):
+    """
+    Gives every detailed_logs entry an id and sorts the list by (date, id).
+    Only does work for progress saved before log ids existed; otherwise it is a single check.
+    Args:
+        progress (dict): The progress dictionary.
+    Returns:
+        None
+    """
+    logs = progress.get('detailed_logs')
+    if logs is None:
+        return
+    if 'next_log_id' not in progress:
+        next_id = max((log['id'] for log in logs if 'id' in log), default=0) + 1
+        for log in logs:
+            if 'id' not in log:
+                log['id'] = next_id
+                next_id += 1
+        progress['next_log_id'] = next_id
+    if any(_log_key(logs[i]) > _log_key(logs[i + 1]) for i in range(len(logs) - 1)):
+        logs.sort(key=_log_key)
+
+def _insert_log(progress, log_entry):
+    """
+    Gives a new entry the next log id and inserts it into detailed_logs in (date, id) order.
+    Args:
+        progress (dict): The progress dictionary.
+        log_entry (dict): The new entry, without an id.
+    Returns:
+        None
+    """
+    logs = progress.setdefault('detailed_logs', [])
+    log_entry['id'] = progress.get('next_log_id', 1)
+    progress['next_log_id'] = log_entry['id'] + 1
+    if not logs or _log_key(logs[-1]) <= _log_key(log_entry):
+        logs.append(log_entry) # the usual case: logged today, newest entry
+    else:
+        logs.insert(_bisect_left(logs, _log_key(log_entry)), log_entry)
+    _add_category_xp(progress, log_entry, 1)
+
+def _find_log(logs, log_id, log_date):
+    """
+    Finds the position of an entry by its id and date with a binary search.
+    Args:
+        logs (list): The detailed_logs entries, sorted by (date, id).
+        log_id (int): The id of the entry.
+        log_date (str): The date of the entry.
+    Returns:
+        int: The position of the entry, or None if it is not there.
+    """
+    i = _bisect_left(logs, (log_date, log_id))
+    if i < len(logs) and logs[i].get('id') == log_id:
+        return i
+    return None
+
+
+### Event Functions
+
+def _apply_task_completed(progress, event):
+    """
+    Increments the period count for a task, awards its XP and logs it in detailed_logs.
+    """
+    task_type = event['task_type']
+    period_key = event['period_key']
+    completed = progress.setdefault('completed_tasks', {}).setdefault(task_type, {})
+    counts = completed.setdefault(event['name'], {})
+    counts[period_key] = counts.get(period_key, 0) + 1
+    if 'streaks' in progress:
+        streaks.task_logged(progress['streaks'], task_type, event['name'], period_key, counts[period_key] == 1, event['date'], event['category'])
+
+    _set_xp(progress, progress.get('current_xp', 0) + event['xp'])
+    _insert_log(progress, {
+        "name": event['name'],
+        "xp": event['xp'],
+        "category": event['category'],
+        "type": task_type,
+        "date": event['date'],
+        "period_key": period_key
+    })
+
+def _apply_penalty_completed(progress, event):
+    """
+    Marks a penalty as completed and logs it in detailed_logs.
+    Penalties without an id (older files) are found by their index and given the id from the event.
+    """
+    penalties = progress.get('penalties', [])
+    penalty = next((p for p in penalties if p.get('id') == event['penalty_id']), None)
+    if penalty is None and 0 <= event.get('index', -1) < len(penalties):
+        penalty = penalties[event['index']]
+        penalty.setdefault('id', event['penalty_id'])
+    if penalty is None:
+        return
+    penalty['completed'] = True
+    _insert_log(progress, {
+        "name": penalty['description'],
+        "xp": 0,
+        "category": ["Penalty"],
+        "type": "penalty",
+        "date": event['date'],
+        "penalty_id": penalty['id']
+    })
+
+def _period_logged(progress, task_type, task_name, period_key):
+    """
+    Checks whether detailed_logs still has an entry of a task in a period, looking only at the days it can be logged on.
+    """
+    days = streaks.log_days(task_type, period_key)
+    if days is None:
+        return False
+    logs = progress.get('detailed_logs', [])
+    start, end = _bisect_left(logs, (days[0], 0)), _bisect_left(logs, (days[1], MAX_LOG_ID))
+    return any(
+        log.get('type') == task_type and log.get('name') == task_name and log.get('period_key') == period_key
+        for log in logs[start:end]
+    )
+
+def _apply_log_deleted(progress, event):
+    """
+    Removes an entry (found by its id and date) from detailed_logs and undoes its effect.
+    Deleting a penalty log restores the penalty; deleting a task log decrements its period count and deducts its XP.
+    """
+    logs = progress.get('detailed_logs', [])
+    index = _find_log(logs, event['log_id'], event['date'])
+    if index is None:
+        return
+    log_entry = logs.pop(index)
+    _add_category_xp(progress, log_entry, -1)
+
+    if log_entry.get('type') == 'penalty':
+        penalty_id = log_entry.get('penalty_id')
+        for p in progress.get('penalties', []):
+            if penalty_id and p.get('id') == penalty_id:
+                p['completed'] = False
+                break
+        return
+
+    task_type = log_entry.get('type')
+    task_name = log_entry.get('name')
+    period_key = log_entry.get('period_key')
+    if task_type and task_name and period_key:
+        counts = progress.get('completed_tasks', {}).get(task_type, {}).get(task_name, {})
+        if period_key in counts:
+            counts[period_key] = max(counts[period_key] - 1, 0)
+            emptied = counts[period_key] == 0
+        else: # the period was archived (see retention.py); look at the history instead
+            emptied = not _period_logged(progress, task_type, task_name, period_key)
+        if 'streaks' in progress:
+            remaining = None
+            if streaks.day_dropped(progress['streaks'], log_entry['date']):
+                remaining = [log.get('category', []) for log in logs_on(progress, log_entry['date']) if log.get('type') not in (None, 'penalty')]
+            streaks.task_unlogged(progress['streaks'], task_type, task_name, period_key, emptied, log_entry['date'], log_entry.get('category', []), remaining)
+    _set_xp(progress, progress.get('current_xp', 0) - log_entry.get('xp', 0))
+
+def _apply_spending_added(rewards, event):
+    """
+    Records a spending entry against the money tracking balance in rewards.json.
+    """
+    money = rewards['money_tracking']
+    money['total_spent'] = float(money['total_spent']) + float(event['amount'])
+    money['current_balance'] = float(money['current_balance']) - float(event['amount'])
+    money.setdefault('spending_history', []).append({
+        'date': event['date'],
+        'amount': float(event['amount']),
+        'description': event['description']
+    })
+
+def _apply_penalty_assigned(progress, event):
+    """
+    Adds a new penalty (assigned by the cron job for missed daily tasks).
+    """
+    progress.setdefault('penalties', []).append(dict(event['penalty']))
+
+def _apply_days_checked(progress, event):
+    """
+    Adds the penalties of the nightly check and moves daily_checked_through to the last checked day.
+    Penalties for days that were already checked (by a run that got there first) are skipped, so reruns add nothing.
+    """
+    checked = progress.get('daily_checked_through')
+    for penalty in event['penalties']:
+        if checked is None or penalty['missed_date'] > checked:
+            progress.setdefault('penalties', []).append(dict(penalty))
+    if checked is None or event['through'] > checked:
+        progress['daily_checked_through'] = event['through']
+
+def _apply_reward_claimed(rewards, event):
+    """
+    Marks a level reward as claimed and adds its money to the balance in rewards.json.
+    """
+    reward = next((r for r in rewards.get('rewards', []) if r.get('level') == event['level']), None)
+    if reward is None or reward.get('claimed'):
+        return
+    reward['claimed'] = True
+    money = rewards['money_tracking']
+    money['total_earned'] = float(money['total_earned']) + float(event['amount'])
+    money['current_balance'] = float(money['current_balance']) + float(event['amount'])
+
+def _apply_day_logged(progress, event):
+    """
+    Adds a summary of one submission (what was completed, XP earned, level reached) to daily_logs.
+    """
+    progress.setdefault('daily_logs', []).append({
+        "date": event['date'],
+        "completed": event['completed'],
+        "earned_xp": event['earned_xp'],
+        "level": event.get('level', progress.get('current_level', 1)) # imported summaries keep their level
+    })
+
+def rollup_keys(task_type, period_key):
+    """
+    Gets the month and year a completion period is summed into.
+    Args:
+        task_type (str): The task type (daily, weekly or monthly).
+        period_key (str): The period key, e.g. 2025-06-22, 2025-W25 or 2025-06.
+    Returns:
+        tuple: The month key (e.g. 2025-06) and the year key (e.g. 2025).
+    """
+    if task_type == 'weekly':
+        year, week = period_key.split('-W')
+        month = date.fromisocalendar(int(year), int(week), 1).strftime("%Y-%m") # the month the week starts in
+    else:
+        month = period_key[:7]
+    return month, month[:4]
+
+def _apply_periods_archived(progress, event):
+    """
+    Takes the counts of closed completion periods (already added to the archive) out of completed_tasks
+    and adds them to the monthly and yearly totals in completed_rollups. Only the archived count is taken:
+    completions imported into the period since then stay for the next run. event['run'] marks the
+    archive run as done (see archive_periods).
+    """
+    completed = progress.get('completed_tasks', {})
+    rollups = progress.setdefault('completed_rollups', {})
+    for task_type, tasks in event['entries'].items():
+        for task_name, periods in tasks.items():
+            counts = completed.get(task_type, {}).get(task_name)
+            if not counts:
+                continue
+            totals = rollups.setdefault(task_type, {}).setdefault(task_name, {})
+            for period_key, archived in periods.items():
+                count = min(counts.get(period_key, 0), archived)
+                if not count:
+                    continue
+                if counts[period_key] > count:
+                    counts[period_key] -= count
+                else:
+                    del counts[period_key]
+                for key in rollup_keys(task_type, period_key):
+                    totals[key] = totals.get(key, 0) + count
+            if not counts:
+                del completed[task_type][task_name]
+    if 'run' in event:
+        progress['archive_run'] = max(progress.get('archive_run', -1), event['run'])
+
+def _apply_batch(state, event):
+    """
+    Applies a group of events that were recorded together. A batch is one line in the log,
+    so after a crash either all of its events are replayed or none are.
+    """
+    for sub_event in event['events']:
+        apply_event(state, sub_event)
+
+EVENT_HANDLERS = {
+    "task_completed": _apply_task_completed,
+    "penalty_completed": _apply_penalty_completed,
+    "log_deleted": _apply_log_deleted,
+    "spending_added": _apply_spending_added,
+    "penalty_assigned": _apply_penalty_assigned,
+    "days_checked": _apply_days_checked,
+    "reward_claimed": _apply_reward_claimed,
+    "day_logged": _apply_day_logged,
+    "periods_archived": _apply_periods_archived,
+    "batch": _apply_batch,
+}
+
+def apply_event(state, event):
+    """
+    Folds a single event record into the in-memory state.
+    Args:
+        state (dict): The loaded state (progress or rewards).
+        event (dict): The event record, with the event type under 'event'.
+    Returns:
+        None
+    """
+    handler = EVENT_HANDLERS.get(event.get('event'))
+    if handler is None:
+        raise ValueError(f"Unknown event type: {event.get('event')}")
+    handler(state, event)
+
+
+### Locking Functions
+
+@contextmanager
+def file_lock(file_path):
+    """
+    Holds the exclusive lock for a state file while the block runs.
+    The lock is an advisory flock on a .lock file next to it, so other processes (other app
+    servers, the cron job) wait too. Not re-entrant: don't nest it for the same file.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Yields:
+        None
+    """
+    start = time.perf_counter()
+    with _thread_lock(file_path), open(file_path + LOCK_SUFFIX, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        note_lock_wait(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _thread_lock(file_path):
+    """
+    Gets the in-process lock of a file. file_lock holds it for writes; load_json holds it alone while
+    copying the cached state, which writers change in place.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        threading.Lock: The lock.
+    """
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(_file_key(file_path), threading.Lock())
+
+def note_lock_wait(waited):
+    """
+    Adds one lock acquisition to the lock metrics (also used for the SQLite write lock).
+    Args:
+        waited (float): How long the lock took to acquire, in seconds.
+    Returns:
+        None
+    """
+    _lock_stats["acquisitions"] += 1
+    _lock_stats["wait_seconds"] += waited
+    _lock_stats["max_wait_seconds"] = max(_lock_stats["max_wait_seconds"], waited)
+
+def lock_stats():
+    """
+    Gets the lock wait and write conflict counters for this process.
+    Args:
+        None
+    Returns:
+        dict: Lock acquisitions, total and max wait in seconds, rebased appends (conflicts) and refused stale saves.
+    """
+    return dict(_lock_stats)
+
+
+### Durable Write Functions
+
+def journal_path(file_path):
+    """
+    Gets the path of the compaction journal that belongs to a snapshot file.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        str: The path to the journal.
+    """
+    return file_path + JOURNAL_SUFFIX
+
+def _fsync_dir(path):
+    """
+    Flushes a directory entry to disk so a rename or delete in it survives a power cut.
+    Does nothing where directories can't be opened (Windows).
+    """
+    if not FSYNC:
+        return
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write(path, text):
+    """
+    Replaces a file's contents all at once: writes a temp file, flushes it and renames it over the target.
+    Readers see either the old or the new contents, never a truncated file.
+    Args:
+        path (str): The file to write.
+        text (str): The new contents.
+    Returns:
+        None
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        if FSYNC:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+def _remove(path):
+    """
+    Deletes a file if it exists.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _repair_log_tail(file_path):
+    """
+    Cuts off a half-written last line of the event log (left when a process was killed mid-append),
+    so the next append starts on a fresh line.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        bool: True if the log was repaired.
+    """
+    try:
+        f = open(log_path(file_path), 'rb+')
+    except FileNotFoundError:
+        return False
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return False
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return False
+        # Find the end of the last complete line
+        end = size
+        while end > 0:
+            start = max(end - 4096, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+        if FSYNC:
+            os.fsync(f.fileno())
+    return True
+
+def recover(file_path):
+    """
+    Repairs a snapshot after a crash: finishes an interrupted compaction from its journal,
+    cuts off a half-written log line and removes leftover temp files.
+    Safe to call at any time; it does nothing when there is nothing to repair.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        list: Descriptions of the repairs made (empty if none were needed).
+    """
+    with file_lock(file_path):
+        return _recover(file_path)
+
+def _recover(file_path):
+    """
+    Does the work of recover(). Call with the file lock held.
+    """
+    actions = []
+    journal = journal_path(file_path)
+    if os.path.exists(journal):
+        try:
+            with open(journal, 'r') as f:
+                text = f.read()
+            json.loads(text)
+        except (OSError, json.JSONDecodeError):
+            # The journal was never completed, so the old snapshot and log are still intact
+            _remove(journal)
+            actions.append("discarded an incomplete compaction journal")
+        else:
+            atomic_write(file_path, text)
+            _remove(log_path(file_path))
+            _remove(journal)
+            _fsync_dir(file_path)
+            actions.append("finished an interrupted compaction from the journal")
+    if _repair_log_tail(file_path):
+        actions.append("removed a half-written event from the log")
+    folder, name = os.path.split(file_path)
+    for tmp_name in os.listdir(folder or "."):
+        if not (tmp_name.startswith(name) and ".tmp-" in tmp_name[len(name):]):
+            continue
+        tmp_path = os.path.join(folder, tmp_name)
+        pid = tmp_path.rsplit("-", 1)[-1]
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            _remove(tmp_path)
+            actions.append(f"removed leftover temp file {os.path.basename(tmp_path)}")
+    return actions
+
+def _pid_alive(pid):
+    """
+    Checks whether a process id belongs to a running process.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+### Load and Save Functions
+
+def _read_events(file_path):
+    """
+    Reads the event records appended after the last compaction.
+    A half-written last line (e.g. the process was killed mid-append) is ignored; recover() removes it.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        list: The event records in the order they were appended.
+    """
+    events = []
+    try:
+        with open(log_path(file_path), 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    except FileNotFoundError:
+        pass
+    return events
+
+def _fold(state, record):
+    """
+    Applies one log record to the state and advances the state's version.
+    Args:
+        state (dict): The state, updated in place.
+        record (dict): The event (or batch) record.
+    Returns:
+        None
+    """
+    apply_event(state, record)
+    state['version'] = record.get('version', state.get('version', 0) + 1)
+
+def _parse(file_path):
+    """
+    Reads a JSON snapshot from disk and folds any logged events into it.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        dict: The current state.
+    """
+    with open(file_path, 'r') as f:
+        state = snapshot_format.decode(f.read())
+    if 'xp_by_category' not in state and ('detailed_logs' in state or 'completed_tasks' in state):
+        # Progress saved before the running totals existed: backfill them once
+        state['xp_by_category'] = recompute_xp_by_category(state.get('detailed_logs', []))
+    _index_logs(state)
+    state.setdefault('version', 0)
+    for record in _read_events(file_path):
+        _fold(state, record)
+    return state
+
+def _current(file_path):
+    """
+    Gets the cached state of a file, re-parsing it (after crash recovery) if it changed on disk.
+    Call with the file lock held. The result is the shared cached object, so copy it before changing it.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        dict: The current state.
+    """
+    signature = _signature(file_path)
+    cached = _cache_get(file_path)
+    if cached is not None and cached[0] == signature and not os.path.exists(journal_path(file_path)):
+        _cache_stats["hits"] += 1
+        return cached[1]
+    _cache_stats["misses"] += 1
+    _recover(file_path)
+    signature = _signature(file_path)
+    state = _parse(file_path)
+    _cache_put(file_path, signature, state)
+    return state
+
+def load_json(file_path):
+    """
+    Loads the current state of a JSON file, parsing it only if it changed since the last load in this process.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        dict: The current state. The caller owns this copy and may change it.
+    """
+    # record_json folds new events into the cached state under the file lock, so copy it under the same thread lock
+    with _thread_lock(file_path):
+        cached = _cache_get(file_path)
+        if cached is not None and cached[0] == _signature(file_path) and not os.path.exists(journal_path(file_path)):
+            _cache_stats["hits"] += 1
+            return _copy(cached[1])
+    with file_lock(file_path):
+        return _copy(_current(file_path))
+
+def current_version(file_path):
+    """
+    Gets the version of a JSON file's current state without copying it. A changed file is parsed into
+    the load cache, so the next load_json of it is a cache hit.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        int: The state version.
+    """
+    with file_lock(file_path):
+        return _current(file_path).get('version', 0)
+
+def snapshot_format_of(file_path):
+    """
+    Finds the format a snapshot is written in ("json" for files that don't exist yet).
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        str: "json" or "compact".
+    """
+    try:
+        with open(file_path, 'r') as f:
+            return snapshot_format.detect(f.read(32))
+    except FileNotFoundError:
+        return "json"
+
+def _write_format(file_path):
+    """
+    Picks the format for the next snapshot of a file: LEVELUP_SNAPSHOT_FORMAT for progress and
+    rewards if it is set, otherwise the format the file already has. tasks.json stays plain JSON.
+    """
+    if SNAPSHOT_FORMAT and os.path.splitext(os.path.basename(file_path))[0] in SQLITE_FILES:
+        return SNAPSHOT_FORMAT
+    return snapshot_format_of(file_path)
+
+def _write_snapshot(file_path, data, fmt=None):
+    """
+    Writes a new snapshot and clears the event log (compaction). Call with the file lock held.
+    The new snapshot goes to the journal first, so a crash at any point leaves either the old
+    snapshot and log or a journal that recover() uses to finish the compaction.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+        data (dict): The full state to save, including its version.
+        fmt (str): "json" or "compact"; None picks it with _write_format().
+    Returns:
+        None
+    """
+    text = snapshot_format.encode(data, fmt or _write_format(file_path))
+    journal = journal_path(file_path)
+    atomic_write(journal, text)
+    atomic_write(file_path, text)
+    _remove(log_path(file_path))
+    _remove(journal)
+    _fsync_dir(file_path)
+    _cache_put(file_path, _signature(file_path), _copy(data))
+
+def save_json(file_path, data, force=False):
+    """
+    Writes the full state as a new snapshot and clears the event log.
+    The save is refused if the file was written since data was loaded (its version is stale),
+    because the other writer's changes would be lost. Use update() to change a file safely, or
+    force=True when the file really should be overwritten (e.g. a reset).
+    Args:
+        file_path (str): The path to the JSON snapshot.
+        data (dict): The full state to save. Its version is advanced.
+        force (bool): If True, overwrite even if the file changed since data was loaded.
+    Returns:
+        None
+    """
+    with file_lock(file_path):
+        try:
+            version = _current(file_path).get('version', 0)
+        except FileNotFoundError:
+            version = 0
+        if not force and data.get('version') != version:
+            _lock_stats["stale_saves"] += 1
+            raise StaleStateError(f"{file_path} changed since it was loaded (version {data.get('version')}, now {version})")
+        data['version'] = version + 1
+        _write_snapshot(file_path, data)
+
+def update(file_path, mutate):
+    """
+    Changes a file safely: loads the current state under the file lock, lets mutate change it and saves it.
+    A file that does not exist yet starts out as an empty dictionary.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+        mutate (function): Called with the state dictionary; changes it in place.
+    Returns:
+        dict: The saved state (a copy the caller may keep).
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.update(file_path, mutate)
+    with file_lock(file_path):
+        try:
+            state = _copy(_current(file_path))
+        except FileNotFoundError:
+            state = {}
+        mutate(state)
+        state['version'] = state.get('version', 0) + 1
+        _write_snapshot(file_path, state)
+    return state
+
+def convert(file_path, fmt):
+    """
+    Rewrites a snapshot in another format, folding in the event log. The state and its version are unchanged.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+        fmt (str): "json" or "compact".
+    Returns:
+        tuple: (size in bytes before, size in bytes after), the before size including the event log.
+    """
+    with file_lock(file_path):
+        state = _current(file_path)
+        before = sum(os.path.getsize(p) for p in (file_path, log_path(file_path)) if os.path.exists(p))
+        _write_snapshot(file_path, _copy(state), fmt)
+        return before, os.path.getsize(file_path)
+
+def record_json(file_path, state, events):
+    """
+    Applies events to the in-memory state and appends them to the event log as one transaction.
+    All events go into a single log line with one write, and if applying any of them fails the
+    state is rolled back to what is on disk, so nothing is ever half-applied.
+    If another session or the cron job wrote the file since state was loaded, state is first
+    rebased onto the current file, so their changes are kept and these events apply on top.
+    The log is compacted into the snapshot once it grows past COMPACT_BYTES.
+    Args:
+        file_path (str): The path to the JSON snapshot the events belong to.
+        state (dict): The in-memory state, updated in place.
+        events (list): The event records to apply and append.
+    Returns:
+        None
+    """
+    if not events:
+        return
+    with file_lock(file_path):
+        current = _current(file_path)
+        if state.get('version') != current.get('version'):
+            # Stale state: rebase onto the file instead of overwriting the other writer's changes
+            _lock_stats["conflicts"] += 1
+            state.clear()
+            state.update(_copy(current))
+        version = current.get('version', 0) + 1
+        if len(events) == 1:
+            record = dict(events[0], version=version)
+        else:
+            record = {"event": "batch", "events": events, "version": version}
+        try:
+            _fold(state, record)
+        except Exception:
+            # Roll back: nothing was written yet, so the file still holds the state before this call
+            state.clear()
+            state.update(_copy(current))
+            raise
+        _repair_log_tail(file_path)
+        with open(log_path(file_path), 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            f.flush()
+            if FSYNC:
+                os.fsync(f.fileno())
+        if os.path.getsize(log_path(file_path)) > COMPACT_BYTES:
+            _write_snapshot(file_path, state)
+            return
+
+        # Keep the cached copy current so our own appends don't force a re-parse
+        _fold(current, _copy(record))
+        _cache_put(file_path, _signature(file_path), current)
+
+
+### Backend Functions
+
+def _use_sqlite(file_path):
+    """
+    Checks whether a file is stored in the SQLite database instead of JSON.
+    Args:
+        file_path (str): The path to the JSON file.
+    Returns:
+        bool: True if the sqlite backend is selected and the file moves into the database.
+    """
+    return BACKEND == "sqlite" and os.path.splitext(os.path.basename(file_path))[0] in SQLITE_FILES
+
+def load(file_path):
+    """
+    Loads the current state of a file from the configured backend.
+    Args:
+        file_path (str): The path to the JSON file.
+    Returns:
+        dict: The current state. The caller owns this copy and may change it.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.load(file_path)
+    return load_json(file_path)
+
+def save(file_path, data, force=False):
+    """
+    Saves the full state of a file to the configured backend.
+    Raises StaleStateError if the file was written since data was loaded, unless force is True.
+    Args:
+        file_path (str): The path to the JSON file.
+        data (dict): The full state to save.
+        force (bool): If True, overwrite even if the file changed since data was loaded.
+    Returns:
+        None
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        sqlite_store.save(file_path, data, force)
+        return
+    save_json(file_path, data, force)
+
+def record(file_path, state, events):
+    """
+    Applies events to the in-memory state and stores them with the configured backend.
+    Args:
+        file_path (str): The path to the JSON file the events belong to.
+        state (dict): The in-memory state, updated in place.
+        events (list): The event records to apply.
+    Returns:
+        None
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        sqlite_store.record(file_path, state, events)
+        return
+    record_json(file_path, state, events)
+
+
+### Query Functions
+
+def date_cursor(day):
+    """
+    Gets a history cursor that starts at the newest entry on or before a date (jump to date).
+    Args:
+        day (date): The date to jump to.
+    Returns:
+        list: The cursor to pass to history_page.
+    """
+    return [day.isoformat(), MAX_LOG_ID]
+
+def history_page(file_path, state, cursor=None, limit=3):
+    """
+    Gets one page of detailed_logs, newest first, starting after a cursor (keyset pagination).
+    Args:
+        file_path (str): The path to the progress JSON file.
+        state (dict): The loaded progress.
+        cursor (list): The [date, id] key of the last entry of the previous page, optionally followed by the
+            number of entries up to it (next-page cursors have it), or None for the newest page.
+        limit (int): The number of entries to return.
+    Returns:
+        tuple: The entries on this page, the cursor for the next page (None if this is the last page),
+            the number of newer entries before this page and the total number of entries.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.history_page(file_path, cursor, limit)
+    logs = state.get('detailed_logs', [])
+    end = len(logs) if cursor is None else _bisect_left(logs, tuple(cursor[:2]))
+    start = max(end - limit, 0)
+    page = logs[start:end][::-1]
+    next_cursor = list(_log_key(page[-1])) + [len(logs) - start] if start > 0 else None
+    return page, next_cursor, len(logs) - end, len(logs)
+
+def xp_per_category(file_path, state):
+    """
+    Gets the XP earned per category from the running totals, without scanning detailed_logs.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        state (dict): The loaded progress.
+    Returns:
+        dict: A dictionary with the category as the key and the XP earned as the value.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.xp_per_category(file_path)
+    if 'xp_by_category' not in state:
+        return recompute_xp_by_category(state.get('detailed_logs', []))
+    return dict(state['xp_by_category'])
+
+def rebuild_streaks(file_path):
+    """
+    Builds the streak statistics (see streaks.py) from the whole task history and stores them.
+    Only needed once for progress files from before the statistics were kept.
+    Args:
+        file_path (str): The path to the progress JSON file.
+    Returns:
+        dict: The statistics.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.rebuild_streaks(file_path)
+    state = update(file_path, lambda progress: progress.__setitem__('streaks', streaks.build(progress.get('detailed_logs', []))))
+    return state['streaks']
+
+def verify_xp_by_category(file_path, repair=False):
+    """
+    Checks the running per-category XP totals against a full recompute from detailed_logs.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        repair (bool): If True, replace the stored totals with the recomputed ones when they differ.
+    Returns:
+        dict: The mismatched categories, mapped to (stored XP, recomputed XP). Empty if the totals are correct.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.verify_xp_by_category(file_path, repair)
+    state = load_json(file_path)
+    stored = state.get('xp_by_category', {})
+    actual = recompute_xp_by_category(state.get('detailed_logs', []))
+    mismatches = {
+        cat: (stored.get(cat, 0), actual.get(cat, 0))
+        for cat in set(stored) | set(actual) if stored.get(cat, 0) != actual.get(cat, 0)
+    }
+    if mismatches and repair:
+        update(file_path, lambda s: s.update(xp_by_category=recompute_xp_by_category(s.get('detailed_logs', []))))
+    return mismatches
+
+def completion_count(file_path, state, task_type, task_name, period_key):
+    """
+    Gets the completion count of a task for one period.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        state (dict): The loaded progress.
+        task_type (str): The task type (daily, weekly, monthly, one-time).
+        task_name (str): The name of the task.
+        period_key (str): The period key, e.g. 2025-06-22.
+    Returns:
+        int: The completion count.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.completion_count(file_path, task_type, task_name, period_key)
+    counts = state.get('completed_tasks', {}).get(task_type, {})
+    if not isinstance(counts, dict):
+        return 0
+    return counts.get(task_name, {}).get(period_key, 0)
+
+def completion_history(file_path, state, task_type, task_name):
+    """
+    Gets every completion count of a task, from the archive (read only when this is called) and the open periods.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        state (dict): The loaded progress.
+        task_type (str): The task type (daily, weekly, monthly, one-time).
+        task_name (str): The name of the task.
+    Returns:
+        dict: Period key -> completion count, for all periods with a count.
+    """
+    return completion_histories(file_path, state, task_type, [task_name])[task_name]
+
+def completion_histories(file_path, state, task_type, task_names):
+    """
+    Gets every completion count of several tasks of one type, reading the archive once for all of them.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        state (dict): The loaded progress.
+        task_type (str): The task type (daily, weekly, monthly, one-time).
+        task_names (list): The names of the tasks.
+    Returns:
+        dict: Task name -> period key -> completion count, for all periods with a count.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.completion_histories(file_path, task_type, task_names)
+    archived, unfinished = {}, {}
+    if os.path.exists(archive_path(file_path)):
+        archive = load_json(archive_path(file_path))
+        archived = archive.get('completed_tasks', {}).get(task_type, {})
+        if _unfinished_run(archive, state):
+            unfinished = archive['pending']['entries'].get(task_type, {}) # counted in both files until the run is finished
+    counts = state.get('completed_tasks', {}).get(task_type, {})
+    if not isinstance(counts, dict):
+        counts = {}
+    histories = {}
+    for name in task_names:
+        history = Counter(archived.get(name, {}))
+        history.update(counts.get(name, {})) # a closed period can have both: completions imported after it was archived
+        history.subtract(unfinished.get(name, {}))
+        histories[name] = {period_key: count for period_key, count in history.items() if count > 0}
+    return histories
+
+def completion_rollups(file_path, state, task_type, task_name):
+    """
+    Gets the monthly and yearly completion totals of a task's archived periods.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        state (dict): The loaded progress.
+        task_type (str): The task type (daily, weekly or monthly).
+        task_name (str): The name of the task.
+    Returns:
+        dict: Month (2025-06) or year (2025) -> completion count.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.completion_rollups(file_path, task_type, task_name)
+    return dict(state.get('completed_rollups', {}).get(task_type, {}).get(task_name, {}))
+
+
+### Retention Functions
+
+def _unfinished_run(archive, state):
+    """
+    Checks whether the last archive run added its counts to the archive but crashed before taking them
+    out of progress (see archive_periods).
+    """
+    pending = archive.get('pending')
+    return pending is not None and pending['run'] > state.get('archive_run', -1)
+
+def archive_periods(file_path, is_closed):
+    """
+    Moves closed completion periods out of completed_tasks into the archive and the monthly/yearly rollups.
+    The counts are added to the archive first, together with a note of the run (its progress version) and
+    what it added, and then taken out of progress with one event that marks the run as done. A run the
+    archive has already added is not added again, and a run that crashed before its event is finished by
+    the next one, so a crash in between never counts a period twice. Counts are added, not replaced,
+    because an import can add completions to a period that was already archived.
+    Args:
+        file_path (str): The path to the progress JSON file.
+        is_closed (function): Called with (task_type, period_key); True if the period is closed and can be archived.
+    Returns:
+        int: The number of period entries archived.
+    """
+    if _use_sqlite(file_path):
+        import sqlite_store
+        return sqlite_store.archive_periods(file_path, is_closed)
+    state = load_json(file_path)
+    archive_file = archive_path(file_path)
+    archive = load_json(archive_file) if os.path.exists(archive_file) else {}
+    if _unfinished_run(archive, state):
+        pending = archive['pending']
+        record_json(file_path, state, [{"event": "periods_archived", "entries": pending['entries'], "run": pending['run']}])
+    entries = {}
+    for task_type, tasks in state.get('completed_tasks', {}).items():
+        if not isinstance(tasks, dict):
+            continue
+        for task_name, counts in tasks.items():
+            closed = {period_key: count for period_key, count in counts.items() if is_closed(task_type, period_key)}
+            if closed:
+                entries.setdefault(task_type, {})[task_name] = closed
+    if not entries:
+        return 0
+
+    run = state.get('version', 0)
+
+    def merge(archive):
+        if archive.get('pending', {}).get('run') == run:
+            return # another process archived this same state first
+        archived = archive.setdefault('completed_tasks', {})
+        for task_type, tasks in entries.items():
+            for task_name, closed in tasks.items():
+                counts = archived.setdefault(task_type, {}).setdefault(task_name, {})
+                for period_key, count in closed.items():
+                    counts[period_key] = counts.get(period_key, 0) + count
+        archive['pending'] = {"run": run, "entries": entries}
+
+    update(archive_file, merge)
+    record_json(file_path, state, [{"event": "periods_archived", "entries": entries, "run": run}])
+    return sum(len(closed) for tasks in entries.values() for closed in tasks.values())
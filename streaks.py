@@ -0,0 +1,415 @@
+#imports
+from bisect import bisect_right
+from datetime import date, timedelta
+
+#The purpose of this module is to keep streak and consistency statistics up to date as tasks are
+#logged, instead of recomputing them from the whole history on every rerun.
+#The statistics live in progress['streaks'] and are changed by the task_completed and log_deleted
+#event handlers in storage.py and sqlite_store.py:
+#   tasks       per task type and task: the runs of consecutive periods (days, weeks, months) it was done in
+#   categories  per category: the runs of consecutive days with at least one task of that category
+#   overall     the runs of consecutive days with at least one task
+#   activity    per recent day: the number of task logs per category ("*" for all of them)
+#   done        per task type and recent period key: how many different tasks of that type were done (for the heatmaps)
+#   kept_from   per part ("activity" or a task type): the first period number activity or done still has
+#
+#A series is stored as its runs: sorted [first, last] pairs of period numbers (see period_number),
+#plus the length of the longest run. Adding or removing one period touches one run, so an update
+#costs the same for a week of history or ten years of it, and so do the summary and heatmap queries.
+#activity and done only keep the last few periods (see KEEP): older buckets are dropped once their
+#period is closed, and deleting a log from an older day looks at that day's remaining logs instead.
+#So the statistics grow with the number of tasks and of runs (breaks in a streak), not with the days logged.
+#Progress files from before this module get their statistics once with: python manage.py streaks
+
+
+### Configuration
+KINDS = ("daily", "weekly", "monthly") #task types with streaks (one-time tasks have none)
+ALL = "*" #activity key for all categories together
+INFINITY = float("inf")
+KEEP = {"activity": 2, "daily": 366, "weekly": 53, "monthly": 24} #periods kept in activity (today and yesterday, which is open until 1:00 AM) and done (more than the heatmaps in app.py show)
+
+
+### Period Numbers
+
+def period_number(kind, period_key):
+    """
+    Turns a period key into a number that goes up by one from each period to the next.
+    Args:
+        kind (str): daily, weekly or monthly.
+        period_key (str): The period key, e.g. 2025-06-22, 2025-W25 or 2025-06.
+    Returns:
+        int: The period number, or None if the key is not a period of this kind.
+    """
+    try:
+        if kind == "daily":
+            return date.fromisoformat(period_key).toordinal()
+        if kind == "weekly":
+            year, week = period_key.split("-W")
+            return (date.fromisocalendar(int(year), int(week), 1).toordinal() - 1) // 7
+        if kind == "monthly":
+            year, month = period_key.split("-")
+            return int(year) * 12 + int(month) - 1
+    except ValueError:
+        pass
+    return None
+
+def period_key(kind, number):
+    """
+    Turns a period number back into its period key (the inverse of period_number).
+    Args:
+        kind (str): daily, weekly or monthly.
+        number (int): The period number.
+    Returns:
+        str: The period key.
+    """
+    if kind == "daily":
+        return date.fromordinal(number).isoformat()
+    if kind == "weekly":
+        iso = date.fromordinal(number * 7 + 1).isocalendar()
+        return f"{iso[0]}-W{iso[1]}"
+    return f"{number // 12}-{number % 12 + 1:02d}"
+
+def log_days(kind, period_key):
+    """
+    Gets the days a completion of a period can be logged on: from its first day to the day after its
+    last, since the period stays open until 1:00 AM the next day (see periods.py).
+    Args:
+        kind (str): daily, weekly or monthly.
+        period_key (str): The period key, e.g. 2025-06-22, 2025-W25 or 2025-06.
+    Returns:
+        tuple: The first and last day as keys (2025-06-22), or None if the key is not a period of this kind.
+    """
+    number = period_number(kind, period_key)
+    if number is None:
+        return None
+    if kind == "daily":
+        first = date.fromordinal(number)
+        last = first
+    elif kind == "weekly":
+        first = date.fromordinal(number * 7 + 1)
+        last = first + timedelta(days=6)
+    else:
+        first = date(number // 12, number % 12 + 1, 1)
+        last = date(first.year + first.month // 12, first.month % 12 + 1, 1) - timedelta(days=1)
+    return first.isoformat(), (last + timedelta(days=1)).isoformat()
+
+
+### Series Functions
+
+def new_series():
+    """
+    Creates an empty series (no runs).
+    """
+    return {"runs": [], "longest": 0}
+
+def add_period(series, number):
+    """
+    Adds a period to a series, joining it to the runs before and after it.
+    Args:
+        series (dict): The series, changed in place.
+        number (int): The period number.
+    Returns:
+        None
+    """
+    runs = series['runs']
+    i = bisect_right(runs, [number, INFINITY])
+    before = runs[i - 1] if i > 0 else None
+    after = runs[i] if i < len(runs) else None
+    if before and before[0] <= number <= before[1]:
+        return
+    if before and before[1] == number - 1 and after and after[0] == number + 1:
+        before[1] = after[1]
+        del runs[i]
+        run = before
+    elif before and before[1] == number - 1:
+        before[1] = number
+        run = before
+    elif after and after[0] == number + 1:
+        after[0] = number
+        run = after
+    else:
+        run = [number, number]
+        runs.insert(i, run)
+    series['longest'] = max(series['longest'], run[1] - run[0] + 1)
+
+def remove_period(series, number):
+    """
+    Removes a period from a series, splitting the run it was in.
+    Args:
+        series (dict): The series, changed in place.
+        number (int): The period number.
+    Returns:
+        None
+    """
+    runs = series['runs']
+    i = bisect_right(runs, [number, INFINITY]) - 1
+    if i < 0 or not runs[i][0] <= number <= runs[i][1]:
+        return
+    first, last = runs.pop(i)
+    if number < last:
+        runs.insert(i, [number + 1, last])
+    if number > first:
+        runs.insert(i, [first, number - 1])
+    if last - first + 1 == series['longest']: # the longest run may be gone: only now look at all runs
+        series['longest'] = max((run[1] - run[0] + 1 for run in runs), default=0)
+
+def current_length(series, current):
+    """
+    Gets the current streak of a series: the run that ends in the current period, or in the previous
+    one (the streak is still alive until the current period is over).
+    Args:
+        series (dict): The series.
+        current (int): The period number of the current period.
+    Returns:
+        int: The length of the current streak, 0 if it is broken.
+    """
+    runs = series['runs']
+    if not runs or runs[-1][1] < current - 1:
+        return 0
+    return min(runs[-1][1], current) - runs[-1][0] + 1
+
+def contains(series, number):
+    """
+    Checks whether a period is in a series.
+    """
+    runs = series['runs']
+    i = bisect_right(runs, [number, INFINITY]) - 1
+    return i >= 0 and runs[i][0] <= number <= runs[i][1]
+
+
+### Statistics Updates
+
+def empty_stats():
+    """
+    Creates the statistics of a player with no history.
+    Args:
+        None
+    Returns:
+        dict: The empty statistics (see the module comment).
+    """
+    return {"tasks": {kind: {} for kind in KINDS}, "categories": {}, "overall": new_series(), "activity": {}, "done": {kind: {} for kind in KINDS},
+            "kept_from": {}}
+
+def day_dropped(stats, day):
+    """
+    Checks whether the activity of a day was dropped (see KEEP), so task_unlogged needs the day's remaining logs.
+    Args:
+        stats (dict): progress['streaks'].
+        day (str): The day, e.g. 2025-06-22.
+    Returns:
+        bool: True if the day is older than the days activity still has.
+    """
+    kept_from = stats.get('kept_from', {}).get("activity")
+    number = period_number("daily", day)
+    return kept_from is not None and number is not None and number < kept_from
+
+def _day_series(stats, cat):
+    """
+    Gets the series of a category (ALL for the overall one), creating it if needed.
+    """
+    if cat == ALL:
+        return stats['overall']
+    series = stats['categories'].get(cat)
+    if series is None:
+        series = stats['categories'][cat] = new_series()
+    return series
+
+def _trim(stats, part, buckets, kind):
+    """
+    Drops the buckets of activity or done that are older than the last KEEP[part] periods, once there are
+    twice as many, and notes in kept_from where the remaining ones start.
+    """
+    if len(buckets) <= 2 * KEEP[part]:
+        return
+    numbers = {key: period_number(kind, key) for key in buckets}
+    kept_from = max(numbers.values()) - KEEP[part] + 1
+    for key, number in numbers.items():
+        if number < kept_from:
+            del buckets[key]
+    kept = stats.setdefault('kept_from', {})
+    kept[part] = max(kept.get(part, kept_from), kept_from)
+
+def task_logged(stats, task_type, name, key, first, day, categories):
+    """
+    Updates the statistics for one logged task.
+    Args:
+        stats (dict): progress['streaks'], changed in place.
+        task_type (str): The task type (daily, weekly, monthly or one_time).
+        name (str): The task name.
+        key (str): The period key of the completion.
+        first (bool): True if this is the task's first completion in that period.
+        day (str): The day it was logged, e.g. 2025-06-22.
+        categories (list): The task's categories.
+    Returns:
+        None
+    """
+    if task_type in KINDS and first:
+        number = period_number(task_type, key)
+        if number is not None:
+            series = stats['tasks'][task_type].get(name)
+            if series is None:
+                series = stats['tasks'][task_type][name] = new_series()
+            add_period(series, number)
+            kept_from = stats.get('kept_from', {}).get(task_type)
+            if kept_from is None or number >= kept_from:
+                done = stats['done'][task_type]
+                done[key] = done.get(key, 0) + 1
+                if done[key] == 1:
+                    _trim(stats, task_type, done, task_type)
+    day_number = period_number("daily", day)
+    if day_number is None:
+        return
+    if day_dropped(stats, day): # an older day (e.g. imported): it has no bucket, only its series change
+        for cat in list(categories) + [ALL]:
+            add_period(_day_series(stats, cat), day_number)
+        return
+    counts = stats['activity'].setdefault(day, {})
+    for cat in list(categories) + [ALL]:
+        counts[cat] = counts.get(cat, 0) + 1
+        if counts[cat] == 1:
+            add_period(_day_series(stats, cat), day_number)
+    _trim(stats, "activity", stats['activity'], "daily")
+
+def task_unlogged(stats, task_type, name, key, emptied, day, categories, remaining=None):
+    """
+    Updates the statistics for one deleted task log.
+    Args:
+        stats (dict): progress['streaks'], changed in place.
+        task_type (str): The task type.
+        name (str): The task name.
+        key (str): The period key of the deleted completion.
+        emptied (bool): True if the task has no completions left in that period.
+        day (str): The day the deleted entry was logged.
+        categories (list): The task's categories.
+        remaining (list): The categories of each task log left on that day; only needed if day_dropped(stats, day).
+    Returns:
+        None
+    """
+    if task_type in KINDS and emptied:
+        number = period_number(task_type, key)
+        series = stats['tasks'][task_type].get(name)
+        if number is not None and series is not None and contains(series, number):
+            remove_period(series, number)
+            done = stats['done'][task_type]
+            if done.get(key, 0) > 1:
+                done[key] -= 1
+            else:
+                done.pop(key, None)
+    day_number = period_number("daily", day)
+    if day_number is None:
+        return
+    if day_dropped(stats, day):
+        left = {cat for cats in remaining for cat in cats}
+        for cat in list(categories) + [ALL]:
+            series = stats['overall'] if cat == ALL else stats['categories'].get(cat)
+            if series is not None and not (remaining if cat == ALL else cat in left):
+                remove_period(series, day_number)
+        return
+    counts = stats['activity'].get(day)
+    if counts is None:
+        return
+    for cat in list(categories) + [ALL]:
+        if counts.get(cat, 0) <= 0:
+            continue
+        counts[cat] -= 1
+        if counts[cat] == 0:
+            del counts[cat]
+            series = stats['overall'] if cat == ALL else stats['categories'].get(cat)
+            if series is not None:
+                remove_period(series, day_number)
+    if not counts:
+        del stats['activity'][day]
+
+def build(logs):
+    """
+    Builds the statistics from the whole task history (only needed once for older progress files).
+    Args:
+        logs (iterable): The detailed_logs entries, oldest first.
+    Returns:
+        dict: The statistics.
+    """
+    stats = empty_stats()
+    seen = set()
+    for log in logs:
+        task_type = log.get('type')
+        if task_type in (None, 'penalty'):
+            continue
+        key = log.get('period_key')
+        first = (task_type, log.get('name'), key) not in seen
+        seen.add((task_type, log.get('name'), key))
+        task_logged(stats, task_type, log.get('name'), key, first, log.get('date'), log.get('category', []))
+    return stats
+
+
+### Queries
+
+def summary(stats, ctx, tasks):
+    """
+    Gets the current and longest streaks of every task, category and overall.
+    The cost depends on the number of tasks and categories, not on the length of the history.
+    Args:
+        stats (dict): progress['streaks'].
+        ctx (dict): The period context of this run (see periods.py).
+        tasks (dict): The loaded tasks.json.
+    Returns:
+        dict: "overall" -> {"current", "longest"} (in days), "categories" -> category -> {"current", "longest"},
+            "tasks" -> list of {"type", "name", "current", "longest"} for the tasks in tasks.json.
+    """
+    current = {kind: period_number(kind, ctx['keys'][kind]) for kind in KINDS}
+    today = current["daily"]
+
+    def streak(series, now):
+        return {"current": current_length(series, now), "longest": series['longest']}
+
+    result = {
+        "overall": streak(stats['overall'], today),
+        "categories": {cat: streak(series, today) for cat, series in sorted(stats['categories'].items())},
+        "tasks": [],
+    }
+    for kind in KINDS:
+        for task in tasks.get(kind, []):
+            series = stats['tasks'][kind].get(task['name'], new_series())
+            result['tasks'].append(dict(streak(series, current[kind]), type=kind, name=task['name']))
+    return result
+
+def heatmap(stats, kind, task_count, last_key, count):
+    """
+    Gets the completion rate of a task type for the most recent periods.
+    Args:
+        stats (dict): progress['streaks'].
+        kind (str): daily, weekly or monthly.
+        task_count (int): The number of tasks of that type (the rate is done / task_count).
+        last_key (str): The period key of the newest period, e.g. today's.
+        count (int): The number of periods.
+    Returns:
+        list: (period key, rate between 0 and 1) pairs, oldest first.
+    """
+    last = period_number(kind, last_key)
+    done = stats['done'][kind]
+    cells = []
+    for number in range(last - count + 1, last + 1):
+        key = period_key(kind, number)
+        cells.append((key, min(done.get(key, 0) / task_count, 1.0) if task_count else 0.0))
+    return cells
+
+def day_grid(cells):
+    """
+    Arranges daily heatmap cells in weeks (columns) and weekdays (rows, Monday first), like a contribution calendar.
+    Args:
+        cells (list): (day key, rate) pairs from heatmap(), oldest first.
+    Returns:
+        tuple: The rates as a 7 x weeks list (None where there is no day), the day keys in the same shape,
+            and the Monday of each week.
+    """
+    if not cells:
+        return [], [], []
+    first = date.fromisoformat(cells[0][0])
+    start = first - timedelta(days=first.weekday())
+    weeks = (date.fromisoformat(cells[-1][0]) - start).days // 7 + 1
+    rates = [[None] * weeks for _ in range(7)]
+    keys = [[None] * weeks for _ in range(7)]
+    for key, rate in cells:
+        offset = (date.fromisoformat(key) - start).days
+        rates[offset % 7][offset // 7] = rate
+        keys[offset % 7][offset // 7] = key
+    return rates, keys, [(start + timedelta(weeks=w)).isoformat() for w in range(weeks)]
@@ -0,0 +1,127 @@
+#imports
+import os
+import re
+import shutil
+import core
+import storage
+
+#The purpose of this module is to let one app server (and one cron job) serve several players.
+#Set LEVELUP_TENANTS_DIR to a folder and every player gets a data folder of their own inside it,
+#e.g. users/alice/tasks.json, users/alice/progress.json, users/alice/rewards.json.
+#The app picks the player from the ?user= part of the URL, so this is meant for a home or team
+#server behind your own login, not for the open internet.
+#
+#Players share nothing but the process: each file has its own lock (see storage.file_lock), and
+#loaded states sit in storage's least-recently-used cache, so idle players drop out of memory.
+#Without LEVELUP_TENANTS_DIR the app and scripts use the single data/ folder as before.
+#Add a player with: python manage.py add-user alice
+
+
+### Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = os.path.join(SCRIPT_DIR, "data") #the single-player folder, also the source of the starter tasks.json
+TENANTS_DIR = os.environ.get("LEVELUP_TENANTS_DIR") #unset: single-player mode
+USER_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}") #keeps user names usable as folder names (matched against the whole name)
+FILE_NAMES = {"tasks": "tasks.json", "progress": "progress.json", "rewards": "rewards.json"}
+
+
+### Tenant Functions
+
+def enabled():
+    """
+    Checks whether multi-player mode is on.
+    Args:
+        None
+    Returns:
+        bool: True if LEVELUP_TENANTS_DIR is set.
+    """
+    return bool(TENANTS_DIR)
+
+def valid_user(user):
+    """
+    Checks whether a user name can be used as a data folder name.
+    Args:
+        user (str): The user name.
+    Returns:
+        bool: True if it only has letters, digits, '-' and '_' (at most 64).
+    """
+    return bool(user) and USER_NAME.fullmatch(user) is not None
+
+def data_dir(user=None):
+    """
+    Gets the data folder of a player.
+    Args:
+        user (str): The user name; ignored in single-player mode.
+    Returns:
+        str: The data folder.
+    """
+    if not enabled():
+        return DEFAULT_DATA_DIR
+    if not valid_user(user):
+        raise ValueError(f"Invalid user name: {user!r}")
+    return os.path.join(TENANTS_DIR, user)
+
+def data_files(folder):
+    """
+    Gets the paths of the state files in a data folder.
+    Args:
+        folder (str): The data folder.
+    Returns:
+        dict: "tasks", "progress" and "rewards" -> file path.
+    """
+    return {key: os.path.join(folder, name) for key, name in FILE_NAMES.items()}
+
+def exists(user):
+    """
+    Checks whether a player has been added.
+    Args:
+        user (str): The user name.
+    Returns:
+        bool: True if the name is valid and the player's tasks.json exists.
+    """
+    return valid_user(user) and os.path.exists(data_files(data_dir(user))["tasks"])
+
+def list_users():
+    """
+    Lists the players in LEVELUP_TENANTS_DIR.
+    Args:
+        None
+    Returns:
+        list: The user names, sorted. Empty in single-player mode.
+    """
+    if not enabled() or not os.path.isdir(TENANTS_DIR):
+        return []
+    return sorted(name for name in os.listdir(TENANTS_DIR) if exists(name))
+
+def all_data_dirs():
+    """
+    Gets every data folder the cron job should check.
+    Args:
+        None
+    Returns:
+        list: (user name, data folder) pairs; a single (None, data/) pair in single-player mode.
+    """
+    if not enabled():
+        return [(None, DEFAULT_DATA_DIR)]
+    return [(user, data_dir(user)) for user in list_users()]
+
+def add_user(user, tasks_file=None):
+    """
+    Creates the data folder of a new player with a copy of the task list and empty progress and rewards.
+    Args:
+        user (str): The user name.
+        tasks_file (str): The tasks.json to start from (default: data/tasks.json).
+    Returns:
+        str: The new data folder.
+    """
+    if not enabled():
+        raise ValueError("Set LEVELUP_TENANTS_DIR to add users.")
+    folder = data_dir(user)
+    files = data_files(folder)
+    if os.path.exists(files["tasks"]):
+        raise ValueError(f"User {user!r} already exists.")
+    os.makedirs(folder, exist_ok=True)
+    storage.save(files["progress"], core.initial_progress(), force=True)
+    storage.save(files["rewards"], core.initial_rewards(), force=True)
+    shutil.copyfile(tasks_file or data_files(DEFAULT_DATA_DIR)["tasks"], files["tasks"]) #last, so the user only exists once it is complete
+    return folder
@@ -0,0 +1,6 @@
+#imports
+import os
+import sys
+
+#Lets the tests import the app's modules (they live at the top of the repository, not in a package).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
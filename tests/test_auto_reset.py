@@ -0,0 +1,87 @@
+#imports
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+import pytest
+import auto_reset
+import periods
+import storage
+
+#Tests for the batch mode of auto_reset.py: checking several data folders in worker processes,
+#the summary report and the exit code of the cron job.
+
+
+### Helpers
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NOW = datetime(2026, 10, 17, 12, 0) #2026-10-16 is the last closed day
+TASKS = {"daily": [{"name": "Read", "xp": 1, "category": ["Learning"]}], "weekly": [], "monthly": [], "one_time": []}
+
+def make_player(folder, completed=None, tasks=TASKS):
+    """
+    Writes a player's data folder whose days are checked through 2026-10-15.
+    """
+    os.makedirs(folder)
+    with open(os.path.join(folder, "progress.json"), "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {"daily": completed or {}}, "penalties": [],
+                   "detailed_logs": [], "daily_checked_through": "2026-10-15"}, f)
+    with open(os.path.join(folder, "tasks.json"), "w") as f:
+        json.dump(tasks, f)
+    return str(folder)
+
+@pytest.fixture
+def users(tmp_path, monkeypatch):
+    """
+    A folder with three players: one who read on 2026-10-16, one who didn't, and one without a tasks.json.
+    """
+    monkeypatch.setattr(storage, "BACKEND", "json")
+    monkeypatch.setattr(storage, "FSYNC", False)
+    real_context = periods.period_context
+    monkeypatch.setattr(periods, "period_context", lambda now=None: real_context(now or NOW))
+    storage.clear_cache()
+    make_player(tmp_path / "users" / "done", {"Read": {"2026-10-16": 1}})
+    make_player(tmp_path / "users" / "missed")
+    make_player(tmp_path / "users" / "broken")
+    os.remove(tmp_path / "users" / "broken" / "tasks.json")
+    yield str(tmp_path / "users")
+    storage.clear_cache()
+
+def run_script(*args):
+    return subprocess.run([sys.executable, "auto_reset.py", *args], cwd=REPO_DIR, capture_output=True, text=True)
+
+
+### Tests
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sweep_summary(users, tmp_path, workers):
+    report = str(tmp_path / "report.json")
+    summary = auto_reset.main([os.path.join(users, "*"), "--workers", str(workers), "--report", report])
+
+    assert summary['date'] == "2026-10-17"
+    assert summary['players'] == 3 and summary['penalties'] == 1 and summary['workers'] == workers
+    assert list(summary['failures']) == [os.path.join(users, "broken")]
+    with open(report) as f:
+        assert json.load(f) == summary
+    missed = storage.load(os.path.join(users, "missed", "progress.json"))
+    assert [p['missed_date'] for p in missed['penalties']] == ["2026-10-16"]
+    assert storage.load(os.path.join(users, "done", "progress.json"))['penalties'] == []
+
+def test_second_run_assigns_nothing(users):
+    auto_reset.main([os.path.join(users, "*"), "--workers", "2"])
+    summary = auto_reset.main([os.path.join(users, "*"), "--workers", "2"])
+    assert summary['penalties'] == 0
+    assert len(storage.load(os.path.join(users, "missed", "progress.json"))['penalties']) == 1
+
+def test_exit_code_is_1_only_with_failures(tmp_path):
+    # No daily tasks, so nothing can be missed whatever day the test runs on
+    ok = make_player(tmp_path / "ok", tasks=dict(TASKS, daily=[]))
+    broken = make_player(tmp_path / "broken")
+    os.remove(os.path.join(broken, "tasks.json"))
+
+    result = run_script(ok)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "1 player(s) checked, 0 penalties assigned, 0 failure(s)" in result.stdout
+    result = run_script(ok, broken)
+    assert result.returncode == 1
+    assert "2 player(s) checked, 0 penalties assigned, 1 failure(s)" in result.stdout
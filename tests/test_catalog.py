@@ -0,0 +1,82 @@
+#imports
+import json
+import os
+import pytest
+import catalog
+
+#Tests for the compiled task catalog (catalog.py).
+
+
+### Helpers
+
+@pytest.fixture
+def tasks_file(tmp_path):
+    """
+    A tasks.json with one daily task.
+    """
+    catalog.clear_cache()
+    path = tmp_path / "tasks.json"
+    path.write_text(json.dumps({"daily": [{"name": "Read", "xp": 10, "category": ["Learning"]}]}))
+    yield str(path)
+    catalog.clear_cache()
+
+
+### Tests
+
+def test_catalog_is_cached_once_per_file(tasks_file, monkeypatch):
+    monkeypatch.chdir(os.path.dirname(tasks_file))
+    first = catalog.load(tasks_file)
+    assert catalog.load("tasks.json") is first
+    assert catalog.load(os.path.join(".", "tasks.json")) is first
+    assert len(catalog._catalogs) == 1
+
+def test_every_problem_is_listed():
+    raw = {
+        "daily": [
+            {"name": "Read", "xp": 10, "category": ["Learning"]},
+            {"name": "Read", "xp": 5},
+            {"xp": 5},
+            {"name": "Run", "xp": "10", "category": "Health"},
+            {"name": "Swim", "xp": True, "frequency": 0},
+            "Walk",
+        ],
+        "weekly": {"name": "Clean"},
+        "monthly": [{"name": "Budget"}],
+    }
+    with pytest.raises(catalog.TaskCatalogError) as error:
+        catalog.compile_tasks(raw)
+    assert str(error.value).splitlines() == [
+        "Invalid tasks.json:",
+        "- daily task 'Read': the name is used twice (completions are counted by name)",
+        "- daily[2]: missing name",
+        "- daily task 'Run': xp must be a whole number of 0 or more, not '10'",
+        "- daily task 'Run': category must be a list of names, not 'Health'",
+        "- daily task 'Swim': xp must be a whole number of 0 or more, not True",
+        "- daily task 'Swim': frequency must be a whole number of 1 or more, not 0",
+        "- daily[5]: is not an object",
+        "- weekly: must be a list of tasks",
+        "- monthly task 'Budget': missing xp",
+    ]
+
+def test_catalog_error_is_a_value_error():
+    with pytest.raises(ValueError):
+        catalog.compile_tasks(["not", "an", "object"])
+
+def test_tags_are_read_as_categories():
+    compiled = catalog.compile_tasks({"daily": [{"name": "Read", "xp": 10, "tags": ["Learning"]}]})
+    task = compiled['by_name']['daily']['Read']
+    assert task['category'] == ["Learning"] and 'tags' not in task
+    assert task['key'] == "daily_Read" and task['frequency'] == 1
+    assert compiled['categories'] == ("Learning",)
+
+def test_invalid_file_is_checked_again_until_fixed(tasks_file):
+    with open(tasks_file, "w") as f:
+        json.dump({"daily": [{"name": "Read"}]}, f)
+    with pytest.raises(catalog.TaskCatalogError):
+        catalog.load(tasks_file)
+    with pytest.raises(catalog.TaskCatalogError):
+        catalog.load(tasks_file)
+    with open(tasks_file, "w") as f:
+        json.dump({"daily": [{"name": "Read", "xp": 10, "category": []}]}, f)
+    os.utime(tasks_file, ns=(0, 10 ** 18)) # a new mtime even on coarse clocks
+    assert catalog.load(tasks_file)['by_name']['daily']['Read']['xp'] == 10
@@ -0,0 +1,68 @@
+#imports
+import json
+from datetime import date, datetime
+import core
+import periods
+import storage
+
+#Tests for the nightly check (core.days_to_check / core.check_missed_days) around the 1:00 AM grace period.
+
+
+### Helpers
+TASKS = [{"name": "Read", "xp": 1, "category": ["Learning"]}]
+
+def make_progress(tmp_path, checked_through):
+    """
+    Writes a progress.json whose days are checked up to checked_through and loads it.
+    """
+    progress_file = str(tmp_path / "progress.json")
+    with open(progress_file, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {"daily": {}}, "penalties": [],
+                   "detailed_logs": [], "daily_checked_through": checked_through}, f)
+    return progress_file, storage.load(progress_file)
+
+
+### Tests
+
+def test_open_day_is_not_checked_during_grace_period():
+    ctx = periods.period_context(datetime(2026, 10, 17, 0, 30))
+    assert ctx['keys']['daily'] == "2026-10-16"
+    assert core.days_to_check({"daily_checked_through": "2026-10-15"}, ctx) == []
+    assert core.days_to_check({}, ctx) == [date(2026, 10, 15)]
+
+def test_day_is_checked_after_grace_period():
+    ctx = periods.period_context(datetime(2026, 10, 17, 1, 30))
+    assert core.days_to_check({"daily_checked_through": "2026-10-15"}, ctx) == [date(2026, 10, 16)]
+    assert core.days_to_check({"daily_checked_through": "2026-10-13"}, ctx) == [date(2026, 10, 14), date(2026, 10, 15), date(2026, 10, 16)]
+
+def test_check_during_grace_period_leaves_open_day_alone(tmp_path):
+    progress_file, progress = make_progress(tmp_path, "2026-10-15")
+    missed, penalties = core.check_missed_days(progress_file, progress, TASKS, periods.period_context(datetime(2026, 10, 17, 0, 30)))
+    assert (missed, penalties) == ({}, [])
+    assert storage.load(progress_file)['daily_checked_through'] == "2026-10-15"
+
+    # Completed during the grace period: no penalty once the day closes
+    ctx = periods.period_context(datetime(2026, 10, 17, 0, 45))
+    storage.record(progress_file, progress, core.task_completion_events("daily", TASKS, ctx))
+    missed, penalties = core.check_missed_days(progress_file, progress, TASKS, periods.period_context(datetime(2026, 10, 17, 1, 30)))
+    assert missed == {"2026-10-16": []} and penalties == []
+    assert storage.load(progress_file)['daily_checked_through'] == "2026-10-16"
+
+def test_catch_up_reads_archive_once(tmp_path, monkeypatch):
+    import retention
+    progress_file, progress = make_progress(tmp_path, "2026-10-10")
+    tasks = TASKS + [{"name": "Stretch", "xp": 1, "category": ["Health"]}]
+    for day in ("2026-10-11", "2026-10-13"):
+        storage.record(progress_file, progress, [{
+            "event": "task_completed", "task_type": "daily", "name": "Read", "xp": 1, "category": ["Learning"],
+            "date": day, "period_key": day
+        }])
+    assert retention.archive_closed_periods(progress_file, date(2026, 10, 16)) == 2
+    progress = storage.load(progress_file)
+
+    loads = []
+    real_load = storage.load_json
+    monkeypatch.setattr(storage, "load_json", lambda path: loads.append(path) or real_load(path))
+    missed = core.missed_daily_tasks(progress_file, progress, tasks, core.days_to_check(progress, periods.period_context(datetime(2026, 10, 14, 2, 0))))
+    assert missed == {"2026-10-11": ["Stretch"], "2026-10-12": ["Read", "Stretch"], "2026-10-13": ["Stretch"]}
+    assert loads == [storage.archive_path(progress_file)]
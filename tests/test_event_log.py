@@ -0,0 +1,78 @@
+#imports
+import json
+import os
+import pytest
+import snapshot_format
+import storage
+
+#Tests for the JSON event log (storage.record_json): events are appended instead of rewriting the
+#snapshot, a fresh load replays them, and the log is compacted into the snapshot once it is large.
+
+
+### Helpers
+
+@pytest.fixture
+def progress_file(tmp_path, monkeypatch):
+    """
+    A progress.json with no history yet.
+    """
+    monkeypatch.setattr(storage, "FSYNC", False)
+    storage.clear_cache()
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    yield path
+    storage.clear_cache()
+
+def task_event(name, xp=10, day="2026-10-16"):
+    return {"event": "task_completed", "task_type": "daily", "name": name, "xp": xp, "category": ["Health"],
+            "date": day, "period_key": day}
+
+def reload(progress_file):
+    """
+    Loads the file as a freshly started process would (nothing cached).
+    """
+    storage.clear_cache()
+    return storage.load(progress_file)
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+### Tests
+
+def test_events_are_appended_and_replayed(progress_file):
+    snapshot = read(progress_file)
+    storage.record(progress_file, storage.load(progress_file), [task_event("Run")])
+    storage.record(progress_file, storage.load(progress_file), [task_event("Read", xp=5), task_event("Walk", xp=1)])
+
+    assert read(progress_file) == snapshot # the snapshot is not rewritten
+    records = [json.loads(line) for line in read(storage.log_path(progress_file)).splitlines()]
+    assert [record['event'] for record in records] == ["task_completed", "batch"] # one line per write
+    state = reload(progress_file)
+    assert [log['name'] for log in state['detailed_logs']] == ["Run", "Read", "Walk"]
+    assert state['current_xp'] == 16 and state['version'] == 2
+    assert state['completed_tasks']['daily']['Run'] == {"2026-10-16": 1}
+
+def test_deleted_log_is_replayed(progress_file):
+    storage.record(progress_file, storage.load(progress_file), [task_event("Run"), task_event("Read", xp=5)])
+    run = storage.load(progress_file)['detailed_logs'][0]
+    storage.record(progress_file, storage.load(progress_file), [{"event": "log_deleted", "log_id": run['id'], "date": run['date']}])
+
+    state = reload(progress_file)
+    assert [log['name'] for log in state['detailed_logs']] == ["Read"]
+    assert state['current_xp'] == 5
+    assert state['completed_tasks']['daily']['Run'] == {"2026-10-16": 0}
+
+def test_large_log_is_compacted_into_the_snapshot(progress_file, monkeypatch):
+    monkeypatch.setattr(storage, "COMPACT_BYTES", 1000)
+    for i in range(20):
+        storage.record(progress_file, storage.load(progress_file), [task_event(f"Task {i}", xp=1)])
+    expected = storage.load(progress_file)
+
+    log_size = os.path.getsize(storage.log_path(progress_file)) if os.path.exists(storage.log_path(progress_file)) else 0
+    assert log_size <= storage.COMPACT_BYTES
+    assert len(snapshot_format.decode(read(progress_file))['detailed_logs']) > 0 # compacted at least once
+    assert reload(progress_file) == expected
+    assert expected['current_xp'] == 20 and expected['version'] == 20
@@ -0,0 +1,85 @@
+#imports
+import json
+from datetime import date
+import pytest
+import storage
+
+#Tests for history pages (storage.history_page): keyset cursors over the (date, id) order stay stable
+#while entries are logged, and deletes find entries by their id.
+
+
+### Helpers
+
+@pytest.fixture(params=["json", "sqlite"])
+def progress_file(request, tmp_path, monkeypatch):
+    """
+    A progress.json with one "Read" log on each of the first ten days of September 2026, on each backend.
+    """
+    monkeypatch.setattr(storage, "BACKEND", request.param)
+    monkeypatch.setattr(storage, "FSYNC", False)
+    storage.clear_cache()
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    if request.param == "sqlite":
+        import sqlite_store
+        with open(tmp_path / "rewards.json", "w") as f:
+            json.dump({"rewards": [], "money_tracking": {"current_balance": 0, "total_spent": 0, "spending_history": []}}, f)
+        sqlite_store.migrate(path, str(tmp_path / "rewards.json"))
+    log(path, *[("Read", f"2026-09-{day:02d}") for day in range(1, 11)])
+    yield path
+    storage.clear_cache()
+
+def log(progress_file, *entries):
+    """
+    Logs (name, day) daily task completions.
+    """
+    storage.record(progress_file, storage.load(progress_file), [{
+        "event": "task_completed", "task_type": "daily", "name": name, "xp": 1, "category": ["Learning"],
+        "date": day, "period_key": day
+    } for name, day in entries])
+
+def page(progress_file, cursor, limit=3):
+    return storage.history_page(progress_file, storage.load(progress_file), cursor, limit)
+
+def days(entries):
+    return [entry['date'][-2:] for entry in entries]
+
+
+### Tests
+
+def test_next_page_is_stable_when_entries_are_logged(progress_file):
+    first, cursor, newer, total = page(progress_file, None)
+    assert days(first) == ["10", "09", "08"] and (newer, total) == (0, 10)
+
+    log(progress_file, ("Run", "2026-09-11"), ("Run", "2026-09-12")) # newer than the page being read
+    second, cursor, newer, total = page(progress_file, cursor)
+    assert days(second) == ["07", "06", "05"] # nothing repeated or skipped
+    assert total == 12
+
+    log(progress_file, ("Walk", "2026-09-03")) # back-dated below the cursor: shows up in its place
+    third, cursor, newer, total = page(progress_file, cursor)
+    assert days(third) == ["04", "03", "03"]
+    assert [entry['name'] for entry in third] == ["Read", "Walk", "Read"] # same day: newest id first
+
+def test_pages_cover_every_entry_once(progress_file):
+    seen, cursor = [], None
+    while True:
+        entries, cursor, newer, total = page(progress_file, cursor, limit=4)
+        assert newer == len(seen)
+        seen += [entry['id'] for entry in entries]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == total == 10
+
+def test_jump_to_date(progress_file):
+    entries, cursor, newer, total = page(progress_file, storage.date_cursor(date(2026, 9, 5)))
+    assert days(entries) == ["05", "04", "03"] and newer == 5
+
+def test_delete_removes_the_entry_with_that_id(progress_file):
+    log(progress_file, ("Run", "2026-09-10"), ("Run", "2026-09-10")) # two equal entries
+    runs = [entry for entry in page(progress_file, None)[0] if entry['name'] == "Run"]
+    storage.record(progress_file, storage.load(progress_file), [{"event": "log_deleted", "log_id": runs[1]['id'], "date": runs[1]['date']}])
+
+    left = [entry for entry in page(progress_file, None, limit=20)[0] if entry['name'] == "Run"]
+    assert [entry['id'] for entry in left] == [runs[0]['id']]
@@ -0,0 +1,55 @@
+#imports
+import os
+import subprocess
+import sys
+import pytest
+
+#Tests that the headless modules (used by the cron job) import quickly and without Streamlit, pandas or plotly.
+#Each import runs in a fresh interpreter; see benchmarks/import_time.py for the timings.
+
+
+### Helpers
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("streamlit", "pandas", "plotly")
+IMPORT_BUDGET_SECONDS = 1.0 #generous: the headless modules import in tens of milliseconds
+
+PROBE = """
+import sys, time
+
+class Recorder:
+    # Notes every attempt to import a heavy module, even one that is not installed (or is imported in a try block)
+    attempts = []
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in {heavy!r}:
+            self.attempts.append(name)
+        return None
+
+sys.meta_path.insert(0, Recorder())
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+loaded = sorted(name for name in sys.modules if name.split(".")[0] in {heavy!r})
+print(elapsed, ",".join(loaded), ",".join(sorted(set(Recorder.attempts))), sep="|")
+"""
+
+def import_fresh(module):
+    """
+    Imports a module in a new interpreter.
+    Returns:
+        tuple: (import time in seconds, heavy modules in sys.modules, heavy modules it tried to import).
+    """
+    result = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    elapsed, loaded, attempted = result.stdout.strip().splitlines()[-1].split("|")
+    return float(elapsed), [name for name in loaded.split(",") if name], [name for name in attempted.split(",") if name]
+
+
+### Tests
+
+@pytest.mark.parametrize("module", ["core", "auto_reset"])
+def test_headless_module_imports_without_ui_libraries(module):
+    elapsed, loaded, attempted = import_fresh(module)
+    assert loaded == []
+    assert attempted == []
+    assert elapsed < IMPORT_BUDGET_SECONDS
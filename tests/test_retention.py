@@ -0,0 +1,165 @@
+#imports
+import json
+from datetime import date, timedelta
+import pytest
+import retention
+import storage
+import transfer
+
+#Tests for archiving closed completion periods (retention.py and storage.archive_periods).
+
+
+### Helpers
+START = date(2026, 9, 1)
+ARCHIVE_DAY = START + timedelta(days=60) #every September day is closed by then
+
+class Crash(Exception):
+    """
+    Stands in for the process being killed at the injected point.
+    """
+
+def make_tracker(folder, backend, monkeypatch):
+    """
+    Writes an empty tracker and moves it into SQLite for the sqlite backend.
+    """
+    folder.mkdir()
+    progress_file, rewards_file = str(folder / "progress.json"), str(folder / "rewards.json")
+    with open(progress_file, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    with open(rewards_file, "w") as f:
+        json.dump({"rewards": [], "money_tracking": {"current_balance": 0, "total_spent": 0, "spending_history": []}}, f)
+    if backend == "sqlite":
+        import sqlite_store
+        monkeypatch.setattr(storage, "BACKEND", "sqlite")
+        sqlite_store.migrate(progress_file, rewards_file)
+    return progress_file
+
+def log_days(progress_file, days):
+    """
+    Logs the daily task "Read" once for each day in days (a day listed twice is logged twice).
+    """
+    storage.record(progress_file, storage.load(progress_file), [{
+        "event": "task_completed", "task_type": "daily", "name": "Read", "xp": 1, "category": ["Learning"],
+        "date": day.isoformat(), "period_key": day.isoformat()
+    } for day in days])
+
+def log_tasks(progress_file, task_type, name, period_keys, day):
+    """
+    Logs a task once for each period key, all on one day.
+    """
+    storage.record(progress_file, storage.load(progress_file), [{
+        "event": "task_completed", "task_type": task_type, "name": name, "xp": 1, "category": ["Home"],
+        "date": day.isoformat(), "period_key": key
+    } for key in period_keys])
+
+def hot_keys(progress_file, task_type, name):
+    """
+    Gets the period keys still in completed_tasks (the completions table with the sqlite backend).
+    """
+    if storage.BACKEND == "sqlite":
+        import sqlite_store
+        with sqlite_store.connect(progress_file) as conn:
+            rows = conn.execute("SELECT period_key FROM completions WHERE task_type = ? AND task_name = ?", (task_type, name))
+            return sorted(key for (key,) in rows)
+    return sorted(storage.load(progress_file)['completed_tasks'].get(task_type, {}).get(name, {}))
+
+def history(progress_file):
+    return storage.completion_history(progress_file, storage.load(progress_file), "daily", "Read")
+
+def september_total(progress_file):
+    return storage.completion_rollups(progress_file, storage.load(progress_file), "daily", "Read").get("2026-09")
+
+
+### Tests
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    storage.clear_cache()
+    yield
+    storage.clear_cache()
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_completions_imported_into_archived_period_are_added(tmp_path, monkeypatch, backend):
+    days = [START + timedelta(days=i) for i in range(10)]
+    source = make_tracker(tmp_path / "source", "json", monkeypatch)
+    log_days(source, days + [days[3]]) # day 3 twice
+    transfer.export(str(tmp_path / "source"), str(tmp_path / "export"), "jsonl")
+    progress_file = make_tracker(tmp_path / "target", backend, monkeypatch)
+    log_days(progress_file, days)
+    assert retention.archive_closed_periods(progress_file, ARCHIVE_DAY) == 10
+    assert september_total(progress_file) == 10
+
+    assert transfer.import_history(str(tmp_path / "target"), str(tmp_path / "export"))["detailed_logs"] == (1, 10)
+    assert history(progress_file)[days[3].isoformat()] == 2
+    assert retention.archive_closed_periods(progress_file, ARCHIVE_DAY) == 1
+    assert history(progress_file)[days[3].isoformat()] == 2 # added to the archived count, not replacing it
+    assert history(progress_file)[days[4].isoformat()] == 1
+    assert september_total(progress_file) == 11
+
+def test_crash_between_archive_and_progress_counts_once(tmp_path, monkeypatch):
+    progress_file = make_tracker(tmp_path / "tracker", "json", monkeypatch)
+    days = [START + timedelta(days=i) for i in range(5)]
+    log_days(progress_file, days + days[:2])
+    real_record = storage.record_json
+
+    def crash_on_archive_event(file_path, state, events):
+        if events[0]['event'] == "periods_archived":
+            raise Crash()
+        real_record(file_path, state, events)
+    monkeypatch.setattr(storage, "record_json", crash_on_archive_event)
+    with pytest.raises(Crash):
+        retention.archive_closed_periods(progress_file, ARCHIVE_DAY)
+    monkeypatch.setattr(storage, "record_json", real_record)
+
+    # The archive has the counts and progress still has them too; each is counted once
+    expected = {day.isoformat(): 2 if day in days[:2] else 1 for day in days}
+    assert history(progress_file) == expected
+    assert retention.archive_closed_periods(progress_file, ARCHIVE_DAY) == 0 # the next run finishes the crashed one
+    assert history(progress_file) == expected
+    assert storage.load(progress_file)['completed_tasks'].get('daily', {}) == {}
+    assert september_total(progress_file) == 7
+
+def test_same_state_is_archived_once(tmp_path, monkeypatch):
+    # Two processes (the cron job and the app's scheduler) read the same state before either writes the archive
+    progress_file = make_tracker(tmp_path / "tracker", "json", monkeypatch)
+    log_days(progress_file, [START, START])
+    real_update = storage.update
+    other_ran = []
+
+    def other_process_first(file_path, mutate):
+        if file_path == storage.archive_path(progress_file) and not other_ran:
+            other_ran.append(True)
+            monkeypatch.setattr(storage, "update", real_update)
+            storage.archive_periods(progress_file, lambda task_type, period_key: True)
+        return real_update(file_path, mutate)
+    monkeypatch.setattr(storage, "update", other_process_first)
+    retention.archive_closed_periods(progress_file, ARCHIVE_DAY)
+
+    assert other_ran
+    assert history(progress_file) == {START.isoformat(): 2}
+    assert september_total(progress_file) == 2
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_closed_periods_are_archived_and_rolled_up(tmp_path, monkeypatch, backend):
+    today = date(2026, 10, 2) # a Friday of 2026-W40
+    progress_file = make_tracker(tmp_path / "tracker", backend, monkeypatch)
+    days = [START + timedelta(days=i) for i in range(32)] # September 1 to October 2
+    log_days(progress_file, days + [START + timedelta(days=4)])
+    log_tasks(progress_file, "weekly", "Clean", [f"2026-W{week}" for week in range(36, 41)], today)
+    log_tasks(progress_file, "monthly", "Budget", ["2026-08", "2026-09", "2026-10"], today)
+    log_tasks(progress_file, "one_time", "Tax return", ["one-time"], today)
+
+    assert retention.archive_closed_periods(progress_file, today) == 30 + 3 + 1
+    assert hot_keys(progress_file, "daily", "Read") == ["2026-10-01", "2026-10-02"]
+    assert hot_keys(progress_file, "weekly", "Clean") == ["2026-W39", "2026-W40"]
+    assert hot_keys(progress_file, "monthly", "Budget") == ["2026-09", "2026-10"]
+    assert hot_keys(progress_file, "one_time", "Tax return") == ["one-time"]
+
+    progress = storage.load(progress_file)
+    assert storage.completion_rollups(progress_file, progress, "daily", "Read") == {"2026-09": 31, "2026": 31}
+    assert storage.completion_rollups(progress_file, progress, "weekly", "Clean") == {"2026-08": 1, "2026-09": 2, "2026": 3} # W36 starts on August 31
+    assert storage.completion_rollups(progress_file, progress, "monthly", "Budget") == {"2026-08": 1, "2026": 1}
+    expected = {day.isoformat(): 2 if day == START + timedelta(days=4) else 1 for day in days}
+    assert history(progress_file) == expected # the archive and the hot periods together
+    assert retention.archive_closed_periods(progress_file, today) == 0
+    assert history(progress_file) == expected
@@ -0,0 +1,18 @@
+#imports
+from datetime import datetime
+import periods
+import scheduler
+
+#Tests for the scheduler's catch-up run at start (scheduler.catch_up_now).
+
+
+### Tests
+
+def test_no_catch_up_during_grace_period():
+    ctx = periods.period_context(datetime(2026, 10, 17, 0, 30))
+    assert not scheduler.catch_up_now(ctx)
+    assert scheduler.next_run(ctx) == datetime(2026, 10, 17, 1, 0)
+
+def test_catch_up_after_grace_period():
+    assert scheduler.catch_up_now(periods.period_context(datetime(2026, 10, 17, 1, 0)))
+    assert scheduler.catch_up_now(periods.period_context(datetime(2026, 10, 17, 23, 59)))
@@ -0,0 +1,44 @@
+#imports
+import json
+import snapshot_format
+
+#Tests for the compact snapshot format (snapshot_format.py).
+
+
+### Helpers
+LOGS = [
+    {"name": "Workout", "xp": 20, "category": ["Health"], "type": "daily", "date": "2026-10-16", "period_key": "2026-10-16", "id": 1},
+    {"name": "Read", "xp": 10, "category": ["Learning", "Mind"], "type": "daily", "date": "2026-10-16", "period_key": "2026-10-16", "id": 2},
+    {"name": "Cold shower", "xp": 0, "category": ["Penalty"], "type": "penalty", "date": "2026-10-17", "penalty_id": "pen-1", "id": 3},
+    {"name": "Workout", "xp": 20, "category": ["Health"], "type": "daily", "date": "2026-10-17", "period_key": "2026-10-17", "id": 4},
+]
+
+
+### Tests
+
+def test_logs_with_category_lists_are_stored_by_column():
+    state = {"current_xp": 50, "detailed_logs": LOGS * 50, "penalties": [{"id": "pen-1", "completed": True}]}
+    text = snapshot_format.encode(state, "compact")
+    data = json.loads(text)
+    assert "detailed_logs" in data["tables"]
+    assert data["tables"]["detailed_logs"]["interned_lists"] == ["category"]
+    assert len(data["lists"]) == 3
+    assert len(text) < len(json.dumps(state, separators=(',', ':')))
+    assert snapshot_format.decode(text) == state
+
+def test_decoded_rows_do_not_share_lists():
+    rows = snapshot_format.decode(snapshot_format.encode({"detailed_logs": LOGS}, "compact"))["detailed_logs"]
+    rows[0]["category"].append("Changed")
+    assert rows[3]["category"] == ["Health"]
+
+def test_mixed_lists_are_kept_as_they_are():
+    state = {"items": [{"tags": [1, "a"]}, {"tags": []}, {"other": 1}]}
+    assert snapshot_format.decode(snapshot_format.encode(state, "compact")) == state
+
+def test_version_1_snapshots_are_read():
+    text = json.dumps({
+        "__format__": "levelup-compact", "format_version": 1, "strings": ["a"],
+        "tables": {"rows": {"rows": 2, "columns": {"name": [0, 0], "xp": [1, 2]}, "interned": ["name"]}},
+        "state": {"level": 1}, "order": ["level", "rows"],
+    })
+    assert snapshot_format.decode(text) == {"level": 1, "rows": [{"name": "a", "xp": 1}, {"name": "a", "xp": 2}]}
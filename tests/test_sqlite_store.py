@@ -0,0 +1,141 @@
+#imports
+import json
+from datetime import date
+import os
+import threading
+import pytest
+import sqlite_store
+import storage
+
+#Tests for the SQLite backend: connection handling (sqlite_store.connect) and history pages.
+
+
+### Helpers
+
+@pytest.fixture
+def progress_file(tmp_path, monkeypatch):
+    """
+    A data folder migrated to the SQLite backend.
+    """
+    monkeypatch.setattr(storage, "BACKEND", "sqlite")
+    monkeypatch.setattr(storage, "FSYNC", False)
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    with open(tmp_path / "rewards.json", "w") as f:
+        json.dump({"rewards": [], "money_tracking": {"current_balance": 0, "total_spent": 0, "spending_history": []}}, f)
+    sqlite_store.migrate(path, str(tmp_path / "rewards.json"))
+    return path
+
+
+### Tests
+
+def test_connection_is_reused_per_thread(progress_file):
+    conn = sqlite_store.connect(progress_file)
+    assert sqlite_store.connect(progress_file) is conn
+    assert sqlite_store.connect(str(os.path.join(os.path.dirname(progress_file), "rewards.json"))) is conn
+    other = []
+    thread = threading.Thread(target=lambda: other.append(sqlite_store.connect(progress_file)))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+def test_failed_transaction_is_rolled_back(progress_file):
+    with pytest.raises(RuntimeError):
+        with sqlite_store.connect(progress_file) as conn:
+            conn.execute("INSERT INTO category_xp (category, xp) VALUES ('Health', 5)")
+            raise RuntimeError()
+    assert sqlite_store.xp_per_category(progress_file) == {}
+
+def test_replaced_database_gets_new_connection_and_tables(progress_file):
+    conn = sqlite_store.connect(progress_file)
+    db = sqlite_store.db_path(progress_file)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db + suffix):
+            os.remove(db + suffix)
+    new_conn = sqlite_store.connect(progress_file)
+    assert new_conn is not conn
+    assert sqlite_store.completion_count(progress_file, "daily", "Read", "2026-10-16") == 0
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_opens_its_own_connection(progress_file):
+    conn = sqlite_store.connect(progress_file)
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = sqlite_store.connect(progress_file) is not conn and sqlite_store.completion_count(progress_file, "daily", "Read", "x") == 0
+        os.write(write, b"1" if ok else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b"1"
+    assert sqlite_store.connect(progress_file) is conn
+
+def log_tasks(progress_file, count):
+    """
+    Logs the daily task "Read" count times, one day each.
+    """
+    storage.record(progress_file, storage.load(progress_file), [{
+        "event": "task_completed", "task_type": "daily", "name": "Read", "xp": 1, "category": ["Learning"],
+        "date": f"2026-09-{day + 1:02d}", "period_key": f"2026-09-{day + 1:02d}"
+    } for day in range(count)])
+
+def test_history_pages_do_not_count_the_table(progress_file):
+    log_tasks(progress_file, 10)
+    storage.record(progress_file, storage.load(progress_file), [{"event": "log_deleted", "log_id": 5, "date": "2026-09-05"}])
+    statements = []
+    sqlite_store.connect(progress_file).set_trace_callback(statements.append)
+    try:
+        pages, cursor, newer = [], None, []
+        while True:
+            page, cursor, before, total = storage.history_page(progress_file, None, cursor, 4)
+            pages.append([log['date'][-2:] for log in page])
+            newer.append(before)
+            if cursor is None:
+                break
+    finally:
+        sqlite_store.connect(progress_file).set_trace_callback(None)
+
+    assert pages == [["10", "09", "08", "07"], ["06", "04", "03", "02"], ["01"]]
+    assert newer == [0, 4, 8] and total == 9
+    assert not [sql for sql in statements if "COUNT(" in sql.upper()]
+
+def test_jump_cursor_counts_newer_entries_once(progress_file):
+    log_tasks(progress_file, 10)
+    page, cursor, newer, total = storage.history_page(progress_file, None, storage.date_cursor(date(2026, 9, 6)), 3)
+    assert [log['date'][-2:] for log in page] == ["06", "05", "04"] and (newer, total) == (4, 10)
+    page, cursor, newer, total = storage.history_page(progress_file, None, cursor, 3)
+    assert [log['date'][-2:] for log in page] == ["03", "02", "01"] and newer == 7
+
+def test_logging_a_task_writes_only_its_streak_rows(progress_file, monkeypatch):
+    storage.rebuild_streaks(progress_file)
+    storage.record(progress_file, storage.load(progress_file), [{
+        "event": "task_completed", "task_type": "daily", "name": f"Task {i}", "xp": 1, "category": [f"Cat {i}"],
+        "date": "2026-09-01", "period_key": "2026-09-01"
+    } for i in range(30)])
+    written, meta_keys = [], []
+    real_write, real_set_meta = sqlite_store._write_series, sqlite_store._set_meta
+    monkeypatch.setattr(sqlite_store, "_write_series", lambda conn, rows: written.extend(rows) or real_write(conn, rows))
+    monkeypatch.setattr(sqlite_store, "_set_meta", lambda conn, name, key, value: meta_keys.append(key) or real_set_meta(conn, name, key, value))
+    log_tasks(progress_file, 2)
+
+    assert sorted({(kind, name) for kind, name, series in written}) == [("category", "Learning"), ("daily", "Read"), ("overall", "")]
+    assert 'streaks' not in meta_keys
+    stats = storage.load(progress_file)['streaks']
+    assert len(stats['categories']) == 31 and stats['overall']['runs'] == [[date(2026, 9, 1).toordinal(), date(2026, 9, 2).toordinal()]]
+    assert stats['done']['daily'] == {"2026-09-01": 31, "2026-09-02": 1}
+
+def test_streaks_kept_in_meta_move_into_tables(progress_file):
+    log_tasks(progress_file, 3)
+    expected = storage.rebuild_streaks(progress_file)
+    with sqlite_store.connect(progress_file) as conn: # the format before the streak tables
+        for table in ("streak_series", "streak_activity", "streak_done"):
+            conn.execute(f"DELETE FROM {table}")
+        sqlite_store._set_meta(conn, 'progress', 'streaks', expected)
+    sqlite_store._schema_ready.clear()
+    for inode, conn in sqlite_store._local.connections.values():
+        conn.close()
+    sqlite_store._local.connections.clear()
+
+    assert storage.load(progress_file)['streaks'] == expected
+    with sqlite_store.connect(progress_file) as conn:
+        assert sqlite_store._get_meta(conn, 'progress')['streaks'] == {"kept_from": {}}
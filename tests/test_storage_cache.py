@@ -0,0 +1,70 @@
+#imports
+import json
+import threading
+import time
+import pytest
+import storage
+
+#Tests for the process-wide load cache (storage.load_json and the state record_json keeps in it).
+
+
+### Helpers
+
+@pytest.fixture
+def progress_file(tmp_path, monkeypatch):
+    """
+    A progress.json with no history yet.
+    """
+    monkeypatch.setattr(storage, "FSYNC", False)
+    storage.clear_cache()
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    yield path
+    storage.clear_cache()
+
+def task_event(name, xp=10):
+    return {"event": "task_completed", "task_type": "daily", "name": name, "xp": xp, "category": ["Health"],
+            "date": "2026-10-16", "period_key": "2026-10-16"}
+
+
+### Tests
+
+def test_cache_hit_returns_a_copy(progress_file):
+    first = storage.load_json(progress_file)
+    first['detailed_logs'].append({"name": "changed by the caller"})
+    assert storage.load_json(progress_file)['detailed_logs'] == []
+    assert storage.cache_stats()['hits'] == 1
+
+def test_reader_never_copies_a_half_folded_cache(progress_file, monkeypatch):
+    # The reader passes the cache check, then the writer folds an event into the cached state while the reader copies it
+    state = storage.load_json(progress_file) # cached
+    real_fold, real_copy = storage._fold, storage._copy
+    copying, folding = threading.Event(), threading.Event()
+    loaded = []
+
+    def slow_copy(obj):
+        if threading.current_thread() is thread and not copying.is_set():
+            copying.set()
+            folding.wait(0.3) # without the lock, the writer is halfway through its fold by now
+        return real_copy(obj)
+
+    def slow_fold(state, record):
+        cached = storage._cache_get(progress_file)
+        if cached is not None and state is cached[1]:
+            state['half_folded'] = True # stands in for a fold that is only partly done
+            folding.set()
+            time.sleep(0.1)
+            del state['half_folded']
+        real_fold(state, record)
+    monkeypatch.setattr(storage, "_copy", slow_copy)
+    monkeypatch.setattr(storage, "_fold", slow_fold)
+
+    thread = threading.Thread(target=lambda: loaded.append(storage.load_json(progress_file)))
+    thread.start()
+    copying.wait(5)
+    storage.record_json(progress_file, state, [task_event("Run")])
+    thread.join(5)
+
+    assert 'half_folded' not in loaded[0]
+    assert storage.load_json(progress_file)['current_xp'] == 10
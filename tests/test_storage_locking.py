@@ -0,0 +1,102 @@
+#imports
+import json
+import os
+import subprocess
+import sys
+import pytest
+import storage
+
+#Tests for writes from several sessions or processes to the same state file (see storage.file_lock):
+#a write from a stale state is rebased onto the file instead of overwriting it, a stale full save
+#is refused, and concurrent processes lose no events.
+
+
+### Helpers
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WRITER = """
+import storage
+storage.FSYNC = False
+for i in range({count}):
+    storage.record({path!r}, storage.load({path!r}), [{{
+        "event": "task_completed", "task_type": "daily", "name": "Writer {writer}", "xp": 1, "category": ["Health"],
+        "date": "2026-10-16", "period_key": "2026-10-16"
+    }}])
+"""
+
+@pytest.fixture(params=["json", "sqlite"])
+def progress_file(request, tmp_path, monkeypatch):
+    """
+    A progress.json with no history yet, on each backend.
+    """
+    monkeypatch.setattr(storage, "BACKEND", request.param)
+    monkeypatch.setattr(storage, "FSYNC", False)
+    storage.clear_cache()
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    if request.param == "sqlite":
+        import sqlite_store
+        with open(tmp_path / "rewards.json", "w") as f:
+            json.dump({"rewards": [], "money_tracking": {"current_balance": 0, "total_spent": 0, "spending_history": []}}, f)
+        sqlite_store.migrate(path, str(tmp_path / "rewards.json"))
+    yield path
+    storage.clear_cache()
+
+def task_event(name, xp=10):
+    return {"event": "task_completed", "task_type": "daily", "name": name, "xp": xp, "category": ["Health"],
+            "date": "2026-10-16", "period_key": "2026-10-16"}
+
+def names(progress_file):
+    progress = storage.load(progress_file)
+    if storage.BACKEND == "sqlite":
+        import sqlite_store
+        return sorted(log['name'] for log in sqlite_store.history_page(progress_file, None, 1000)[0])
+    return sorted(log['name'] for log in progress['detailed_logs'])
+
+
+### Tests
+
+def test_stale_write_is_rebased_onto_the_other_writers_changes(progress_file):
+    session = storage.load(progress_file)
+    cron = storage.load(progress_file) # both loaded the same version
+    version = session.get('version', 0)
+    conflicts = storage.lock_stats()['conflicts']
+    storage.record(progress_file, cron, [{"event": "penalty_assigned", "penalty": {"id": "p1", "description": "No sweets", "completed": False}}])
+    storage.record(progress_file, session, [task_event("Run")])
+
+    assert storage.lock_stats()['conflicts'] == conflicts + 1
+    assert [p['id'] for p in session['penalties']] == ["p1"] # the session now has the cron job's penalty
+    assert session['current_xp'] == 10
+    storage.clear_cache()
+    progress = storage.load(progress_file)
+    assert [p['id'] for p in progress['penalties']] == ["p1"] and progress['current_xp'] == 10
+    assert progress['version'] == session['version'] == version + 2
+
+def test_stale_full_save_is_refused(progress_file):
+    stale = storage.load(progress_file)
+    storage.record(progress_file, storage.load(progress_file), [task_event("Run")])
+    saves = storage.lock_stats()['stale_saves']
+    stale['current_xp'] = 500
+    with pytest.raises(storage.StaleStateError):
+        storage.save(progress_file, stale)
+
+    assert storage.lock_stats()['stale_saves'] == saves + 1
+    assert storage.load(progress_file)['current_xp'] == 10
+    storage.update(progress_file, lambda progress: progress.update(note="updated")) # update() works on the current version
+    progress = storage.load(progress_file)
+    assert progress['note'] == "updated" and progress['current_xp'] == 10
+
+def test_concurrent_processes_lose_no_events(progress_file):
+    writers, count = 4, 25
+    env = dict(os.environ, LEVELUP_STORAGE=storage.BACKEND)
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WRITER.format(path=progress_file, count=count, writer=writer)], cwd=REPO_DIR, env=env)
+        for writer in range(writers)
+    ]
+    assert [process.wait() for process in processes] == [0] * writers
+
+    storage.clear_cache()
+    assert storage.load(progress_file)['current_xp'] == writers * count
+    assert names(progress_file) == sorted(f"Writer {writer}" for writer in range(writers) for i in range(count))
+    assert storage.lock_stats()['acquisitions'] > 0
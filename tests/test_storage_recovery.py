@@ -0,0 +1,195 @@
+#imports
+import json
+import os
+import subprocess
+import sys
+import pytest
+import storage
+
+#Fault-injection tests for the crash safety of JSON storage (see the storage.py module comment):
+#each test stops a write at a chosen point, as a killed process would, and checks that the next
+#load or recover() gives back a consistent state with every completed write and nothing applied twice.
+
+
+### Helpers
+
+class Crash(Exception):
+    """
+    Stands in for the process being killed at the injected point.
+    """
+
+@pytest.fixture
+def progress_file(tmp_path, monkeypatch):
+    """
+    A progress.json with no history yet.
+    """
+    monkeypatch.setattr(storage, "FSYNC", False)
+    storage.clear_cache()
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    yield path
+    storage.clear_cache()
+
+def log_task(progress_file, name, xp=10):
+    """
+    Records one completed daily task.
+    """
+    storage.record(progress_file, storage.load(progress_file), [{
+        "event": "task_completed", "task_type": "daily", "name": name, "xp": xp, "category": ["Health"],
+        "date": "2026-10-16", "period_key": "2026-10-16"
+    }])
+
+def reload(progress_file):
+    """
+    Loads the file as a freshly started process would (nothing cached).
+    """
+    storage.clear_cache()
+    return storage.load(progress_file)
+
+def compact(progress_file):
+    """
+    Saves the state with a note as a new snapshot, which clears the event log.
+    """
+    state = storage.load(progress_file)
+    state['note'] = "compacted"
+    storage.save(progress_file, state)
+
+def names(state):
+    return [log['name'] for log in state['detailed_logs']]
+
+def dead_pid():
+    """
+    Gets the id of a process that has exited.
+    """
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+### Event Log
+
+def test_torn_log_tail_is_ignored_and_cut_off(progress_file):
+    log_task(progress_file, "Run")
+    log_task(progress_file, "Swim")
+    with open(storage.log_path(progress_file), "a") as f:
+        f.write('{"event":"task_completed","task_type":"daily","na') # killed mid-append
+
+    assert storage.recover(progress_file) == ["removed a half-written event from the log"]
+    with open(storage.log_path(progress_file), "rb") as f:
+        assert f.read().endswith(b"}\n")
+    state = reload(progress_file)
+    assert names(state) == ["Run", "Swim"] and state['current_xp'] == 20
+
+    log_task(progress_file, "Bike")
+    assert names(reload(progress_file)) == ["Run", "Swim", "Bike"]
+
+def test_torn_log_tail_is_ignored_on_load(progress_file):
+    log_task(progress_file, "Run")
+    with open(storage.log_path(progress_file), "a") as f:
+        f.write('{"event":"task_co')
+    storage.clear_cache()
+    assert names(storage._parse(progress_file)) == ["Run"] # reading alone skips the torn line
+    state = reload(progress_file)
+    assert names(state) == ["Run"] and state['current_xp'] == 10
+    assert storage.recover(progress_file) == [] # loading already cut it off
+
+def test_torn_log_tail_is_cut_off_before_the_next_append(progress_file):
+    log_task(progress_file, "Run")
+    with open(storage.log_path(progress_file), "a") as f:
+        f.write('{"event":"task_co')
+    log_task(progress_file, "Swim") # without recover() first
+    state = reload(progress_file)
+    assert names(state) == ["Run", "Swim"] and state['current_xp'] == 20
+
+
+### Compaction Journal
+
+def test_complete_journal_finishes_compaction(progress_file, monkeypatch):
+    log_task(progress_file, "Run")
+    real_write = storage.atomic_write
+
+    def crash_after_journal(path, text):
+        real_write(path, text)
+        if path.endswith(storage.JOURNAL_SUFFIX):
+            raise Crash()
+    monkeypatch.setattr(storage, "atomic_write", crash_after_journal)
+    with pytest.raises(Crash):
+        compact(progress_file)
+    monkeypatch.setattr(storage, "atomic_write", real_write)
+
+    assert os.path.exists(storage.journal_path(progress_file))
+    assert storage.recover(progress_file) == ["finished an interrupted compaction from the journal"]
+    assert not os.path.exists(storage.journal_path(progress_file))
+    assert not os.path.exists(storage.log_path(progress_file))
+    state = reload(progress_file)
+    assert state['note'] == "compacted" and names(state) == ["Run"] and state['current_xp'] == 10
+
+def test_incomplete_journal_is_discarded(progress_file):
+    log_task(progress_file, "Run")
+    with open(storage.journal_path(progress_file), "w") as f:
+        f.write('{"current_xp": 999, "detailed_logs": [') # killed while writing the journal
+
+    assert storage.recover(progress_file) == ["discarded an incomplete compaction journal"]
+    assert not os.path.exists(storage.journal_path(progress_file))
+    state = reload(progress_file)
+    assert names(state) == ["Run"] and state['current_xp'] == 10
+
+def test_journal_is_recovered_on_load(progress_file, monkeypatch):
+    log_task(progress_file, "Run")
+    real_write = storage.atomic_write
+
+    def crash_after_journal(path, text):
+        real_write(path, text)
+        if path.endswith(storage.JOURNAL_SUFFIX):
+            raise Crash()
+    monkeypatch.setattr(storage, "atomic_write", crash_after_journal)
+    with pytest.raises(Crash):
+        compact(progress_file)
+    monkeypatch.setattr(storage, "atomic_write", real_write)
+
+    state = reload(progress_file) # no explicit recover()
+    assert state['note'] == "compacted" and state['current_xp'] == 10
+    assert not os.path.exists(storage.journal_path(progress_file))
+
+def test_crash_between_snapshot_replace_and_log_truncation(progress_file, monkeypatch):
+    log_task(progress_file, "Run")
+    log_task(progress_file, "Swim")
+    real_remove = storage._remove
+
+    def crash_before_log_removal(path):
+        if path == storage.log_path(progress_file):
+            raise Crash()
+        real_remove(path)
+    monkeypatch.setattr(storage, "_remove", crash_before_log_removal)
+    with pytest.raises(Crash):
+        compact(progress_file)
+    monkeypatch.setattr(storage, "_remove", real_remove)
+
+    # The new snapshot already holds the logged events and the old log is still there
+    assert os.path.exists(storage.log_path(progress_file))
+    state = reload(progress_file)
+    assert names(state) == ["Run", "Swim"] and state['current_xp'] == 20 # not applied twice
+    assert state['note'] == "compacted"
+    assert not os.path.exists(storage.log_path(progress_file))
+    assert storage.recover(progress_file) == []
+
+    log_task(progress_file, "Bike")
+    assert reload(progress_file)['current_xp'] == 30
+
+
+### Temp Files
+
+def test_leftover_temp_files_are_removed(progress_file):
+    pid = dead_pid()
+    leftovers = [f"{progress_file}.tmp-{pid}", f"{storage.journal_path(progress_file)}.tmp-{pid}"]
+    ours = f"{progress_file}.tmp-{os.getpid()}"
+    for path in leftovers + [ours]:
+        with open(path, "w") as f:
+            f.write('{"current_xp": 999')
+
+    actions = storage.recover(progress_file)
+    assert sorted(actions) == sorted(f"removed leftover temp file {os.path.basename(path)}" for path in leftovers)
+    assert not any(os.path.exists(path) for path in leftovers)
+    assert os.path.exists(ours) # may still be written by this process
+    assert reload(progress_file)['current_xp'] == 0
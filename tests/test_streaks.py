@@ -0,0 +1,116 @@
+#imports
+import json
+from datetime import date, timedelta
+import pytest
+import retention
+import storage
+import streaks
+
+#Tests that the streak statistics kept by the event handlers match a rebuild from the history.
+
+
+### Helpers
+START = date(2026, 9, 1)
+
+@pytest.fixture(params=["json", "sqlite"])
+def progress_file(request, tmp_path, monkeypatch):
+    """
+    An empty progress.json with the streak statistics kept, on each backend.
+    """
+    monkeypatch.setattr(storage, "BACKEND", request.param)
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    if request.param == "sqlite":
+        import sqlite_store
+        with open(tmp_path / "rewards.json", "w") as f:
+            json.dump({"rewards": [], "money_tracking": {"current_balance": 0, "total_spent": 0, "spending_history": []}}, f)
+        sqlite_store.migrate(path, str(tmp_path / "rewards.json"))
+    storage.rebuild_streaks(path)
+    return path
+
+def log_days(progress_file, days):
+    """
+    Logs the daily task "Read" on each day.
+    """
+    progress = storage.load(progress_file)
+    storage.record(progress_file, progress, [{
+        "event": "task_completed", "task_type": "daily", "name": "Read", "xp": 1, "category": ["Learning"],
+        "date": day.isoformat(), "period_key": day.isoformat()
+    } for day in days])
+
+def log_task(progress_file, name, category, day):
+    """
+    Logs a one-time task of one category on a day.
+    """
+    storage.record(progress_file, storage.load(progress_file), [{
+        "event": "task_completed", "task_type": "one_time", "name": name, "xp": 1, "category": [category],
+        "date": day.isoformat(), "period_key": "one_time"
+    }])
+
+def delete_log(progress_file, log):
+    storage.record(progress_file, storage.load(progress_file), [{"event": "log_deleted", "log_id": log['id'], "date": log['date']}])
+
+def history(progress_file):
+    """
+    Gets every detailed_logs entry, oldest first.
+    """
+    if storage.BACKEND == "sqlite":
+        import sqlite_store
+        return list(reversed(sqlite_store.history_page(progress_file, None, 1000)[0]))
+    return storage.load(progress_file)['detailed_logs']
+
+
+### Tests
+
+def test_deleting_archived_log_updates_streaks(progress_file):
+    log_days(progress_file, [START + timedelta(days=i) for i in range(10)])
+    assert retention.archive_closed_periods(progress_file, START + timedelta(days=30)) == 10
+    fourth = history(progress_file)[3]
+    storage.record(progress_file, storage.load(progress_file), [{"event": "log_deleted", "log_id": fourth['id'], "date": fourth['date']}])
+
+    stats = storage.load(progress_file)['streaks']
+    expected = streaks.build(history(progress_file))
+    assert stats['overall'] == expected['overall']
+    assert stats['overall']['longest'] == 6
+    assert stats['categories'] == expected['categories']
+    assert stats['tasks'] == expected['tasks']
+    assert stats['done'] == expected['done']
+
+def test_deleting_one_of_two_archived_logs_keeps_the_period(progress_file):
+    day = START.isoformat()
+    log_days(progress_file, [START, START, START + timedelta(days=1)])
+    retention.archive_closed_periods(progress_file, START + timedelta(days=30))
+    first = history(progress_file)[0]
+    storage.record(progress_file, storage.load(progress_file), [{"event": "log_deleted", "log_id": first['id'], "date": first['date']}])
+
+    stats = storage.load(progress_file)['streaks']
+    assert stats == streaks.build(history(progress_file))
+    assert stats['done']['daily'][day] == 1
+
+def test_day_buckets_are_dropped_once_closed(progress_file):
+    days = [START + timedelta(days=i) for i in range(3 * 366)]
+    log_days(progress_file, days)
+
+    stats = storage.load(progress_file)['streaks']
+    assert len(stats['activity']) <= 2 * streaks.KEEP["activity"]
+    assert len(stats['done']['daily']) <= 2 * streaks.KEEP["daily"]
+    assert stats['overall'] == {"runs": [[days[0].toordinal(), days[-1].toordinal()]], "longest": len(days)}
+    cells = streaks.heatmap(stats, "daily", 1, days[-1].isoformat(), streaks.KEEP["daily"])
+    assert [rate for key, rate in cells] == [1.0] * streaks.KEEP["daily"]
+
+def test_deleting_logs_of_a_dropped_day(progress_file):
+    log_task(progress_file, "Run", "Health", START)
+    log_task(progress_file, "Essay", "Learning", START)
+    log_days(progress_file, [START + timedelta(days=i) for i in range(1, 10)])
+    assert streaks.day_dropped(storage.load(progress_file)['streaks'], START.isoformat())
+    run, essay = history(progress_file)[:2]
+
+    delete_log(progress_file, run)
+    stats = storage.load(progress_file)['streaks']
+    assert stats['categories']['Health']['runs'] == []
+    assert stats['overall']['runs'][0][0] == START.toordinal() # Essay is still logged that day
+    delete_log(progress_file, essay)
+    stats = storage.load(progress_file)['streaks']
+    assert stats['categories']['Learning']['runs'][0][0] == START.toordinal() + 1 # "Read" starts the next day
+    assert stats['overall']['runs'][0][0] == START.toordinal() + 1
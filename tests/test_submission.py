@@ -0,0 +1,90 @@
+#imports
+import json
+from datetime import datetime
+import pytest
+import core
+import periods
+import storage
+
+#Tests that a submission of checked tasks of several task types (core.submission_events, recorded by
+#app.process_task_submission) is one write, and that a failure part way through applies nothing.
+
+
+### Helpers
+CTX = periods.period_context(datetime(2026, 10, 16, 12, 0))
+CHECKED = {
+    "daily": [{"name": "Run", "xp": 10, "category": ["Health"]}, {"name": "Read", "xp": 5, "category": ["Learning"]}],
+    "weekly": [{"name": "Clean", "xp": 20, "category": ["Home"]}],
+    "one-time": [{"name": "Tax return", "xp": 50, "category": ["Admin"]}],
+}
+
+class Crash(Exception):
+    """
+    Stands in for an event that fails to apply.
+    """
+
+@pytest.fixture(params=["json", "sqlite"])
+def progress_file(request, tmp_path, monkeypatch):
+    """
+    A progress.json with no history yet, on each backend.
+    """
+    monkeypatch.setattr(storage, "BACKEND", request.param)
+    monkeypatch.setattr(storage, "FSYNC", False)
+    storage.clear_cache()
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    if request.param == "sqlite":
+        import sqlite_store
+        with open(tmp_path / "rewards.json", "w") as f:
+            json.dump({"rewards": [], "money_tracking": {"current_balance": 0, "total_spent": 0, "spending_history": []}}, f)
+        sqlite_store.migrate(path, str(tmp_path / "rewards.json"))
+    yield path
+    storage.clear_cache()
+
+def counts(progress_file):
+    """
+    Gets the completion count of every checked task for its current period.
+    """
+    progress = storage.load(progress_file)
+    return {task['name']: storage.completion_count(progress_file, progress, ttype, task['name'], core.get_period_key(ttype, CTX))
+            for ttype, tasks in CHECKED.items() for task in tasks}
+
+def handlers(progress_file):
+    if storage.BACKEND == "sqlite":
+        import sqlite_store
+        return sqlite_store.EVENT_HANDLERS
+    return storage.EVENT_HANDLERS
+
+
+### Tests
+
+def test_submission_of_all_task_types_is_one_write(progress_file):
+    progress = storage.load(progress_file)
+    version = progress.get('version', 0)
+    events, completed, earned_xp = core.submission_events(CHECKED, CTX)
+    storage.record(progress_file, progress, events)
+
+    assert completed == {"daily": ["Run", "Read"], "weekly": ["Clean"], "one-time": ["Tax return"]}
+    assert earned_xp == 85 and progress['current_xp'] == 85
+    assert storage.load(progress_file)['version'] == version + 1
+    assert counts(progress_file) == {"Run": 1, "Read": 1, "Clean": 1, "Tax return": 1}
+    if storage.BACKEND == "json":
+        with open(storage.log_path(progress_file)) as f:
+            assert len(f.read().splitlines()) == 1
+
+def test_failed_submission_applies_nothing(progress_file, monkeypatch):
+    progress = storage.load(progress_file)
+    before = json.loads(json.dumps(progress))
+
+    def fail(state, event):
+        raise Crash()
+    monkeypatch.setitem(handlers(progress_file), "day_logged", fail) # the last event, after every task_completed
+    events, completed, earned_xp = core.submission_events(CHECKED, CTX)
+    with pytest.raises(Crash):
+        storage.record(progress_file, progress, events)
+
+    assert progress == before # the session state is rolled back too
+    storage.clear_cache()
+    assert storage.load(progress_file) == before
+    assert counts(progress_file) == {"Run": 0, "Read": 0, "Clean": 0, "Tax return": 0}
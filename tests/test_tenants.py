@@ -0,0 +1,73 @@
+#imports
+import json
+import os
+import pytest
+import storage
+import tenants
+
+#Tests for multi-player mode (tenants.py): user names are checked before they become folder names,
+#and every player's files are kept apart.
+
+
+### Helpers
+
+@pytest.fixture
+def tenants_dir(tmp_path, monkeypatch):
+    """
+    Turns on multi-player mode with an empty users folder.
+    """
+    monkeypatch.setattr(storage, "BACKEND", "json")
+    monkeypatch.setattr(storage, "FSYNC", False)
+    monkeypatch.setattr(tenants, "TENANTS_DIR", str(tmp_path / "users"))
+    storage.clear_cache()
+    yield str(tmp_path / "users")
+    storage.clear_cache()
+
+@pytest.fixture
+def tasks_file(tmp_path):
+    path = tmp_path / "tasks.json"
+    path.write_text(json.dumps({"daily": [{"name": "Read", "xp": 10, "category": ["Learning"]}], "weekly": [], "monthly": [], "one_time": []}))
+    return str(path)
+
+
+### Tests
+
+@pytest.mark.parametrize("user", ["alice", "Bob_2", "team-a", "x" * 64])
+def test_valid_user_names(user):
+    assert tenants.valid_user(user)
+
+@pytest.mark.parametrize("user", ["", None, ".", "..", "../alice", "alice/../bob", "a/b", "a\\b", "al ice", "alice\n", "x" * 65])
+def test_invalid_user_names_are_refused(tenants_dir, user):
+    assert not tenants.valid_user(user)
+    with pytest.raises(ValueError):
+        tenants.data_dir(user)
+    assert not tenants.exists(user)
+
+def test_players_have_separate_files(tenants_dir, tasks_file):
+    alice, bob = tenants.add_user("alice", tasks_file), tenants.add_user("bob", tasks_file)
+    assert os.path.dirname(alice) == os.path.dirname(bob) == tenants_dir
+    alice_files, bob_files = tenants.data_files(alice), tenants.data_files(bob)
+    storage.record(alice_files["progress"], storage.load(alice_files["progress"]), [{
+        "event": "task_completed", "task_type": "daily", "name": "Read", "xp": 10, "category": ["Learning"],
+        "date": "2026-10-16", "period_key": "2026-10-16"
+    }])
+
+    assert storage.load(alice_files["progress"])['current_xp'] == 10
+    assert storage.load(bob_files["progress"])['current_xp'] == 0
+    assert tenants.list_users() == ["alice", "bob"]
+    assert tenants.all_data_dirs() == [("alice", alice), ("bob", bob)]
+    with pytest.raises(ValueError):
+        tenants.add_user("alice", tasks_file)
+
+def test_folder_without_tasks_is_not_a_player(tenants_dir, tasks_file):
+    tenants.add_user("alice", tasks_file)
+    os.makedirs(os.path.join(tenants_dir, "half-added"))
+    os.makedirs(os.path.join(tenants_dir, "not a name"))
+    assert tenants.list_users() == ["alice"]
+
+def test_single_player_mode_uses_the_data_folder(monkeypatch):
+    monkeypatch.setattr(tenants, "TENANTS_DIR", None)
+    assert tenants.data_dir("anything") == tenants.DEFAULT_DATA_DIR
+    assert tenants.all_data_dirs() == [(None, tenants.DEFAULT_DATA_DIR)]
+    with pytest.raises(ValueError):
+        tenants.add_user("alice")
@@ -0,0 +1,124 @@
+#imports
+import json
+from datetime import date, timedelta
+import pytest
+import storage
+import transfer
+
+#Tests for merging trackers with transfer.export / transfer.import_history (JSON backend).
+
+
+### Helpers
+
+def make_tracker(folder, days, balance=0):
+    """
+    Writes a tracker that logged the daily task "Read" on each day.
+    """
+    folder.mkdir()
+    with open(folder / "progress.json", "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    with open(folder / "rewards.json", "w") as f:
+        json.dump({"rewards": [], "money_tracking": {"current_balance": balance, "total_spent": 0, "spending_history": []}}, f)
+    progress_file = str(folder / "progress.json")
+    progress = storage.load(progress_file)
+    storage.record(progress_file, progress, [{
+        "event": "task_completed", "task_type": "daily", "name": "Read", "xp": 1, "category": ["Learning"],
+        "date": day.isoformat(), "period_key": day.isoformat()
+    } for day in days])
+    return str(folder)
+
+def log_summaries(folder, days):
+    """
+    Records a day summary and a spending entry for each day, in the given order.
+    """
+    progress_file, rewards_file = str(folder) + "/progress.json", str(folder) + "/rewards.json"
+    storage.record(progress_file, storage.load(progress_file), [
+        {"event": "day_logged", "date": day.isoformat(), "completed": {"daily": ["Read"]}, "earned_xp": 1, "level": 1} for day in days
+    ])
+    storage.record(rewards_file, storage.load(rewards_file), [
+        {"event": "spending_added", "date": day.isoformat(), "amount": 1.0, "description": "Coffee"} for day in days
+    ])
+
+def use_sqlite(folder, monkeypatch):
+    """
+    Moves a tracker into its SQLite database and selects that backend.
+    """
+    import sqlite_store
+    monkeypatch.setattr(storage, "BACKEND", "sqlite")
+    sqlite_store.migrate(str(folder) + "/progress.json", str(folder) + "/rewards.json")
+
+def exported_dates(folder, table):
+    """
+    Gets the dates of an exported table, in file order.
+    """
+    return [row['date'] for chunk in transfer.read_file(transfer.find_file(str(folder), table), table) for row in chunk]
+
+def log_keys(folder):
+    """
+    Gets the (date, id) of every detailed_logs entry of a tracker, in stored order.
+    """
+    storage.clear_cache()
+    return [(log['date'], log['id']) for log in storage.load(str(folder) + "/progress.json")['detailed_logs']]
+
+
+### Tests
+START = date(2026, 9, 1)
+
+def test_merge_interleaves_histories_in_date_order(tmp_path):
+    even = make_tracker(tmp_path / "even", [START + timedelta(days=i) for i in range(0, 20, 2)])
+    odd = make_tracker(tmp_path / "odd", [START + timedelta(days=i) for i in range(1, 20, 2)])
+    transfer.export(odd, str(tmp_path / "export"), "jsonl")
+
+    report = transfer.import_history(even, str(tmp_path / "export"))
+    assert report["detailed_logs"] == (10, 0)
+    keys = log_keys(even)
+    assert [d for d, _ in keys] == [(START + timedelta(days=i)).isoformat() for i in range(20)]
+    assert keys == sorted(keys)
+    assert storage.load(even + "/progress.json")['current_xp'] == 20
+
+def test_import_is_idempotent(tmp_path):
+    days = [START + timedelta(days=i) for i in range(5)]
+    source = make_tracker(tmp_path / "source", days)
+    target = make_tracker(tmp_path / "target", days[:2])
+    transfer.export(source, str(tmp_path / "export"), "csv")
+
+    assert transfer.import_history(target, str(tmp_path / "export"))["detailed_logs"] == (3, 2)
+    assert transfer.import_history(target, str(tmp_path / "export"))["detailed_logs"] == (0, 5)
+    assert len(log_keys(target)) == 5
+
+def test_spending_that_overdraws_the_balance_is_refused(tmp_path):
+    source = make_tracker(tmp_path / "source", [START], balance=50)
+    rewards_file = source + "/rewards.json"
+    storage.record(rewards_file, storage.load(rewards_file), [{"event": "spending_added", "date": START.isoformat(), "amount": 30.0, "description": "Book"}])
+    transfer.export(source, str(tmp_path / "export"), "jsonl")
+    target = make_tracker(tmp_path / "target", [], balance=10)
+
+    with pytest.raises(ValueError, match="spending_history"):
+        transfer.import_history(target, str(tmp_path / "export"))
+    assert log_keys(target) == [] # nothing imported
+
+    report = transfer.import_history(target, str(tmp_path / "export"), ["detailed_logs"])
+    assert report == {"detailed_logs": (1, 0)}
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_merged_tracker_exports_by_date_and_imports_again(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(transfer, "CHUNK_ROWS", 4)
+    days = [START + timedelta(days=i) for i in range(20)]
+    older = make_tracker(tmp_path / "older", [], balance=100)
+    log_summaries(older, days[:10])
+    merged = make_tracker(tmp_path / "merged", [], balance=100)
+    log_summaries(merged, days[10:])
+    fresh = make_tracker(tmp_path / "fresh", [], balance=100)
+    if backend == "sqlite":
+        for folder in (older, merged, fresh):
+            use_sqlite(folder, monkeypatch)
+    transfer.export(older, str(tmp_path / "older_export"), "csv")
+    transfer.import_history(merged, str(tmp_path / "older_export")) # older rows are added after the newer ones
+
+    transfer.export(merged, str(tmp_path / "merged_export"), "jsonl")
+    for table in ("daily_logs", "spending_history"):
+        assert exported_dates(tmp_path / "merged_export", table) == [day.isoformat() for day in days]
+    report = transfer.import_history(fresh, str(tmp_path / "merged_export"))
+    assert report["daily_logs"] == (20, 0) and report["spending_history"] == (20, 0)
+    report = transfer.import_history(merged, str(tmp_path / "merged_export"))
+    assert report["daily_logs"] == (0, 20) and report["spending_history"] == (0, 20)
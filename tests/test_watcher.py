@@ -0,0 +1,25 @@
+#imports
+import json
+import os
+import storage
+import watcher
+
+#Tests for watcher.py and the load cache it shares with the sessions.
+
+
+### Tests
+
+def test_watcher_and_session_share_one_cache_entry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(watcher, "_watched", {})
+    monkeypatch.setattr(watcher, "_aliases", {})
+    os.mkdir("data")
+    with open("data/progress.json", "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    storage.clear_cache()
+
+    watcher.watch("data/progress.json", storage.current_version) # keyed by the absolute path
+    storage.load("data/progress.json") # the session's relative path
+    stats = storage.cache_stats()
+    assert (stats['files'], stats['hits'], stats['misses']) == (1, 1, 1)
+    storage.clear_cache()
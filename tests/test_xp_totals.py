@@ -0,0 +1,80 @@
+#imports
+import json
+import pytest
+import storage
+
+#Tests that the running per-category XP totals (progress['xp_by_category'] or the category_xp table)
+#match a full rescan of detailed_logs as tasks and penalties are logged and deleted.
+
+
+### Helpers
+
+@pytest.fixture(params=["json", "sqlite"])
+def progress_file(request, tmp_path, monkeypatch):
+    """
+    A progress.json with no history yet, on each backend.
+    """
+    monkeypatch.setattr(storage, "BACKEND", request.param)
+    monkeypatch.setattr(storage, "FSYNC", False)
+    storage.clear_cache()
+    path = str(tmp_path / "progress.json")
+    with open(path, "w") as f:
+        json.dump({"current_xp": 0, "current_level": 1, "completed_tasks": {}, "penalties": [], "detailed_logs": []}, f)
+    if request.param == "sqlite":
+        import sqlite_store
+        with open(tmp_path / "rewards.json", "w") as f:
+            json.dump({"rewards": [], "money_tracking": {"current_balance": 0, "total_spent": 0, "spending_history": []}}, f)
+        sqlite_store.migrate(path, str(tmp_path / "rewards.json"))
+    yield path
+    storage.clear_cache()
+
+def task_event(name, xp, categories, day):
+    return {"event": "task_completed", "task_type": "daily", "name": name, "xp": xp, "category": categories,
+            "date": day, "period_key": day}
+
+def history(progress_file):
+    """
+    Gets every detailed_logs entry, oldest first.
+    """
+    if storage.BACKEND == "sqlite":
+        import sqlite_store
+        return list(reversed(sqlite_store.history_page(progress_file, None, 1000)[0]))
+    return storage.load(progress_file)['detailed_logs']
+
+def rescan(progress_file):
+    return {cat: xp for cat, xp in storage.recompute_xp_by_category(history(progress_file)).items() if xp}
+
+def totals(progress_file):
+    return {cat: xp for cat, xp in storage.xp_per_category(progress_file, storage.load(progress_file)).items() if xp}
+
+
+### Tests
+
+def test_running_totals_match_a_full_rescan(progress_file):
+    storage.record(progress_file, storage.load(progress_file), [
+        task_event("Run", 10, ["Health"], "2026-10-01"),
+        task_event("Read", 5, ["Learning", "Focus"], "2026-10-01"),
+        task_event("Swim", 20, ["Health", "Focus"], "2026-10-02"),
+        {"event": "penalty_assigned", "penalty": {"id": "p1", "description": "No sweets", "completed": False}},
+    ])
+    storage.record(progress_file, storage.load(progress_file), [{"event": "penalty_completed", "penalty_id": "p1", "date": "2026-10-02"}])
+    assert totals(progress_file) == rescan(progress_file) == {"Health": 30, "Learning": 5, "Focus": 25}
+
+    swim = next(log for log in history(progress_file) if log['name'] == "Swim")
+    storage.record(progress_file, storage.load(progress_file), [{"event": "log_deleted", "log_id": swim['id'], "date": swim['date']}])
+    assert totals(progress_file) == rescan(progress_file) == {"Health": 10, "Learning": 5, "Focus": 5}
+    assert storage.verify_xp_by_category(progress_file) == {}
+
+def test_verify_reports_and_repairs_drifted_totals(progress_file):
+    storage.record(progress_file, storage.load(progress_file), [task_event("Run", 10, ["Health"], "2026-10-01")])
+    if storage.BACKEND == "sqlite":
+        import sqlite_store
+        with sqlite_store.connect(progress_file) as conn:
+            conn.execute("UPDATE category_xp SET xp = 99 WHERE category = 'Health'")
+    else:
+        storage.update(progress_file, lambda progress: progress['xp_by_category'].update(Health=99))
+
+    assert storage.verify_xp_by_category(progress_file) == {"Health": (99, 10)}
+    storage.verify_xp_by_category(progress_file, repair=True)
+    assert storage.verify_xp_by_category(progress_file) == {}
+    assert totals(progress_file) == {"Health": 10}
@@ -0,0 +1,485 @@
+#imports
+import csv
+import json
+import os
+from collections import Counter
+import storage
+
+#The purpose of this module is to get the history out of a tracker for analysis, and into another
+#tracker to merge two of them, without building the whole history in memory a second time.
+#Four tables are exported, one file each (e.g. export/detailed_logs.csv):
+#   detailed_logs     every logged task and completed penalty
+#   daily_logs        the summary of each submission (what was completed, XP earned, level reached)
+#   penalties         assigned penalties
+#   spending_history  money spent
+#as CSV (lists and objects as JSON text), JSON lines, or Parquet when pyarrow is installed.
+#Rows are read and written CHUNK_ROWS at a time: with the SQLite backend they come straight from a
+#database cursor; a JSON progress file is one document, so it is parsed once and then walked.
+#
+#Importing is idempotent: a row is only added if the tracker doesn't have it yet, so importing the
+#same export twice, or merging two trackers that share part of their history, adds each thing once.
+#A row is "the same" as an existing one when its identity matches (see IDENTITY), counting repeats:
+#the 3rd "Drink water" of a day is only added if the tracker has fewer than 3 of them.
+#Repeats are counted per day, so rows must come sorted by date. Exports are: every table is written
+#by date (then in the order added), even where the tracker keeps it in the order added.
+#Imported tasks, penalties and spending go through the usual events, so XP, levels, completion counts,
+#streaks and the money balance follow. Imported penalties start open; their completion is the
+#penalty's row in detailed_logs. Reward claims are not exported, so spending is only imported if the
+#balance covers it.
+
+
+### Configuration
+CHUNK_ROWS = 10000 #rows read, written and imported at a time
+FORMATS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+COLUMNS = { #table -> (column, type); list and json columns are JSON text in CSV
+    "detailed_logs": (("id", "int"), ("date", "str"), ("name", "str"), ("xp", "int"), ("type", "str"),
+                      ("period_key", "str"), ("penalty_id", "str"), ("category", "list")),
+    "daily_logs": (("date", "str"), ("completed", "json"), ("earned_xp", "int"), ("level", "int")),
+    "penalties": (("id", "str"), ("due_date", "str"), ("description", "str"), ("missed_date", "str"), ("completed", "bool")),
+    "spending_history": (("date", "str"), ("amount", "float"), ("description", "str")),
+}
+TABLES = tuple(COLUMNS)
+IMPORT_ORDER = ("penalties", "detailed_logs", "daily_logs", "spending_history") #penalties before the logs that complete them
+IDENTITY = { #table -> the columns that identify a row when merging (plus its repeat number that day)
+    "detailed_logs": ("date", "type", "name", "period_key"),
+    "daily_logs": ("date", "completed", "earned_xp"),
+    "spending_history": ("date", "amount", "description"),
+}
+
+
+### Row Helpers
+
+def _row(table, values):
+    """
+    Puts a record in the column shape of a table (missing columns are None).
+    """
+    return {column: values.get(column) for column, _ in COLUMNS[table]}
+
+def _chunks(rows):
+    """
+    Groups an iterable of rows into lists of at most CHUNK_ROWS rows.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _identity(table, row):
+    """
+    Gets the identity of a row (see IDENTITY); objects are compared by their sorted JSON text.
+    """
+    return tuple(json.dumps(row[c], sort_keys=True) if isinstance(row[c], (dict, list)) else row[c] for c in IDENTITY[table])
+
+def _files(data_dir):
+    """
+    Gets the progress and rewards paths of a data folder.
+    """
+    return os.path.join(data_dir, "progress.json"), os.path.join(data_dir, "rewards.json")
+
+
+### Reading a Tracker
+
+def _sqlite_rows(file_path, table):
+    """
+    Streams a table's rows from the SQLite database with a cursor.
+    """
+    import sqlite_store
+    queries = {
+        "detailed_logs": "SELECT * FROM detailed_logs ORDER BY date, id",
+        "daily_logs": "SELECT data FROM daily_logs ORDER BY json_extract(data, '$.date'), id",
+        "penalties": "SELECT data FROM penalties ORDER BY position",
+        "spending_history": "SELECT date, amount, description FROM spending_history ORDER BY date, id",
+    }
+    with sqlite_store.connect(file_path) as conn:
+        cursor = conn.execute(queries[table])
+        while True:
+            rows = cursor.fetchmany(CHUNK_ROWS)
+            if not rows:
+                return
+            for row in rows:
+                if table == "detailed_logs":
+                    yield sqlite_store._row_to_log(row)
+                elif table == "spending_history":
+                    yield {"date": row[0], "amount": row[1], "description": row[2]}
+                else:
+                    yield json.loads(row[0])
+
+def read_table(data_dir, table):
+    """
+    Reads one table of a tracker in chunks.
+    Args:
+        data_dir (str): The tracker's data folder.
+        table (str): One of TABLES.
+    Returns:
+        generator: Lists of at most CHUNK_ROWS rows (dicts with the table's COLUMNS), oldest first.
+    """
+    progress_file, rewards_file = _files(data_dir)
+    file_path = rewards_file if table == "spending_history" else progress_file
+    if storage._use_sqlite(file_path):
+        rows = _sqlite_rows(file_path, table)
+    else:
+        state = storage.load(file_path)
+        rows = state.get('money_tracking', {}).get('spending_history', []) if table == "spending_history" else state.get(table, [])
+        if table != "detailed_logs": # kept in the order added, which is not by date once older rows were imported
+            rows = sorted(rows, key=lambda row: row.get('date') or "")
+    return _chunks(_row(table, row) for row in rows)
+
+
+### File Formats
+
+def _to_text(kind, value):
+    """
+    Turns a value into a CSV cell.
+    """
+    if value is None:
+        return ""
+    if kind in ("list", "json"):
+        return json.dumps(value)
+    return value
+
+def _from_text(kind, text):
+    """
+    Turns a CSV cell back into a value.
+    """
+    if text == "":
+        return None
+    if kind == "int":
+        return int(text)
+    if kind == "float":
+        return float(text)
+    if kind == "bool":
+        return text in ("True", "true", "1")
+    if kind in ("list", "json"):
+        return json.loads(text)
+    return text
+
+def _parquet_schema(table):
+    """
+    Gets the pyarrow schema of a table (json columns are stored as JSON text).
+    """
+    import pyarrow as pa
+    types = {"int": pa.int64(), "str": pa.string(), "float": pa.float64(), "bool": pa.bool_(), "list": pa.list_(pa.string()), "json": pa.string()}
+    return pa.schema([(column, types[kind]) for column, kind in COLUMNS[table]])
+
+def write_file(path, table, chunks, fmt):
+    """
+    Writes chunks of rows to one file.
+    Args:
+        path (str): The file to write.
+        table (str): One of TABLES.
+        chunks (iterable): Lists of rows (see read_table).
+        fmt (str): csv, jsonl or parquet.
+    Returns:
+        int: The number of rows written.
+    """
+    count = 0
+    columns = COLUMNS[table]
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = _parquet_schema(table)
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in chunks:
+                rows = [{c: json.dumps(row[c]) if kind == "json" and row[c] is not None else row[c] for c, kind in columns} for row in chunk]
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                count += len(chunk)
+        return count
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow([c for c, _ in columns])
+        for chunk in chunks:
+            if fmt == "csv":
+                writer.writerows([[_to_text(kind, row[c]) for c, kind in columns] for row in chunk])
+            else:
+                f.writelines(json.dumps(row, separators=(",", ":")) + "\n" for row in chunk)
+            count += len(chunk)
+    return count
+
+def read_file(path, table):
+    """
+    Reads an exported file in chunks; the format comes from the file extension.
+    Args:
+        path (str): The file to read.
+        table (str): One of TABLES.
+    Returns:
+        generator: Lists of at most CHUNK_ROWS rows with the table's COLUMNS.
+    """
+    columns = COLUMNS[table]
+    if path.endswith(FORMATS["parquet"]):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_ROWS):
+            yield [
+                {c: json.loads(row[c]) if kind == "json" and row.get(c) is not None else row.get(c) for c, kind in columns}
+                for row in batch.to_pylist()
+            ]
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(FORMATS["csv"]):
+            rows = ({c: _from_text(kind, record.get(c, "")) for c, kind in columns} for record in csv.DictReader(f))
+        else:
+            rows = (_row(table, json.loads(line)) for line in f if line.strip())
+        yield from _chunks(rows)
+
+def find_file(folder, table):
+    """
+    Finds the exported file of a table in a folder.
+    Args:
+        folder (str): The export folder.
+        table (str): One of TABLES.
+    Returns:
+        str: The path, or None if the folder has no file for the table.
+    """
+    for suffix in FORMATS.values():
+        path = os.path.join(folder, table + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+### Export
+
+def export(data_dir, out_dir, fmt="csv", tables=TABLES):
+    """
+    Exports a tracker's history, one file per table.
+    Args:
+        data_dir (str): The tracker's data folder.
+        out_dir (str): The folder to write the files to (created if needed).
+        fmt (str): csv, jsonl or parquet (needs pyarrow).
+        tables (iterable): The tables to export (default: all of them).
+    Returns:
+        dict: Table -> (file path, number of rows).
+    """
+    if fmt == "parquet":
+        import pyarrow # fail before writing anything if it is missing
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+    for table in tables:
+        path = os.path.join(out_dir, table + FORMATS[fmt])
+        written[table] = (path, write_file(path, table, read_table(data_dir, table), fmt))
+    return written
+
+
+### Import
+
+def _dedupe(table, chunks, existing):
+    """
+    Drops the rows of an import that the tracker already has (see the module comment).
+    Args:
+        table (str): detailed_logs, daily_logs or spending_history.
+        chunks (iterable): Lists of rows, sorted by date across chunks.
+        existing (function): Takes a set of days and returns day -> Counter of the tracker's row identities
+            that day, as they were before the import. Called before the rows of those days are applied.
+    Returns:
+        generator: (new rows, number of rows skipped) per chunk.
+    Raises:
+        ValueError: If a row is older than a day a previous chunk already finished.
+    """
+    baseline, seen, finished = {}, {}, None
+    for chunk in chunks:
+        days = {row['date'] for row in chunk}
+        if None in days:
+            raise ValueError(f"{table}: every row needs a date")
+        if finished is not None and min(days) < finished:
+            raise ValueError(f"{table}: rows must be sorted by date ({min(days)} comes after {finished})")
+        baseline.update(existing(days - baseline.keys()))
+        new_rows = []
+        for row in chunk:
+            key = _identity(table, row)
+            counts = seen.setdefault(row['date'], Counter())
+            counts[key] += 1
+            if counts[key] > baseline[row['date']][key]:
+                new_rows.append(row)
+        yield new_rows, len(chunk) - len(new_rows)
+        finished = max(days)
+        for day in [day for day in baseline if day < finished]: # days before the last one are done
+            del baseline[day]
+            seen.pop(day, None)
+
+def _index_by_day(table, rows):
+    """
+    Counts row identities per day, for tables the tracker keeps in full in its state.
+    """
+    index = {}
+    for row in rows:
+        row = _row(table, row)
+        index.setdefault(row['date'], Counter())[_identity(table, row)] += 1
+    return index
+
+def _existing_logs(progress_file, logs):
+    """
+    Gets the function that counts the tracker's detailed_logs identities on some days (see _dedupe).
+    logs is the JSON tracker's detailed_logs from before the import (None with the SQLite backend).
+    """
+    if logs is not None:
+        before = {"detailed_logs": logs}
+        return lambda days: {day: Counter(_identity("detailed_logs", _row("detailed_logs", log)) for log in storage.logs_on(before, day)) for day in days}
+    import sqlite_store
+
+    def existing(days):
+        counts = {day: Counter() for day in days}
+        with sqlite_store.connect(progress_file) as conn:
+            for day in days:
+                rows = conn.execute("SELECT date, type, name, period_key, COUNT(*) FROM detailed_logs WHERE date = ? GROUP BY type, name, period_key", (day,))
+                for log_date, log_type, name, period_key, count in rows:
+                    counts[day][(log_date, log_type, name, period_key)] += count
+        return counts
+    return existing
+
+def _import_progress(state, apply, logs, progress_file, folder, tables, report):
+    """
+    Imports penalties, detailed_logs and daily_logs into a loaded progress state.
+    apply(events) records events against the state; logs is the history before the import (see _with_state).
+    """
+    if "penalties" in tables and find_file(folder, "penalties"):
+        known = {p.get('id') or (p.get('due_date'), p.get('description')) for p in state.get('penalties', [])}
+        added = skipped = 0
+        for chunk in read_file(find_file(folder, "penalties"), "penalties"):
+            events = []
+            for row in chunk:
+                key = row['id'] or (row['due_date'], row['description'])
+                if key in known:
+                    skipped += 1
+                    continue
+                known.add(key)
+                penalty = {k: v for k, v in row.items() if v is not None}
+                penalty['completed'] = False # completed by its detailed_logs row
+                events.append({"event": "penalty_assigned", "penalty": penalty})
+            apply(events)
+            added += len(events)
+        report["penalties"] = (added, skipped)
+
+    if "detailed_logs" in tables and find_file(folder, "detailed_logs"):
+        added = skipped = 0
+        for rows, dupes in _dedupe("detailed_logs", read_file(find_file(folder, "detailed_logs"), "detailed_logs"), _existing_logs(progress_file, logs)):
+            open_penalties = {p['id'] for p in state.get('penalties', []) if p.get('id') and not p.get('completed')}
+            events = []
+            for row in rows:
+                if row['type'] == 'penalty':
+                    if row['penalty_id'] not in open_penalties:
+                        dupes += 1
+                        continue
+                    open_penalties.discard(row['penalty_id'])
+                    events.append({"event": "penalty_completed", "penalty_id": row['penalty_id'], "index": -1, "date": row['date']})
+                elif row['type'] and row['period_key']:
+                    events.append({
+                        "event": "task_completed", "task_type": row['type'], "name": row['name'], "xp": row['xp'] or 0,
+                        "category": row['category'] or [], "date": row['date'], "period_key": row['period_key']
+                    })
+                else:
+                    dupes += 1 # not a task or penalty log; nothing to replay it with
+            apply(events)
+            added += len(events)
+            skipped += dupes
+        report["detailed_logs"] = (added, skipped)
+
+    if "daily_logs" in tables and find_file(folder, "daily_logs"):
+        if storage._use_sqlite(progress_file):
+            index = _index_by_day("daily_logs", (row for chunk in read_table(os.path.dirname(progress_file), "daily_logs") for row in chunk))
+        else:
+            index = _index_by_day("daily_logs", state.get('daily_logs', []))
+        added = skipped = 0
+        for rows, dupes in _dedupe("daily_logs", read_file(find_file(folder, "daily_logs"), "daily_logs"), lambda days: {day: index.pop(day, Counter()) for day in days}):
+            events = [{"event": "day_logged", "date": row['date'], "completed": row['completed'] or {}, "earned_xp": row['earned_xp'] or 0, "level": row['level']} for row in rows]
+            apply(events)
+            added += len(events)
+            skipped += dupes
+        report["daily_logs"] = (added, skipped)
+
+def _new_spending(state, folder):
+    """
+    Gets the spending rows of an export that the rewards state does not have yet.
+    Returns:
+        generator: (new rows, number of rows skipped) per chunk (see _dedupe).
+    """
+    index = _index_by_day("spending_history", state.get('money_tracking', {}).get('spending_history', []))
+    return _dedupe("spending_history", read_file(find_file(folder, "spending_history"), "spending_history"), lambda days: {day: index.pop(day, Counter()) for day in days})
+
+def _check_balance(rewards_file, folder):
+    """
+    Refuses a spending import that would leave the money balance below zero (the money came from
+    reward claims, which are not part of the export).
+    Raises:
+        ValueError: If the balance would go negative.
+    """
+    state = storage.load(rewards_file)
+    balance = float(state.get('money_tracking', {}).get('current_balance', 0))
+    spent = sum(float(row['amount'] or 0) for rows, _ in _new_spending(state, folder) for row in rows)
+    if spent and balance - spent < 0:
+        raise ValueError(
+            f"spending_history: importing {spent:.2f} of spending would leave a balance of {balance - spent:.2f}. "
+            "Claim the rewards that paid for it first, or leave spending_history out (--tables)."
+        )
+
+def _import_rewards(state, apply, logs, folder, report):
+    """
+    Imports spending_history into a loaded rewards state.
+    """
+    added = skipped = 0
+    for rows, dupes in _new_spending(state, folder):
+        events = [{"event": "spending_added", "date": row['date'], "amount": row['amount'], "description": row['description'] or ""} for row in rows]
+        apply(events)
+        added += len(events)
+        skipped += dupes
+    report["spending_history"] = (added, skipped)
+
+def _with_state(file_path, work):
+    """
+    Runs work(state, apply, logs) against a file. With the SQLite backend each apply is one transaction
+    and logs is None. A JSON file is changed in memory under its lock and written once at the end, so
+    either the whole import is saved or none of it (and since the import is idempotent, it can simply
+    be run again). Its new detailed_logs entries are appended to an empty list while importing (rows
+    come sorted by date, so that never shifts the list) and merged into the history with one sort at
+    the end; logs is the history from before the import.
+    """
+    if storage._use_sqlite(file_path):
+        state = storage.load(file_path)
+
+        def record(events):
+            if events:
+                storage.record(file_path, state, events)
+        work(state, record, None)
+        return
+
+    def mutate(state):
+        logs = state.get('detailed_logs')
+        if logs is not None:
+            state['detailed_logs'] = []
+
+        def apply(events):
+            for event in events:
+                storage.apply_event(state, event)
+        work(state, apply, logs)
+        if logs is not None:
+            state['detailed_logs'] = logs + state['detailed_logs']
+            storage._index_logs(state) # one sort merges the two runs
+    storage.update(file_path, mutate)
+
+def import_history(data_dir, in_dir, tables=TABLES):
+    """
+    Imports an export (from this or another tracker) into a tracker, skipping rows it already has.
+    Args:
+        data_dir (str): The data folder of the tracker to import into.
+        in_dir (str): The folder with the exported files (any of the formats).
+        tables (iterable): The tables to import (default: all found in in_dir).
+    Returns:
+        dict: Table -> (rows added, rows skipped as already present or not importable).
+    Raises:
+        ValueError: If a file is not sorted by date, or the imported spending would make the money balance
+            negative (checked before anything is imported).
+    """
+    progress_file, rewards_file = _files(data_dir)
+    tables = [table for table in IMPORT_ORDER if table in tables and find_file(in_dir, table)]
+    if "spending_history" in tables:
+        _check_balance(rewards_file, in_dir)
+    report = {}
+    progress_tables = [table for table in tables if table != "spending_history"]
+    if progress_tables:
+        _with_state(progress_file, lambda state, apply, logs: _import_progress(state, apply, logs, progress_file, in_dir, progress_tables, report))
+    if "spending_history" in tables:
+        _with_state(rewards_file, lambda state, apply, logs: _import_rewards(state, apply, logs, in_dir, report))
+    return report
@@ -0,0 +1,217 @@
+#imports
+import os
+import threading
+import time
+import storage
+
+#The purpose of this module is to notice changes to the data files (a hand-edited tasks.json, the
+#nightly check or another session writing progress.json) as they happen, so the app does not have
+#to look at every file on every rerun.
+#Every watched file has a loader that turns the file into a token, e.g. its state version. When the
+#file changes, the loader runs once on the watcher thread and the new token is kept; sessions compare
+#it with the version they hold (see app.initialize_session_state) and only reload what differs.
+#Changes are noticed with watchdog (inotify, FSEvents, ...) if it is installed, otherwise by checking
+#the files' stat signatures every POLL_SECONDS. Either way a burst of writes (an editor saving twice,
+#a compaction rewriting the snapshot and truncating the log) is handled once, DEBOUNCE_SECONDS after
+#the last write.
+
+
+### Configuration
+POLL_SECONDS = float(os.environ.get("LEVELUP_WATCH_POLL", "1.0")) #how often to check the files without watchdog
+DEBOUNCE_SECONDS = float(os.environ.get("LEVELUP_WATCH_DEBOUNCE", "0.5")) #quiet time after the last write before reloading
+
+_lock = threading.Lock()
+_watched = {} #file path -> {"loader", "signature", "token", "changed"}
+_aliases = {} #snapshot or event log path on disk -> watched file path
+_thread = None
+_observer = None #watchdog observer, or None when polling
+_handler = None
+_directories = set() #directories scheduled with the observer
+_status = {"mode": None, "reloads": 0, "errors": 0, "last_change": None}
+
+
+### Watching
+
+def watch(file_path, loader):
+    """
+    Starts watching a file (and its event log). Watching a file again keeps the first loader.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+        loader (function): Called with the path after each change; returns the file's new token.
+    Returns:
+        The file's current token.
+    """
+    file_path = os.path.abspath(file_path)
+    with _lock:
+        if file_path in _watched:
+            return _watched[file_path]['token']
+    signature = storage.file_version(file_path)
+    token = loader(file_path)
+    with _lock:
+        if file_path not in _watched:
+            _watched[file_path] = {"loader": loader, "signature": signature, "token": token, "changed": None}
+            for path in (file_path, storage.log_path(file_path)):
+                _aliases[path] = file_path
+            _schedule(os.path.dirname(file_path))
+        return _watched[file_path]['token']
+
+def token(file_path):
+    """
+    Gets the token of a watched file as of its last change.
+    Args:
+        file_path (str): The path to the JSON snapshot.
+    Returns:
+        The token, or None if the watcher is not running or the file is not watched.
+    """
+    with _lock:
+        entry = _watched.get(os.path.abspath(file_path)) if _thread is not None else None
+        return entry['token'] if entry else None
+
+def status():
+    """
+    Gets what the watcher of this process is doing.
+    Args:
+        None
+    Returns:
+        dict: mode ("watchdog", "polling" or None when stopped), files watched, reloads, loader errors and the last change time.
+    """
+    with _lock:
+        return dict(_status, files=len(_watched))
+
+
+### Change Detection
+
+def _note(path):
+    """
+    Marks the watched file that a changed path belongs to; it is reloaded once the writes settle.
+    """
+    with _lock:
+        file_path = _aliases.get(os.path.abspath(path))
+        if file_path is not None:
+            _watched[file_path]['changed'] = time.monotonic()
+
+def _schedule(directory):
+    """
+    Has the watchdog observer report changes in a directory. Call with _lock held.
+    """
+    if _observer is not None and directory not in _directories:
+        _observer.schedule(_handler, directory, recursive=False)
+        _directories.add(directory)
+
+def _start_observer():
+    """
+    Starts a watchdog observer if watchdog is installed.
+    Returns:
+        tuple: (observer, event handler), or (None, None) to poll instead.
+    """
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        return None, None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            _note(event.src_path)
+            if getattr(event, "dest_path", None): # atomic writes show up as a move onto the file
+                _note(event.dest_path)
+
+    observer = Observer()
+    observer.daemon = True
+    observer.start()
+    return observer, Handler()
+
+def _poll():
+    """
+    Compares the stat signature of every watched file with the last one seen (polling mode).
+    """
+    with _lock:
+        paths = list(_watched)
+    for file_path in paths:
+        signature = storage.file_version(file_path)
+        with _lock:
+            entry = _watched[file_path]
+            if signature != entry['signature'] and entry['changed'] is None:
+                entry['changed'] = time.monotonic()
+
+def _reload_settled():
+    """
+    Runs the loader of every file whose last write is DEBOUNCE_SECONDS old. Events that did not change
+    the file (watchdog also reports reads) are dropped by comparing stat signatures.
+    """
+    now = time.monotonic()
+    with _lock:
+        due = [path for path, entry in _watched.items() if entry['changed'] is not None and now - entry['changed'] >= DEBOUNCE_SECONDS]
+        for path in due:
+            _watched[path]['changed'] = None
+    for file_path in due:
+        signature = storage.file_version(file_path)
+        with _lock:
+            entry = _watched[file_path]
+            if signature == entry['signature']:
+                continue
+            entry['signature'] = signature
+        try:
+            new_token = entry['loader'](file_path)
+        except Exception as e: # e.g. a half-edited tasks.json; sessions see the error when they load it
+            print(f"Watcher could not reload {file_path}: {type(e).__name__}: {e}")
+            new_token = signature
+            with _lock:
+                _status['errors'] += 1
+        with _lock:
+            entry['token'] = new_token
+            _status['reloads'] += 1
+            _status['last_change'] = time.time()
+
+def _run():
+    """
+    The watcher thread: polls (without watchdog) and reloads settled files until stopped.
+    """
+    tick = min(DEBOUNCE_SECONDS, POLL_SECONDS) / 2 if _observer is not None else POLL_SECONDS
+    while _thread is threading.current_thread():
+        if _observer is None:
+            _poll()
+        _reload_settled()
+        time.sleep(max(tick, 0.05))
+
+
+### Start and Stop
+
+def start():
+    """
+    Starts the watcher thread of this process. Does nothing if it is already running.
+    Args:
+        None
+    Returns:
+        str: The mode it runs in ("watchdog" or "polling").
+    """
+    global _thread, _observer, _handler
+    with _lock:
+        if _thread is not None:
+            return _status['mode']
+        _observer, _handler = _start_observer()
+        _status['mode'] = "watchdog" if _observer is not None else "polling"
+        for directory in {os.path.dirname(path) for path in _watched}:
+            _schedule(directory)
+        _thread = threading.Thread(target=_run, name="levelup-watcher", daemon=True)
+        _thread.start()
+        return _status['mode']
+
+def stop():
+    """
+    Stops the watcher of this process and forgets the watched files.
+    Args:
+        None
+    Returns:
+        None
+    """
+    global _thread, _observer, _handler
+    with _lock:
+        observer = _observer
+        _thread = _observer = _handler = None
+        _watched.clear()
+        _aliases.clear()
+        _directories.clear()
+        _status['mode'] = None
+    if observer is not None:
+        observer.stop()